@@ -14,6 +14,7 @@ import gi
 gi.require_version('Gtk', '3.0')
 gi.require_version('Gst', '1.0')
 gi.require_version('GstAudio', '1.0')
+gi.require_version('GstController', '1.0')
 gi.require_version('GstPbutils', '1.0')
 gi.require_version('Notify', '0.7')
 gi.require_version('TotemPlParser', '1.0')
@@ -41,14 +42,14 @@ from lollypop.window import Window
 from lollypop.database import Database
 from lollypop.player import Player
 from lollypop.art import Art
-from lollypop.sqlcursor import SqlCursor
+from lollypop.sqlcursor import SqlCursor, SqlPool
 from lollypop.settings import Settings, SettingsDialog
 from lollypop.database_albums import AlbumsDatabase
 from lollypop.database_artists import ArtistsDatabase
 from lollypop.database_genres import GenresDatabase
 from lollypop.database_tracks import TracksDatabase
 from lollypop.playlists import Playlists
-from lollypop.objects import Album
+from lollypop.objects import Album, Base
 from lollypop.collectionscanner import CollectionScanner
 
 
@@ -134,6 +135,8 @@ class Application(Gtk.Application):
         self.tracks = TracksDatabase()
         self.player = Player()
         self.scanner = CollectionScanner()
+        Base.connect_cache(self.scanner)
+        self.player.connect_scanner(self.scanner)
         self.art = Art()
         self.art.update_art_size()
         if self.settings.get_value('artist-artwork'):
@@ -160,6 +163,7 @@ class Application(Gtk.Application):
         self.add_action(self.settings.create_action('shuffle'))
 
         self.db.upgrade()
+        self.db.update_sortkeys()
 
     def do_startup(self):
         """
@@ -239,6 +243,8 @@ class Application(Gtk.Application):
                     self.player.shuffle_albums(False)
                     dump(self.player.get_albums(),
                          open(DataPath + "/albums.bin", "wb"))
+                    dump(self.player.get_shuffle_state(),
+                         open(DataPath + "/shuffle.bin", "wb"))
                 except Exception as e:
                     print("Application::prepare_to_exit()", e)
             dump(track_id, open(DataPath + "/track_id.bin", "wb"))
@@ -280,6 +286,10 @@ class Application(Gtk.Application):
                 sql.execute('VACUUM')
         except Exception as e:
             print("Application::quit(): ", e)
+        if self.debug is True:
+            for (name, pool) in SqlPool.pools.items():
+                print("Application::quit(): %s: %s connections,"
+                      " %s waits, %.3fs waiting" % ((name,) + pool.stats))
         self.window.destroy()
 
     def is_fullscreen(self):
@@ -412,7 +422,7 @@ class Application(Gtk.Application):
             t = Thread(target=self.art.clean_all_cache)
             t.daemon = True
             t.start()
-            self.window.update_db()
+            self.window.update_db(True)
 
     def __set_network(self, action, param):
         """
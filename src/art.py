@@ -37,6 +37,8 @@ class Art(AlbumArt, RadioArt, Downloader):
             Remove all covers from cache
         """
         try:
+            self._clean_surfaces()
+            self._art_cache.clear()
             rmtree(self._CACHE_PATH)
             self._create_cache()
         except Exception as e:
@@ -10,13 +10,16 @@
 # You should have received a copy of the GNU General Public License
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 
-from gi.repository import GLib, Gdk, GdkPixbuf, Gio, Gst
+from gi.repository import GLib, Gdk, GdkPixbuf, Gio
 
-from threading import Thread
-import re
+from threading import Thread, Lock
+from queue import Queue, LifoQueue, Empty, Full
+from collections import OrderedDict
 
 from lollypop.art_base import BaseArt
-from lollypop.tagreader import TagReader
+from lollypop.art_cache import ArtCache
+from lollypop.tagreader import TagReader, Discoverer
+from lollypop.tagreader_native import NativeTagReader
 from lollypop.define import Lp, ArtSize
 from lollypop.objects import Album
 from lollypop.utils import escape, is_readonly
@@ -28,6 +31,12 @@ class AlbumArt(BaseArt, TagReader):
     """
 
     _MIMES = ("jpeg", "jpg", "png", "gif")
+    # Memory used by decoded artworks
+    __SURFACES_BYTES = 64 * 1024 * 1024
+    __DECODE_WORKERS = 2
+    __RENDER_WORKERS = 2
+    # Pending artworks data kept in memory while scanning
+    __RENDER_QUEUE = 32
 
     def __init__(self):
         """
@@ -37,6 +46,22 @@ class AlbumArt(BaseArt, TagReader):
         TagReader.__init__(self)
         self.__favorite = Lp().settings.get_value(
                                                 'favorite-cover').get_string()
+        self.__surfaces = OrderedDict()
+        self.__surfaces_bytes = 0
+        self.__surfaces_lock = Lock()
+        # Last requested first, this is what user is looking at
+        self.__decode_queue = LifoQueue()
+        self.__decode_callbacks = {}
+        self.__decode_workers = 0
+        self.__decode_lock = Lock()
+        self.__render_queue = Queue(self.__RENDER_QUEUE)
+        self.__render_workers = 0
+        self.__native_reader = NativeTagReader()
+        self._art_cache = ArtCache()
+        # Move artworks from flat cache used by previous versions
+        t = Thread(target=self._art_cache.migrate, args=(self._CACHE_PATH,))
+        t.daemon = True
+        t.start()
 
     def get_album_cache_path(self, album, size):
         """
@@ -48,20 +73,15 @@ class AlbumArt(BaseArt, TagReader):
         filename = ''
         try:
             filename = self.get_album_cache_name(album)
-            cache_path_jpg = "%s/%s_%s.jpg" % (self._CACHE_PATH,
-                                               filename,
-                                               size)
-            f = Gio.File.new_for_path(cache_path_jpg)
-            if f.query_exists():
-                return cache_path_jpg
-            else:
-                self.get_album_artwork(album, size, 1)
-                if f.query_exists():
-                    return cache_path_jpg
-                else:
-                    return self._get_default_icon_path(
-                                           size,
-                                           'folder-music-symbolic')
+            cache_path_jpg = self._art_cache.lookup(filename, size)
+            if cache_path_jpg is None:
+                self.__get_album_pixbuf(album, size, self)
+                cache_path_jpg = self._art_cache.lookup(filename, size)
+            if cache_path_jpg is None:
+                self.cache_album_art(album.id)
+                return self._get_default_icon_path(size,
+                                                   'folder-music-symbolic')
+            return cache_path_jpg
         except Exception as e:
             print("Art::get_album_cache_path(): %s" % e, ascii(filename))
             return None
@@ -147,73 +167,74 @@ class AlbumArt(BaseArt, TagReader):
             @return cairo surface
         """
         size *= scale
-        filename = self.get_album_cache_name(album)
-        cache_path_jpg = "%s/%s_%s.jpg" % (self._CACHE_PATH, filename, size)
-        pixbuf = None
-
-        try:
-            # Look in cache
-            f = Gio.File.new_for_path(cache_path_jpg)
-            if f.query_exists():
-                pixbuf = GdkPixbuf.Pixbuf.new_from_file_at_size(cache_path_jpg,
-                                                                size,
-                                                                size)
-            else:
-                # Use favorite folder artwork
-                if pixbuf is None:
-                    uri = self.get_album_artwork_uri(album)
-                    data = None
-                    if uri is not None:
-                        f = Gio.File.new_for_uri(uri)
-                        (status, data, tag) = f.load_contents(None)
-                        ratio = self._respect_ratio(uri)
-                        stream = Gio.MemoryInputStream.new_from_data(data,
-                                                                     None)
-                        pixbuf = GdkPixbuf.Pixbuf.new_from_stream_at_scale(
-                                                                       stream,
-                                                                       size,
-                                                                       size,
-                                                                       ratio,
-                                                                       None)
-                # Use tags artwork
-                if pixbuf is None and album.tracks:
-                    try:
-                        pixbuf = self.pixbuf_from_tags(
-                                    album.tracks[0].uri, size)
-                    except Exception as e:
-                        pass
-
-                # Use folder artwork
-                if pixbuf is None and album.uri != "":
-                    uri = self.get_first_album_artwork(album)
-                    # Look in album folder
-                    if uri is not None:
-                        f = Gio.File.new_for_uri(uri)
-                        (status, data, tag) = f.load_contents(None)
-                        ratio = self._respect_ratio(uri)
-                        stream = Gio.MemoryInputStream.new_from_data(data,
-                                                                     None)
-                        pixbuf = GdkPixbuf.Pixbuf.new_from_stream_at_scale(
-                                                                       stream,
-                                                                       size,
-                                                                       size,
-                                                                       ratio,
-                                                                       None)
-                # Use default artwork
-                if pixbuf is None:
-                    self.cache_album_art(album.id)
-                    return self.get_default_icon('folder-music-symbolic',
-                                                 size,
-                                                 scale)
-                else:
-                    pixbuf.savev(cache_path_jpg, "jpeg", ["quality"], ["90"])
+        key = (album.id, size, scale)
+        surface = self.__get_surface(key)
+        if surface is not None:
+            return surface
+        pixbuf = self.__get_album_pixbuf(album, size, self)
+        if pixbuf is None:
+            self.cache_album_art(album.id)
+            surface = self.get_default_icon('folder-music-symbolic',
+                                            size,
+                                            scale)
+        else:
             surface = Gdk.cairo_surface_create_from_pixbuf(pixbuf, scale, None)
             del pixbuf
-            return surface
+        self.__add_surface(key, surface)
+        return surface
 
-        except Exception as e:
-            print("AlbumArt::get_album_artwork()", e)
-            return self.get_default_icon('folder-music-symbolic', size, scale)
+    def load_album_artwork(self, album, size, scale, callback, *args):
+        """
+            Load album artwork in background
+            If artwork is in memory, callback is run immediately
+            @param album as Album
+            @param pixbuf size as int
+            @param scale factor as int
+            @param callback as function(surface as cairo.Surface, *args),
+                   run in main loop
+            @return True if callback already run
+        """
+        size *= scale
+        key = (album.id, size, scale)
+        surface = self.__get_surface(key)
+        if surface is not None:
+            callback(surface, *args)
+            return True
+        with self.__decode_lock:
+            # Already loading, just wait for it
+            if key in self.__decode_callbacks:
+                self.__decode_callbacks[key].append((callback, args))
+                return False
+            self.__decode_callbacks[key] = [(callback, args)]
+            self.__decode_queue.put((key, album))
+            if self.__decode_workers < self.__DECODE_WORKERS:
+                self.__decode_workers += 1
+                t = Thread(target=self.__decode)
+                t.daemon = True
+                t.start()
+        return False
+
+    def cache_album_artwork(self, album_id, data, scale):
+        """
+            Render album artwork in background for sizes used by views
+            Nothing is done if album already has a cached or
+            favorite artwork, or if too many artworks are pending:
+            artwork will then be read from tags on display
+            @param album id as int
+            @param data as bytes
+            @param scale factor as int
+            @thread safe
+        """
+        with self.__decode_lock:
+            try:
+                self.__render_queue.put_nowait((album_id, data, scale))
+            except Full:
+                return
+            if self.__render_workers < self.__RENDER_WORKERS:
+                self.__render_workers += 1
+                t = Thread(target=self.__render)
+                t.daemon = True
+                t.start()
 
     def get_album_artwork2(self, uri, size, scale):
         """
@@ -290,6 +311,7 @@ class AlbumArt(BaseArt, TagReader):
             Announce album cover update
             @param album id as int
         """
+        self._clean_surfaces(album_id)
         self.emit('album-artwork-changed', album_id)
 
     def remove_album_artwork(self, album):
@@ -325,50 +347,34 @@ class AlbumArt(BaseArt, TagReader):
             Remove cover from cache for album id
             @param album as Album
         """
+        self._clean_surfaces(album.id)
         cache_name = self.get_album_cache_name(album)
         try:
-            d = Gio.File.new_for_path(self._CACHE_PATH)
-            infos = d.enumerate_children(
-                'standard::name',
-                Gio.FileQueryInfoFlags.NOFOLLOW_SYMLINKS,
-                None)
-            for info in infos:
-                f = infos.get_child(info)
-                f = infos.get_child(info)
-                basename = f.get_basename()
-                if re.search('%s_.*\.jpg' % re.escape(cache_name), basename):
-                    f.delete()
+            self._art_cache.remove(cache_name)
         except Exception as e:
             print("Art::clean_album_cache(): ", e, cache_name)
 
-    def pixbuf_from_tags(self, uri, size):
+    def pixbuf_from_tags(self, uri, size, discoverer=None):
         """
             Return cover from tags
             @param uri as str
             @param size as int
+            @param discoverer as Discoverer, needed outside main thread
         """
         pixbuf = None
         if uri.startswith('https:'):
             return
+        if discoverer is None:
+            discoverer = self
         try:
-            info = self.get_info(uri)
-            exist = False
-            if info is not None:
-                (exist, sample) = info.get_tags().get_sample_index('image', 0)
-                # Some file store it in a preview-image tag
-                if not exist:
-                    (exist, sample) = info.get_tags().get_sample_index(
-                                                            'preview-image', 0)
-            if exist:
-                (exist, mapflags) = sample.get_buffer().map(Gst.MapFlags.READ)
-            if exist:
-                stream = Gio.MemoryInputStream.new_from_data(mapflags.data,
-                                                             None)
-                pixbuf = GdkPixbuf.Pixbuf.new_from_stream_at_scale(stream,
-                                                                   size,
-                                                                   size,
-                                                                   False,
-                                                                   None)
+            # Only read tags blocks if container is known
+            (handled, data) = self.__native_reader.read_artwork(uri)
+            if not handled:
+                info = discoverer.get_info(uri)
+                if info is not None:
+                    data = self.get_artwork(info.get_tags())
+            if data is not None:
+                pixbuf = self.__pixbuf_from_data(data, size)
         except Exception as e:
             print("AlbumArt::pixbuf_from_tags():", e)
         return pixbuf
@@ -382,9 +388,213 @@ class AlbumArt(BaseArt, TagReader):
             "_" + album.name[:100] + "_" + album.year
         return escape(name)
 
+#######################
+# PROTECTED           #
+#######################
+    def _clean_surfaces(self, album_id=None):
+        """
+            Remove decoded artworks from memory
+            @param album id as int, None for all albums
+        """
+        with self.__surfaces_lock:
+            for key in list(self.__surfaces.keys()):
+                if album_id is None or key[0] == album_id:
+                    del self.__surfaces[key]
+                    self.__surfaces_bytes -= self.__get_surface_bytes(key)
+
 #######################
 # PRIVATE             #
 #######################
+    def __get_surface_bytes(self, key):
+        """
+            Get memory used by a decoded artwork
+            @param key as (album id as int, size as int, scale as int)
+            @return int
+        """
+        return key[1] * key[1] * 4
+
+    def __get_surface(self, key):
+        """
+            Get decoded artwork from memory
+            @param key as (album id as int, size as int, scale as int)
+            @return cairo.Surface or None
+        """
+        with self.__surfaces_lock:
+            surface = self.__surfaces.get(key, None)
+            if surface is not None:
+                self.__surfaces.move_to_end(key)
+            return surface
+
+    def __add_surface(self, key, surface):
+        """
+            Keep decoded artwork in memory, forget least recently used ones
+            @param key as (album id as int, size as int, scale as int)
+            @param surface as cairo.Surface
+        """
+        if key[0] is None:
+            return
+        with self.__surfaces_lock:
+            if key not in self.__surfaces:
+                self.__surfaces_bytes += self.__get_surface_bytes(key)
+            self.__surfaces[key] = surface
+            self.__surfaces.move_to_end(key)
+            while self.__surfaces_bytes > self.__SURFACES_BYTES and\
+                    len(self.__surfaces) > 1:
+                (old_key, old_surface) = self.__surfaces.popitem(last=False)
+                self.__surfaces_bytes -= self.__get_surface_bytes(old_key)
+
+    def __get_album_pixbuf(self, album, size, discoverer):
+        """
+            Get album artwork from cache, favorite file, tags or folder
+            @param album as Album
+            @param pixbuf size as int
+            @param discoverer as Discoverer
+            @return GdkPixbuf.Pixbuf or None
+        """
+        filename = self.get_album_cache_name(album)
+        pixbuf = None
+        try:
+            # Look in cache
+            cache_path_jpg = self._art_cache.lookup(filename, size)
+            if cache_path_jpg is not None:
+                return GdkPixbuf.Pixbuf.new_from_file_at_size(cache_path_jpg,
+                                                              size,
+                                                              size)
+            # Use favorite folder artwork
+            uri = self.get_album_artwork_uri(album)
+            if uri is not None:
+                pixbuf = self.__pixbuf_from_uri(uri, size)
+            # Use tags artwork
+            if pixbuf is None and album.tracks:
+                pixbuf = self.pixbuf_from_tags(album.tracks[0].uri,
+                                               size,
+                                               discoverer)
+            # Use folder artwork
+            if pixbuf is None and album.uri != "":
+                uri = self.get_first_album_artwork(album)
+                # Look in album folder
+                if uri is not None:
+                    pixbuf = self.__pixbuf_from_uri(uri, size)
+            if pixbuf is not None:
+                pixbuf.savev(self._art_cache.get_path(filename, size),
+                             "jpeg", ["quality"], ["90"])
+                self._art_cache.add(filename, size)
+        except Exception as e:
+            print("AlbumArt::__get_album_pixbuf()", e)
+        return pixbuf
+
+    def __pixbuf_from_uri(self, uri, size):
+        """
+            Load pixbuf for uri
+            @param uri as str
+            @param size as int
+            @return GdkPixbuf.Pixbuf
+        """
+        f = Gio.File.new_for_uri(uri)
+        (status, data, tag) = f.load_contents(None)
+        ratio = self._respect_ratio(uri)
+        stream = Gio.MemoryInputStream.new_from_data(data, None)
+        return GdkPixbuf.Pixbuf.new_from_stream_at_scale(stream,
+                                                         size,
+                                                         size,
+                                                         ratio,
+                                                         None)
+
+    def __pixbuf_from_data(self, data, size):
+        """
+            Load pixbuf for data
+            @param data as bytes
+            @param size as int
+            @return GdkPixbuf.Pixbuf
+        """
+        stream = Gio.MemoryInputStream.new_from_data(data, None)
+        return GdkPixbuf.Pixbuf.new_from_stream_at_scale(stream,
+                                                         size,
+                                                         size,
+                                                         False,
+                                                         None)
+
+    def __render(self):
+        """
+            Render queued artworks, exit when queue is empty
+        """
+        while True:
+            with self.__decode_lock:
+                try:
+                    (album_id, data, scale) = self.__render_queue.get_nowait()
+                except Empty:
+                    self.__render_workers -= 1
+                    return
+            try:
+                self.__render_album_artwork(album_id, data, scale)
+            except Exception as e:
+                print("AlbumArt::__render()", e)
+
+    def __render_album_artwork(self, album_id, data, scale):
+        """
+            Save artwork data in cache for sizes used by views
+            @param album id as int
+            @param data as bytes
+            @param scale factor as int
+        """
+        album = Album(album_id)
+        filename = self.get_album_cache_name(album)
+        sizes = [size * scale for size in (ArtSize.BIG, ArtSize.MEDIUM)
+                 if self._art_cache.lookup(filename,
+                                           size * scale) is None]
+        if not sizes:
+            return
+        # Favorite artwork wins over tags, it will be cached on display
+        if self.get_album_artwork_uri(album) is not None:
+            return
+        # Decode once at biggest size, then scale down
+        sizes.sort(reverse=True)
+        pixbuf = self.__pixbuf_from_data(data, sizes[0])
+        for size in sizes:
+            if size != sizes[0]:
+                pixbuf = pixbuf.scale_simple(size, size,
+                                             GdkPixbuf.InterpType.BILINEAR)
+            pixbuf.savev(self._art_cache.get_path(filename, size),
+                         "jpeg", ["quality"], ["90"])
+            self._art_cache.add(filename, size)
+        del pixbuf
+
+    def __decode(self):
+        """
+            Decode queued artworks, exit when queue is empty
+        """
+        discoverer = Discoverer()
+        while True:
+            with self.__decode_lock:
+                try:
+                    (key, album) = self.__decode_queue.get_nowait()
+                except Empty:
+                    self.__decode_workers -= 1
+                    return
+            pixbuf = self.__get_album_pixbuf(album, key[1], discoverer)
+            GLib.idle_add(self.__on_album_pixbuf, key, pixbuf)
+
+    def __on_album_pixbuf(self, key, pixbuf):
+        """
+            Create surface and run callbacks waiting for it
+            @param key as (album id as int, size as int, scale as int)
+            @param pixbuf as GdkPixbuf.Pixbuf or None
+        """
+        (album_id, size, scale) = key
+        if pixbuf is None:
+            self.cache_album_art(album_id)
+            surface = self.get_default_icon('folder-music-symbolic',
+                                            size,
+                                            scale)
+        else:
+            surface = Gdk.cairo_surface_create_from_pixbuf(pixbuf, scale, None)
+            del pixbuf
+        self.__add_surface(key, surface)
+        with self.__decode_lock:
+            callbacks = self.__decode_callbacks.pop(key, [])
+        for (callback, args) in callbacks:
+            callback(surface, *args)
+
     def __save_artwork_tags(self, data, album):
         """
             Save artwork in tags
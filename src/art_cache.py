@@ -0,0 +1,250 @@
+# Copyright (c) 2014-2016 Cedric Bellegarde <cedric.bellegarde@adishatz.org>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+from gi.repository import GLib
+
+from os import path, makedirs, listdir, remove, rename
+from hashlib import sha1
+from threading import Lock
+from shutil import rmtree
+from time import time
+import sqlite3
+
+from lollypop.sqlcursor import SqlCursor
+from lollypop.define import Lp
+
+
+class ArtCache:
+    """
+        Album artworks disk cache:
+            - Files are sharded in sub directories by hash prefix
+            - An index keeps size and last access time of files
+            - Least recently used files are removed when over budget
+    """
+    __LOCAL_PATH = GLib.get_home_dir() + "/.local/share/lollypop"
+    __DB_PATH = "%s/artcache.db" % __LOCAL_PATH
+    __ROOT = GLib.get_home_dir() + "/.cache/lollypop/albums"
+    # Do not write access time more often than this
+    __TOUCH_DELAY = 3600
+    __create_files = '''CREATE TABLE files (
+                            hash TEXT PRIMARY KEY,
+                            name TEXT NOT NULL,
+                            size INT NOT NULL,
+                            bytes INT NOT NULL,
+                            atime INT NOT NULL)'''
+    __create_files_name_idx = '''CREATE index idx_files_name ON
+                                                files(name)'''
+    __create_files_atime_idx = '''CREATE index idx_files_atime ON
+                                                files(atime)'''
+
+    def __init__(self):
+        """
+            Init cache
+        """
+        # Create db schema
+        try:
+            with SqlCursor(self) as sql:
+                sql.execute(self.__create_files)
+                sql.execute(self.__create_files_name_idx)
+                sql.execute(self.__create_files_atime_idx)
+                sql.commit()
+        except:
+            pass
+        self.__lock = Lock()
+        with SqlCursor(self) as sql:
+            result = sql.execute("SELECT SUM(bytes) FROM files")
+            v = result.fetchone()
+            self.__bytes = v[0] if v is not None and v[0] else 0
+
+    def get_path(self, name, size):
+        """
+            Get cache path for artwork, create shard directory if needed
+            @param name as str, see AlbumArt.get_album_cache_name()
+            @param size as int
+            @return path as str
+        """
+        key = self.__get_key(name, size)
+        directory = "%s/%s" % (self.__ROOT, key[:2])
+        if not path.exists(directory):
+            makedirs(directory, exist_ok=True)
+        return "%s/%s.jpg" % (directory, key)
+
+    def lookup(self, name, size):
+        """
+            Get cache path for artwork if cached
+            @param name as str
+            @param size as int
+            @return path as str or None
+            @thread safe
+        """
+        key = self.__get_key(name, size)
+        filepath = "%s/%s/%s.jpg" % (self.__ROOT, key[:2], key)
+        with SqlCursor(self) as sql:
+            result = sql.execute("SELECT atime FROM files WHERE hash=?",
+                                 (key,))
+            v = result.fetchone()
+            if v is None:
+                return None
+            if not path.exists(filepath):
+                self.__forget(sql, [key])
+                sql.commit()
+                return None
+            now = int(time())
+            if now - v[0] > self.__TOUCH_DELAY:
+                sql.execute("UPDATE files SET atime=? WHERE hash=?",
+                            (now, key))
+                sql.commit()
+        return filepath
+
+    def add(self, name, size):
+        """
+            Index artwork written at get_path(name, size)
+            Least recently used artworks are removed if over budget
+            @param name as str
+            @param size as int
+            @thread safe
+        """
+        key = self.__get_key(name, size)
+        filepath = "%s/%s/%s.jpg" % (self.__ROOT, key[:2], key)
+        try:
+            filebytes = path.getsize(filepath)
+        except Exception as e:
+            print("ArtCache::add():", e)
+            return
+        with SqlCursor(self) as sql:
+            self.__forget(sql, [key])
+            sql.execute("INSERT INTO files (hash, name, size, bytes, atime)\
+                         VALUES (?, ?, ?, ?, ?)",
+                        (key, name, size, filebytes, int(time())))
+            with self.__lock:
+                self.__bytes += filebytes
+            self.__evict(sql)
+            sql.commit()
+
+    def remove(self, name):
+        """
+            Remove all artworks for name
+            @param name as str
+            @thread safe
+        """
+        with SqlCursor(self) as sql:
+            result = sql.execute("SELECT hash FROM files WHERE name=?",
+                                 (name,))
+            keys = [row[0] for row in result]
+            self.__forget(sql, keys, True)
+            sql.commit()
+
+    def clear(self):
+        """
+            Remove all artworks
+        """
+        with SqlCursor(self) as sql:
+            sql.execute("DELETE FROM files")
+            sql.commit()
+        with self.__lock:
+            self.__bytes = 0
+        try:
+            rmtree(self.__ROOT)
+        except:
+            pass
+
+    def migrate(self, old_root):
+        """
+            Move artworks from old flat cache layout
+            (<name>_<size>.jpg) to shards
+            @param old_root as str
+        """
+        try:
+            filenames = listdir(old_root)
+        except Exception as e:
+            print("ArtCache::migrate():", e)
+            return
+        for filename in filenames:
+            if not filename.endswith(".jpg"):
+                continue
+            (name, sep, size) = filename[:-4].rpartition("_")
+            # Skip default icons, they stay in old root
+            if not sep or not size.isdigit() or name.endswith("-symbolic"):
+                continue
+            try:
+                rename("%s/%s" % (old_root, filename),
+                       self.get_path(name, int(size)))
+                self.add(name, int(size))
+            except Exception as e:
+                print("ArtCache::migrate():", e, ascii(filename))
+
+    def get_cursor(self):
+        """
+            Return a new sqlite cursor
+        """
+        try:
+            return sqlite3.connect(self.__DB_PATH, 600.0,
+                                   check_same_thread=False)
+        except:
+            exit(-1)
+
+#######################
+# PRIVATE             #
+#######################
+    def __get_key(self, name, size):
+        """
+            Get hash for artwork
+            @param name as str
+            @param size as int
+            @return str
+        """
+        return sha1(("%s_%s" % (name, size)).encode("utf-8")).hexdigest()
+
+    def __forget(self, sql, keys, delete=False):
+        """
+            Remove keys from index
+            @param sql as sqlite cursor
+            @param keys as [str]
+            @param delete as bool, also delete files
+        """
+        for key in keys:
+            result = sql.execute("SELECT bytes FROM files WHERE hash=?",
+                                 (key,))
+            v = result.fetchone()
+            if v is None:
+                continue
+            sql.execute("DELETE FROM files WHERE hash=?", (key,))
+            with self.__lock:
+                self.__bytes -= v[0]
+            if delete:
+                try:
+                    remove("%s/%s/%s.jpg" % (self.__ROOT, key[:2], key))
+                except:
+                    pass
+
+    def __evict(self, sql):
+        """
+            Remove least recently used artworks while over budget
+            @param sql as sqlite cursor
+        """
+        # Budget in MiB, 0 means no limit
+        budget = Lp().settings.get_value('cover-cache-size').get_int32()
+        if budget <= 0:
+            return
+        budget *= 1024 * 1024
+        with self.__lock:
+            excess = self.__bytes - budget
+        if excess <= 0:
+            return
+        keys = []
+        result = sql.execute("SELECT hash, bytes FROM files ORDER BY atime")
+        for (key, filebytes) in result:
+            if excess <= 0:
+                break
+            keys.append(key)
+            excess -= filebytes
+        self.__forget(sql, keys, True)
@@ -13,21 +13,33 @@
 from gi.repository import GLib, GObject, Gio
 
 from gettext import gettext as _
-from threading import Thread
+from threading import Thread, Event
+from queue import Queue, Full, Empty
+from collections import deque
 from time import time
 
 from lollypop.inotify import Inotify
 from lollypop.define import Lp
 from lollypop.sqlcursor import SqlCursor
-from lollypop.tagreader import TagReader
+from lollypop.tagreader import TagReader, Discoverer
+from lollypop.tagreader_native import NativeTagReader
 from lollypop.database_history import History
-from lollypop.utils import is_audio, is_pls, debug
+from lollypop.database_batch import DatabaseBatch
+from lollypop.database_manifest import Manifest
+from lollypop.utils import is_audio_type, is_pls_type, debug
+from lollypop.utils import get_fingerprint
 
 
 class CollectionScanner(GObject.GObject, TagReader):
     """
         Scan user music collection
+        Files are streamed from walker to tag readers and db writer
     """
+    # Files added to checkpoint at once
+    __CHECKPOINT_SIZE = 500
+    # Fingerprints set for old tracks after a scan, by commit and in total
+    __FINGERPRINTS_SIZE = 100
+    __FINGERPRINTS_MAX = 2000
     __gsignals__ = {
         'scan-finished': (GObject.SignalFlags.RUN_FIRST, None, ()),
         'artist-updated': (GObject.SignalFlags.RUN_FIRST, None, (int, bool)),
@@ -43,15 +55,29 @@ class CollectionScanner(GObject.GObject, TagReader):
         TagReader.__init__(self)
 
         self.__thread = None
+        self.__fingerprints_thread = None
         self.__history = None
+        # Embedded artworks found while scanning, by album id
+        self.__artworks = None
+        self.__scale = 1
+        # Files queued in batch, not yet removed from checkpoint
+        self.__queued_uris = []
+        # Scan counters, files found by walker, unchanged and handled files
+        self.__walked = 0
+        self.__skipped = 0
+        self.__handled = 0
+        self.__total = 0
+        self.__manifest = Manifest()
         if Lp().settings.get_value('auto-update'):
             self.__inotify = Inotify()
         else:
             self.__inotify = None
 
-    def update(self):
+    def update(self, notify=True, full=False):
         """
             Update database
+            @param notify as bool, notify user
+            @param full as bool, also rescan unchanged directories
         """
         if not self.is_locked():
             uris = Lp().settings.get_music_uris()
@@ -60,13 +86,30 @@ class CollectionScanner(GObject.GObject, TagReader):
 
             Lp().window.progress.add(self)
             Lp().window.progress.set_fraction(0.0, self)
+            self.__scale = Lp().window.get_scale_factor()
 
-            if Lp().notify is not None:
+            if notify and Lp().notify is not None:
                 Lp().notify.send(_("Your music is updating"))
-            self.__thread = Thread(target=self.__scan, args=(uris,))
+            self.__thread = Thread(target=self.__scan, args=(uris, full))
             self.__thread.daemon = True
             self.__thread.start()
 
+    def update_uris(self, uris):
+        """
+            Update database for changed files or directories only
+            @param uris as [str]
+            @return False if scanner is busy
+        """
+        if self.is_locked():
+            return False
+        Lp().window.progress.add(self)
+        Lp().window.progress.set_fraction(0.0, self)
+        self.__scale = Lp().window.get_scale_factor()
+        self.__thread = Thread(target=self.__scan_uris, args=(uris,))
+        self.__thread.daemon = True
+        self.__thread.start()
+        return True
+
     def clean_charts(self):
         """
             Clean charts in db
@@ -98,60 +141,303 @@ class CollectionScanner(GObject.GObject, TagReader):
         Lp().db.del_tracks(track_ids)
         self.stop()
 
-    def __get_objects_for_uris(self, uris):
+    def __walk(self, uris, manifest, dirs, ignore_dirs):
         """
-            Return all tracks/dirs for uris
-            @param uris as string
-            @return (track uri as [str], track dirs as [str],
-                     ignore dirs as [str])
+            Walk uris, audio files are returned as soon as found
+            Directories unchanged since manifest are not enumerated
+            @param uris as [str]
+            @param manifest as {uri as str: (parent as str,
+                                             mtime as int, count as int)}
+            @param dirs as {}, filled with walked dirs, manifest format
+            @param ignore_dirs as [], filled with empty root uris
+            @return generator of (uri as str, mtime as int),
+                    mtime is None for an unchanged directory
+            @thread safe
         """
-        tracks = []
-        ignore_dirs = []
-        track_dirs = list(uris)
-        walk_uris = list(uris)
+        walk_uris = deque([(uri, "") for uri in uris])
+        subdirs = {}
+        for (uri, (parent, mtime, count)) in manifest.items():
+            if parent in subdirs:
+                subdirs[parent].append(uri)
+            else:
+                subdirs[parent] = [uri]
         while walk_uris:
-            uri = walk_uris.pop(0)
-            empty = True
+            if self.__thread is None:
+                return
+            (uri, parent) = walk_uris.popleft()
             try:
                 d = Gio.File.new_for_uri(uri)
+                info = d.query_info('time::modified',
+                                    Gio.FileQueryInfoFlags.NONE,
+                                    None)
+                mtime = int(info.get_attribute_as_string('time::modified'))
+                d_uri = d.get_uri()
+                # Directory content unchanged, only walk subdirs
+                if d_uri in manifest and manifest[d_uri][1] == mtime:
+                    count = manifest[d_uri][2]
+                    dirs[d_uri] = (parent, mtime, count)
+                    for child_uri in subdirs.get(d_uri, []):
+                        walk_uris.append((child_uri, d_uri))
+                    if count == 0 and uri in uris:
+                        ignore_dirs.append(uri)
+                    yield (d_uri, None)
+                    continue
                 infos = d.enumerate_children(
-                    'standard::name,standard::type',
+                    'standard::name,standard::type,'
+                    'standard::content-type,time::modified',
                     Gio.FileQueryInfoFlags.NONE,
                     None)
             except Exception as e:
-                print("CollectionScanner::__get_objects_for_uris():", e)
+                print("CollectionScanner::__walk():", e)
                 continue
+            count = 0
             for info in infos:
                 f = infos.get_child(info)
                 child_uri = f.get_uri()
-                empty = False
+                count += 1
                 if info.get_file_type() == Gio.FileType.DIRECTORY:
-                    track_dirs.append(child_uri)
-                    walk_uris.append(child_uri)
+                    walk_uris.append((child_uri, d_uri))
                 else:
                     try:
-                        f = Gio.File.new_for_uri(child_uri)
-                        if is_pls(f):
+                        content_type = info.get_content_type()
+                        if is_pls_type(content_type):
                             pass
-                        elif is_audio(f):
-                            tracks.append(child_uri)
+                        elif is_audio_type(content_type):
+                            child_mtime = int(info.get_attribute_as_string(
+                                                            'time::modified'))
+                            yield (child_uri, child_mtime)
                         else:
                             debug("%s not detected as a music file" % uri)
                     except Exception as e:
-                        print("CollectionScanner::"
-                              "__get_objects_for_uris():", e)
+                        print("CollectionScanner::__walk():", e)
+            dirs[d_uri] = (parent, mtime, count)
             # If a root uri is empty
             # Ensure user is not doing something bad
-            if empty and uri in uris:
+            if count == 0 and uri in uris:
                 ignore_dirs.append(uri)
-        return (tracks, track_dirs, ignore_dirs)
 
-    def __update_progress(self, current, total):
+    def __walk_changed(self, uris, dirs):
+        """
+            Walk changed files/directories
+            @param uris as [str]
+            @param dirs as {}, filled with walked dirs, manifest format
+            @return generator of (uri as str, mtime as int)
+            @thread safe
+        """
+        for uri in uris:
+            try:
+                f = Gio.File.new_for_uri(uri)
+                info = f.query_info('standard::type,'
+                                    'standard::content-type,time::modified',
+                                    Gio.FileQueryInfoFlags.NONE,
+                                    None)
+            except:
+                # Deleted
+                continue
+            if info.get_file_type() == Gio.FileType.DIRECTORY:
+                yield from self.__walk([uri], {}, dirs, [])
+            elif is_audio_type(info.get_content_type()):
+                mtime = int(info.get_attribute_as_string('time::modified'))
+                yield (uri, mtime)
+
+    def __filter(self, walker, orig_tracks, mtimes, was_empty, held):
+        """
+            Get new/modified files found by walker
+            Files that may be moved tracks are held until walk is done
+            @param walker as generator, see __walk()
+            @param orig_tracks as set(str), tracks in db for walked uris,
+                   tracks found by walker are removed
+            @param mtimes as {uri as str: mtime as int}, tracks in db
+            @param was_empty as bool, True if db was empty
+            @param held as [], filled with held files
+            @return generator of (uri as str, mtime as int,
+                                  fingerprint as str or None)
+            @thread safe
+        """
+        # Files not added by an interrupted scan
+        pending = self.__manifest.get_pending()
+        children = {}
+        names = set()
+        for uri in orig_tracks:
+            (parent, name) = uri.rsplit('/', 1)
+            if parent in children:
+                children[parent].append(uri)
+            else:
+                children[parent] = [uri]
+            names.add(name)
+        checkpoint = []
+        for (uri, mtime) in walker:
+            # Tracks in unchanged directories are still valid
+            if mtime is None:
+                orig_tracks.difference_update(children.get(uri, []))
+                continue
+            self.__walked += 1
+            # If songs exists and mtime unchanged, continue,
+            # else rescan
+            if uri in orig_tracks:
+                orig_tracks.discard(uri)
+                if mtime <= mtimes[uri]:
+                    self.__skipped += 1
+                    if self.__skipped % 100 == 0:
+                        self.__set_progress()
+                    continue
+            # Keep mtime of interrupted scan
+            # On first scan, use modification time
+            # Else, use current time
+            if uri in pending:
+                mtime = pending.pop(uri)
+            elif not was_empty:
+                mtime = int(time())
+            checkpoint.append((uri, mtime))
+            if len(checkpoint) >= self.__CHECKPOINT_SIZE:
+                self.__manifest.add_pending(checkpoint)
+                checkpoint = []
+            # Same name as a track in db, wait for deleted tracks,
+            # may have been moved. Fingerprints are read by workers
+            if uri not in mtimes and uri.rsplit('/', 1)[1] in names:
+                held.append((uri, mtime, None))
+                continue
+            yield (uri, mtime, None)
+        # Resume interrupted scan, files may be in unchanged dirs
+        for (uri, mtime) in pending.items():
+            if uri not in mtimes:
+                self.__walked += 1
+                yield (uri, mtime, None)
+        self.__manifest.add_pending(checkpoint)
+
+    def __update_progress(self, current, total, rate=None):
         """
             Update progress bar status
             @param scanned items as int, total items as int
+            @param rate as float (tracks per second)
         """
         Lp().window.progress.set_fraction(current / total, self)
+        if rate is not None:
+            Lp().window.progress.set_text(_("%d tracks/s") % rate, self)
+
+    def __set_progress(self, rate=None):
+        """
+            Update progress bar from scan counters
+            @param rate as float (tracks per second)
+            @thread safe
+        """
+        total = max(self.__total, self.__walked, 1)
+        GLib.idle_add(self.__update_progress,
+                      min(self.__skipped + self.__handled, total),
+                      total, rate)
+
+    def __discover(self, items):
+        """
+            Read tags for items using a pool of discoverers
+            @param items as iterable of (uri as str, mtime as int,
+                                         fingerprint as str or None)
+            @return generator of (uri as str, mtime as int,
+                                  fingerprint as str,
+                                  info as GstPbutils.DiscovererInfo or
+                                          NativeInfo,
+                                  error as GLib.Error)
+            @thread safe
+        """
+        workers = max(1, Lp().settings.get_value('scan-workers').get_int32())
+        pending = Queue(workers * 4)
+        results = Queue(workers * 4)
+        cancel = Event()
+        errors = []
+        thread = Thread(target=self.__discover_feeder,
+                        args=(items, pending, workers, cancel, errors))
+        thread.daemon = True
+        thread.start()
+        for i in range(0, workers):
+            thread = Thread(target=self.__discover_worker,
+                            args=(pending, results, cancel))
+            thread.daemon = True
+            thread.start()
+        running = workers
+        try:
+            while running:
+                result = results.get()
+                if result is None:
+                    running -= 1
+                else:
+                    yield result
+            # Items are incomplete
+            if errors:
+                raise errors[0]
+        finally:
+            # Scan stopped, wait for workers
+            cancel.set()
+            while running:
+                if results.get() is None:
+                    running -= 1
+
+    def __discover_feeder(self, items, pending, workers, cancel, errors):
+        """
+            Push items to pending, then an end marker for each worker
+            @param items as iterable
+            @param pending as Queue
+            @param workers as int
+            @param cancel as threading.Event
+            @param errors as [], filled with items exception
+            @thread safe
+        """
+        try:
+            for item in items:
+                while not cancel.is_set():
+                    try:
+                        pending.put(item, timeout=1)
+                        break
+                    except Full:
+                        pass
+                if cancel.is_set():
+                    break
+        except Exception as e:
+            print("CollectionScanner::__discover_feeder():", e)
+            errors.append(e)
+        # On cancel, workers stop by themselves
+        for i in range(0, workers):
+            while not cancel.is_set():
+                try:
+                    pending.put(None, timeout=1)
+                    break
+                except Full:
+                    pass
+
+    def __discover_worker(self, pending, results, cancel):
+        """
+            Read tags for pending uris, push them to results
+            Each worker owns its discoverer
+            Native reader is tried first if enabled
+            @param pending as Queue
+            @param results as Queue
+            @param cancel as threading.Event
+            @thread safe
+        """
+        discoverer = Discoverer()
+        if Lp().settings.get_value('native-tagreader'):
+            native_reader = NativeTagReader()
+        else:
+            native_reader = None
+        while not cancel.is_set():
+            try:
+                item = pending.get(timeout=1)
+            except Empty:
+                continue
+            if item is None:
+                break
+            (uri, mtime, fingerprint) = item
+            try:
+                info = None
+                if native_reader is not None:
+                    info = native_reader.get_info(uri)
+                # Unknown format, let GStreamer handle it
+                if info is None:
+                    info = discoverer.get_info(uri)
+                if fingerprint is None:
+                    fingerprint = get_fingerprint(uri)
+                results.put((uri, mtime, fingerprint, info, None))
+            except GLib.GError as e:
+                results.put((uri, mtime, fingerprint, None, e))
+        results.put(None)
 
     def __finish(self):
         """
@@ -160,100 +446,213 @@ class CollectionScanner(GObject.GObject, TagReader):
         Lp().window.progress.set_fraction(1.0, self)
         self.stop()
         self.emit("scan-finished")
+        if self.__fingerprints_thread is None or\
+                not self.__fingerprints_thread.isAlive():
+            self.__fingerprints_thread = Thread(target=self.__set_fingerprints)
+            self.__fingerprints_thread.daemon = True
+            self.__fingerprints_thread.start()
         if Lp().settings.get_value('artist-artwork'):
             Lp().art.cache_artists_info()
 
-    def __scan(self, uris):
+    def __scan(self, uris, full):
         """
             Scan music collection for music files
             @param uris as [string], uris to scan
+            @param full as bool, forget manifest
             @thread safe
         """
-        gst_message = None
         if self.__history is None:
             self.__history = History()
+        # Files edited in place do not change their directory mtime
+        if full:
+            self.__manifest.clear()
         mtimes = Lp().tracks.get_mtimes()
-        (new_tracks, new_dirs, ignore_dirs) = self.__get_objects_for_uris(
-                                                                         uris)
-        orig_tracks = Lp().tracks.get_uris(ignore_dirs)
-        was_empty = len(orig_tracks) == 0
-
+        was_empty = len(mtimes) == 0
+        # Empty collection, ignore manifest, full scan needed
+        manifest = {} if was_empty else self.__manifest.get()
+        dirs = {}
+        ignore_dirs = []
+        walker = self.__walk(uris, manifest, dirs, ignore_dirs)
+        self.__update_db(walker, set(mtimes.keys()), mtimes, was_empty,
+                         dirs, ignore_dirs)
         if ignore_dirs:
             if Lp().notify is not None:
                 Lp().notify.send(_("Lollypop is detecting an empty folder."),
                                  _("Check your music settings."))
-        count = len(new_tracks) + len(orig_tracks)
         # Add monitors on dirs
         if self.__inotify is not None:
-            for d in new_dirs:
-                self.__inotify.add_monitor(d)
+            self.__inotify.add_monitors(dirs)
 
-        with SqlCursor(Lp().db) as sql:
-            i = 0
-            # Look for new files/modified files
+    def __scan_uris(self, uris):
+        """
+            Scan changed files/directories only
+            @param uris as [string]
+            @thread safe
+        """
+        if self.__history is None:
+            self.__history = History()
+        mtimes = Lp().tracks.get_mtimes()
+        orig_tracks = set()
+        for uri in uris:
+            # Tracks in db for this file or under this directory
+            orig_tracks.update(Lp().tracks.get_uris_under(uri))
+        dirs = {}
+        walker = self.__walk_changed(uris, dirs)
+        self.__update_db(walker, orig_tracks, mtimes, False, None, [])
+        if self.__inotify is not None:
+            self.__inotify.add_monitors(dirs)
+
+    def __update_db(self, walker, orig_tracks, mtimes, was_empty,
+                    dirs, ignore_dirs):
+        """
+            Add new/modified tracks to db while walking, remove deleted ones
+            @param walker as generator, see __walk()
+            @param orig_tracks as set(str), tracks in db for walked uris
+            @param mtimes as {uri as str: mtime as int}, tracks in db
+            @param was_empty as bool, True if db was empty
+            @param dirs as {uri as str: (parent as str,
+                                         mtime as int, count as int)},
+                   filled by walker, saved as manifest,
+                   None to keep current manifest
+            @param ignore_dirs as [str], filled by walker,
+                   tracks in those dirs are not removed
+            @thread safe
+        """
+        self.__total = len(orig_tracks)
+        self.__walked = 0
+        self.__skipped = 0
+        self.__handled = 0
+        held = []
+        added = {}
+        removed = []
+        with SqlCursor(Lp().db, False) as sql:
             try:
-                to_add = []
-                for uri in new_tracks:
-                    if self.__thread is None:
-                        return
-                    GLib.idle_add(self.__update_progress, i, count)
-                    f = Gio.File.new_for_uri(uri)
-                    info = f.query_info('time::modified',
-                                        Gio.FileQueryInfoFlags.NONE,
-                                        None)
-                    mtime = int(info.get_attribute_as_string('time::modified'))
-                    # If songs exists and mtime unchanged, continue,
-                    # else rescan
-                    if uri in orig_tracks:
-                        orig_tracks.remove(uri)
-                        i += 1
-                        if mtime <= mtimes[uri]:
-                            i += 1
-                            continue
-                        else:
-                            self.__del_from_db(uri)
-                    # On first scan, use modification time
-                    # Else, use current time
-                    if not was_empty:
-                        mtime = int(time())
-                    to_add.append((uri, mtime))
+                if Lp().settings.get_value('scan-artwork'):
+                    self.__artworks = {}
+                else:
+                    self.__artworks = None
+                self.__queued_uris = []
+                # Add new/modified files while walking
+                batch = DatabaseBatch(self.__on_batch_flushed)
+                items = self.__filter(walker, orig_tracks, mtimes,
+                                      was_empty, held)
+                if not self.__add_tracks(items, mtimes, dirs,
+                                         batch, removed, added):
+                    return
+                batch.flush()
+                # Now, previous versions of modified files can be cleaned
+                while removed:
+                    self.__clean_db(*removed.pop(0))
+                # Remaining tracks were not found by walker
+                deleted = []
+                for uri in orig_tracks:
+                    if uri.startswith('file:') and not [
+                            d for d in ignore_dirs if uri.startswith(d)]:
+                        deleted.append(uri)
+                # Moved files keep their tracks
+                (held, deleted) = self.__move_tracks(held, added, deleted)
+                self.__total = self.__skipped + self.__handled +\
+                    len(held) + len(deleted)
                 # Clean deleted files
                 # Now because we need to populate history
-                for uri in orig_tracks:
-                    i += 1
-                    GLib.idle_add(self.__update_progress, i, count)
-                    if uri.startswith('file:'):
-                        self.__del_from_db(uri)
-                # Add files to db
-                for (uri, mtime) in to_add:
-                    try:
-                        debug("Adding file: %s" % uri)
-                        i += 1
-                        GLib.idle_add(self.__update_progress, i, count)
-                        self.__add2db(uri, mtime)
-                    except GLib.GError as e:
-                        print("CollectionScanner::__scan:", e)
-                        if e.message != gst_message:
-                            gst_message = e.message
-                            if Lp().notify is not None:
-                                Lp().notify.send(gst_message)
+                for uri in deleted:
+                    self.__handled += 1
+                    self.__set_progress()
+                    self.__del_from_db(uri)
+                # Checkpoint: db is in sync with manifest, files not added
+                # yet are remembered, so next scan can resume from here
+                sql.commit()
+                if dirs is not None:
+                    self.__manifest.set(dirs)
+                # Add held files
+                batch = DatabaseBatch(self.__on_batch_flushed)
+                if not self.__add_tracks(held, mtimes, dirs, batch, removed):
+                    return
+                batch.flush()
                 sql.commit()
+                # Failed files are retried with their directory
+                self.__manifest.set_pending([])
+                if dirs is not None:
+                    self.__manifest.set(dirs)
             except Exception as e:
-                print("CollectionScanner::__scan()", e)
+                print("CollectionScanner::__update_db()", e)
+            finally:
+                # Scan stopped or failed: drop uncommitted changes, but
+                # clean albums of tracks deleted by committed batches
+                if removed:
+                    try:
+                        sql.rollback()
+                        for (album_id, artist_ids, genre_ids) in removed:
+                            self.__clean_db(album_id, artist_ids, genre_ids)
+                        sql.commit()
+                    except Exception as e:
+                        print("CollectionScanner::__update_db()", e)
         GLib.idle_add(self.__finish)
         del self.__history
         self.__history = None
+        self.__artworks = None
+
+    def __add_tracks(self, items, mtimes, dirs, batch, removed,
+                     new_files=None):
+        """
+            Read tags and add tracks to db
+            @param items as iterable of (uri as str, mtime as int,
+                                         fingerprint as str or None)
+            @param mtimes as {uri as str: mtime as int}, tracks in db
+            @param dirs as {uri as str: (parent as str,
+                                         mtime as int, count as int)},
+                   dirs with failed files are removed
+            @param batch as DatabaseBatch
+            @param removed as [], filled with previous versions of
+                   modified files, see __del_from_db()
+            @param new_files as {fingerprint as str: uri as str}, filled
+                   with new files
+            @return False if scan stopped
+            @thread safe
+        """
+        gst_message = None
+        start = time()
+        added = 0
+        for (uri, mtime, fingerprint,
+             info, error) in self.__discover(items):
+            if self.__thread is None:
+                return False
+            self.__handled += 1
+            added += 1
+            self.__set_progress(added / max(time() - start, 1))
+            if error is not None:
+                # Retry directory on next scan
+                parent = Gio.File.new_for_uri(uri).get_parent()
+                if parent is not None and dirs is not None:
+                    dirs.pop(parent.get_uri(), None)
+                print("CollectionScanner::__add_tracks:", error)
+                if error.message != gst_message:
+                    gst_message = error.message
+                    if Lp().notify is not None:
+                        Lp().notify.send(gst_message)
+                continue
+            try:
+                # Modified file, batch needs album: clean it later
+                if uri in mtimes:
+                    removed.append(self.__del_from_db(uri, False))
+                elif new_files is not None and fingerprint is not None:
+                    new_files[fingerprint] = uri
+                debug("Adding file: %s" % uri)
+                self.__add2db(uri, mtime, info, fingerprint, batch)
+            except GLib.GError as e:
+                print("CollectionScanner::__add_tracks:", e)
+        return True
 
-    def __add2db(self, uri, mtime):
+    def __add2db(self, uri, mtime, info, fingerprint, batch):
         """
             Add new file to db with informations
             @param uri as string
             @param mtime as int
-            @return track id as int
+            @param info as GstPbutils.DiscovererInfo or NativeInfo
+            @param fingerprint as str
+            @param batch as DatabaseBatch
         """
         f = Gio.File.new_for_uri(uri)
-        debug("CollectionScanner::add2db(): Read tags")
-        info = self.get_info(uri)
         tags = info.get_tags()
         name = f.get_basename()
         title = self.get_title(tags, name)
@@ -292,45 +691,152 @@ class CollectionScanner(GObject.GObject, TagReader):
         if amtime == 0:
             amtime = mtime
 
-        debug("CollectionScanner::add2db(): Add artists %s" % artists)
-        artist_ids = self.add_artists(artists, album_artists, a_sortnames)
+        debug("CollectionScanner::add2db(): Queue track %s" % uri)
+        self.__queued_uris.append(uri)
+        album_id = batch.add(title, uri, duration, tracknumber, discnumber,
+                             discname, year, track_pop, track_ltime, mtime,
+                             artists, a_sortnames, album_artists,
+                             aa_sortnames, album_name, album_pop, amtime,
+                             genres, fingerprint)
+        # Keep first embedded artwork, rendered once album is in db
+        if self.__artworks is not None and album_id not in self.__artworks:
+            data = self.get_artwork(tags)
+            if data is not None:
+                self.__artworks[album_id] = data
 
-        debug("CollectionScanner::add2db(): "
-              "Add album artists %s" % album_artists)
-        album_artist_ids = self.add_album_artists(album_artists, aa_sortnames)
-
-        new_artist_ids = list(set(album_artist_ids) | set(artist_ids))
+    def __on_batch_flushed(self, album_ids):
+        """
+            Update checkpoint and render artworks for albums written to db
+            @param album ids as set
+        """
+        self.__manifest.remove_pending(self.__queued_uris)
+        self.__queued_uris = []
+        if self.__artworks is None:
+            return
+        for album_id in album_ids:
+            data = self.__artworks.get(album_id, None)
+            if data is not None:
+                Lp().art.cache_album_artwork(album_id, data, self.__scale)
+                # Remember album, but do not keep data in memory
+                self.__artworks[album_id] = None
 
-        debug("CollectionScanner::add2db(): Add album: "
-              "%s, %s" % (album_name, album_artist_ids))
-        (album_id, new_album) = self.add_album(album_name, album_artist_ids,
-                                               uri, album_pop, amtime, False)
+    def __move_tracks(self, held, added, deleted):
+        """
+            Match new files with deleted tracks using fingerprints
+            Held files get deleted track uri, tags are not read again
+            Added files get deleted track popularity
+            @param held as [(uri as str, mtime as int,
+                             fingerprint as str or None)]
+            @param added as {fingerprint as str: uri as str}
+            @param deleted as [str]
+            @return (held to add as [(uri as str, mtime as int,
+                                      fingerprint as str or None)],
+                     deleted as [str])
+        """
+        # Nothing to match, do not read files
+        if not deleted or not (held or added):
+            return (held, deleted)
+        held = [(uri, mtime, get_fingerprint(uri)
+                 if fingerprint is None else fingerprint)
+                for (uri, mtime, fingerprint) in held]
+        fingerprints = set(added.keys())
+        fingerprints.update([fingerprint for (uri, mtime, fingerprint)
+                             in held if fingerprint is not None])
+        deleted_uris = set(deleted)
+        candidates = {}
+        for (uri, fingerprint) in Lp().tracks.get_uris_by_fingerprints(
+                                                        list(fingerprints)):
+            if uri in deleted_uris:
+                candidates.setdefault(fingerprint, []).append(uri)
+        if not candidates:
+            return (held, deleted)
+        remaining = []
+        moved = set()
+        album_ids = set()
+        for (uri, mtime, fingerprint) in held:
+            old_uris = candidates.get(fingerprint, [])
+            if old_uris:
+                old_uri = old_uris.pop()
+                debug("Moving file: %s -> %s" % (old_uri, uri))
+                moved.add(old_uri)
+                album_ids.add(self.__move_in_db(old_uri, uri))
+            else:
+                remaining.append((uri, mtime, fingerprint))
+        # Moved and renamed files, already added with their new name
+        for (fingerprint, old_uris) in candidates.items():
+            if old_uris and fingerprint in added:
+                self.__move_stats(old_uris.pop(), added[fingerprint])
+        with SqlCursor(Lp().db, False) as sql:
+            sql.commit()
+        for album_id in album_ids:
+            GLib.idle_add(self.emit, 'album-updated', album_id, False)
+        return (remaining, [uri for uri in deleted if uri not in moved])
 
-        genre_ids = self.add_genres(genres, album_id)
+    def __move_stats(self, uri, new_uri):
+        """
+            Give track popularity and playlists to its new version
+            @param uri as str
+            @param new uri as str
+            @warning: commit needed
+        """
+        debug("Moving stats: %s -> %s" % (uri, new_uri))
+        track_id = Lp().tracks.get_id_by_uri(uri)
+        new_track_id = Lp().tracks.get_id_by_uri(new_uri)
+        Lp().tracks.set_popularity(new_track_id,
+                                   Lp().tracks.get_popularity(track_id))
+        Lp().tracks.set_listened_at(new_track_id,
+                                    Lp().tracks.get_ltime(track_id))
+        Lp().playlists.set_moved_uri(uri, new_uri)
 
-        # Add track to db
-        debug("CollectionScanner::add2db(): Add track")
-        track_id = Lp().tracks.add(title, uri, duration,
-                                   tracknumber, discnumber, discname,
-                                   album_id, year, track_pop,
-                                   track_ltime, mtime)
+    def __move_in_db(self, uri, new_uri):
+        """
+            Update track uri in db
+            @param uri as str
+            @param new uri as str
+            @return album id as int
+            @warning: commit needed
+        """
+        track_id = Lp().tracks.get_id_by_uri(uri)
+        album_id = Lp().tracks.get_album_id(track_id)
+        Lp().tracks.set_moved_uri(track_id, new_uri)
+        Lp().playlists.set_moved_uri(uri, new_uri)
+        parent = Gio.File.new_for_uri(new_uri).get_parent()
+        if parent is not None:
+            Lp().albums.set_uri(album_id, parent.get_uri())
+        return album_id
 
-        debug("CollectionScanner::add2db(): Update tracks")
-        self.update_track(track_id, artist_ids, genre_ids)
-        self.update_album(album_id, album_artist_ids, genre_ids, year)
-        if new_album:
-            with SqlCursor(Lp().db) as sql:
+    def __set_fingerprints(self):
+        """
+            Set fingerprints for tracks added by previous versions
+            Run after a scan, at most __FINGERPRINTS_MAX files,
+            stop if a new scan starts
+            @thread safe
+        """
+        count = 0
+        while count < self.__FINGERPRINTS_MAX:
+            uris = Lp().tracks.get_uris_without_fingerprint(
+                                                    self.__FINGERPRINTS_SIZE)
+            if not uris:
+                return
+            fingerprints = {}
+            for uri in uris:
+                if self.is_locked():
+                    return
+                # Do not read unreadable files again
+                fingerprint = get_fingerprint(uri)
+                fingerprints[uri] = "" if fingerprint is None else fingerprint
+            with SqlCursor(Lp().db, False) as sql:
+                Lp().tracks.set_fingerprints(fingerprints)
                 sql.commit()
-        for genre_id in genre_ids:
-            GLib.idle_add(self.emit, 'genre-updated', genre_id, True)
-        for artist_id in new_artist_ids:
-            GLib.idle_add(self.emit, 'artist-updated', artist_id, True)
-        return track_id
+            count += len(uris)
 
-    def __del_from_db(self, uri):
+    def __del_from_db(self, uri, clean=True):
         """
             Delete track from db
             @param uri as str
+            @param clean as bool, if False, album/artists/genres are kept
+            @return (album id as int, artist ids as [int],
+                     genre ids as [int]), see __clean_db()
         """
         f = Gio.File.new_for_uri(uri)
         name = f.get_basename()
@@ -350,12 +856,24 @@ class CollectionScanner(GObject.GObject, TagReader):
         Lp().playlists.remove(uri)
         Lp().tracks.remove(track_id)
         Lp().tracks.clean(track_id)
+        if clean:
+            self.__clean_db(album_id, album_artist_ids + artist_ids,
+                            genre_ids)
+        return (album_id, album_artist_ids + artist_ids, genre_ids)
+
+    def __clean_db(self, album_id, artist_ids, genre_ids):
+        """
+            Remove album/artists/genres without tracks
+            @param album id as int
+            @param artist ids as [int]
+            @param genre ids as [int]
+        """
         deleted = Lp().albums.clean(album_id)
         if deleted:
-            with SqlCursor(Lp().db) as sql:
+            with SqlCursor(Lp().db, False) as sql:
                 sql.commit()
             GLib.idle_add(self.emit, 'album-updated', album_id, True)
-        for artist_id in album_artist_ids + artist_ids:
+        for artist_id in artist_ids:
             Lp().artists.clean(artist_id)
             GLib.idle_add(self.emit, 'artist-updated', artist_id, False)
         for genre_id in genre_ids:
@@ -15,6 +15,7 @@ from gi.repository import Gtk, Gio, GLib
 from gettext import gettext as _
 
 from lollypop.define import Lp, Type
+from lollypop.objects import Album
 from lollypop.loader import Loader
 from lollypop.selectionlist import SelectionList
 from lollypop.view_container import ViewContainer
@@ -63,16 +64,17 @@ class Container:
         Lp().playlists.connect('playlists-changed',
                                self.__update_playlists)
 
-    def update_db(self):
+    def update_db(self, full=False):
         """
             Update db at startup only if needed
+            @param full as bool, also rescan unchanged directories
         """
         # Stop previous scan
         if Lp().scanner.is_locked():
             Lp().scanner.stop()
-            GLib.timeout_add(250, self.update_db)
+            GLib.timeout_add(250, self.update_db, full)
         else:
-            Lp().scanner.update()
+            Lp().scanner.update(full=full)
 
     def get_genre_id(self):
         """
@@ -526,7 +528,7 @@ class Container:
                 if artist_ids and artist_ids[0] == Type.COMPILATIONS:
                     albums += Lp().albums.get_compilation_ids(genre_ids)
                 albums += Lp().albums.get_ids(artist_ids, genre_ids)
-            return albums
+            return Album.load_many(albums, genre_ids)
         from lollypop.view_artist import ArtistView
         self.__stop_current_view()
         view = ArtistView(artist_ids, genre_ids)
@@ -564,7 +566,7 @@ class Container:
                     albums = Lp().albums.get_compilation_ids(genre_ids)
                 if not is_compilation:
                     albums += Lp().albums.get_ids([], genre_ids)
-            return albums
+            return Album.load_many(albums, genre_ids)
 
         from lollypop.view_albums import AlbumsView
         self.__stop_current_view()
@@ -13,12 +13,14 @@
 from gi.repository import GLib, Gio
 
 import sqlite3
+from urllib.request import pathname2url
 
-from lollypop.define import Lp
+from lollypop.define import Lp, Type
 from lollypop.objects import Album
 from lollypop.database_upgrade import DatabaseUpgrade
 from lollypop.sqlcursor import SqlCursor
-from lollypop.localized import LocalizedCollation
+from lollypop.localized import LocalizedCollation, get_sortkey
+from lollypop.localized import get_collate_locale
 from lollypop.utils import noaccents
 
 
@@ -28,6 +30,9 @@ class Database:
     """
     _LOCAL_PATH = GLib.get_home_dir() + "/.local/share/lollypop"
     DB_PATH = "%s/lollypop.db" % _LOCAL_PATH
+    # Requests are built dynamically, keep many of them prepared
+    __CACHED_STATEMENTS = 512
+    __READER_TIMEOUT = 10.0
 
     # SQLite documentation:
     # In SQLite, a column with type INTEGER PRIMARY KEY
@@ -41,10 +46,12 @@ class Database:
                                               uri TEXT NOT NULL,
                                               popularity INT NOT NULL,
                                               synced INT NOT NULL,
-                                              mtime INT NOT NULL)'''
+                                              mtime INT NOT NULL,
+                                              sortkey BLOB)'''
     __create_artists = '''CREATE TABLE artists (id INTEGER PRIMARY KEY,
                                                name TEXT NOT NULL,
-                                               sortname TEXT NOT NULL)'''
+                                               sortname TEXT NOT NULL,
+                                               sortkey BLOB)'''
     __create_genres = '''CREATE TABLE genres (id INTEGER PRIMARY KEY,
                                             name TEXT NOT NULL)'''
     __create_album_artists = '''CREATE TABLE album_artists (
@@ -66,7 +73,8 @@ class Database:
                                               ltime INT NOT NULL,
                                               mtime INT NOT NULL,
                                               persistent INT NOT NULL
-                                              DEFAULT 1)'''
+                                              DEFAULT 1,
+                                              fingerprint TEXT)'''
     __create_track_artists = '''CREATE TABLE track_artists (
                                                 track_id INT NOT NULL,
                                                 artist_id INT NOT NULL)'''
@@ -81,11 +89,47 @@ class Database:
                                                 album_id)'''
     __create_track_genres_idx = '''CREATE index idx_tg ON track_genres(
                                                 track_id)'''
+    __create_albums_sortkey_idx = '''CREATE index idx_albums_sortkey ON
+                                                albums(sortkey)'''
+    __create_artists_sortkey_idx = '''CREATE index idx_artists_sortkey ON
+                                                artists(sortkey)'''
+    __create_album_artists_artist_idx = '''CREATE index idx_aa_artist ON
+                                        album_artists(artist_id, album_id)'''
+    __create_album_genres_genre_idx = '''CREATE index idx_ag_genre ON
+                                        album_genres(genre_id, album_id)'''
+    __create_tracks_album_idx = '''CREATE index idx_tracks_album ON
+                                tracks(album_id, discnumber, tracknumber)'''
+    __create_tracks_uri_idx = '''CREATE index idx_tracks_uri ON
+                                                tracks(uri)'''
+    __create_tracks_fingerprint_idx = '''CREATE index idx_tracks_fingerprint
+                                                ON tracks(fingerprint)'''
+    __create_albums_uri_idx = '''CREATE index idx_albums_uri ON
+                                                albums(uri)'''
+    __create_artists_name_idx = '''CREATE index idx_artists_name ON
+                                                artists(name COLLATE NOCASE)'''
+    # Full text search index, names are stored without accents
+    __FTS_TABLES = ["tracks", "albums", "artists"]
+    __create_fts = '''CREATE VIRTUAL TABLE %s_fts USING fts5(name)'''
+    __create_fts_insert = '''CREATE TRIGGER %s_fts_insert
+                             AFTER INSERT ON %s BEGIN
+                                INSERT INTO %s_fts (rowid, name)
+                                VALUES (new.rowid, noaccents(new.name));
+                             END'''
+    __create_fts_update = '''CREATE TRIGGER %s_fts_update
+                             AFTER UPDATE OF name ON %s BEGIN
+                                UPDATE %s_fts SET name=noaccents(new.name)
+                                WHERE rowid=old.rowid;
+                             END'''
+    __create_fts_delete = '''CREATE TRIGGER %s_fts_delete
+                             AFTER DELETE ON %s BEGIN
+                                DELETE FROM %s_fts WHERE rowid=old.rowid;
+                             END'''
 
     def __init__(self):
         """
             Create database tables or manage update if needed
         """
+        self.__has_fts = None
         f = Gio.File.new_for_path(self.DB_PATH)
         if not f.query_exists():
             db_version = Lp().settings.get_value('db-version').get_int32()
@@ -95,7 +139,7 @@ class Database:
                 if not d.query_exists():
                     d.make_directory_with_parents()
                 # Create db schema
-                with SqlCursor(self) as sql:
+                with SqlCursor(self, False) as sql:
                     sql.execute(self.__create_albums)
                     sql.execute(self.__create_artists)
                     sql.execute(self.__create_genres)
@@ -108,7 +152,17 @@ class Database:
                     sql.execute(self.__create_track_artists_idx)
                     sql.execute(self.__create_album_genres_idx)
                     sql.execute(self.__create_track_genres_idx)
+                    sql.execute(self.__create_albums_sortkey_idx)
+                    sql.execute(self.__create_artists_sortkey_idx)
+                    sql.execute(self.__create_album_artists_artist_idx)
+                    sql.execute(self.__create_album_genres_genre_idx)
+                    sql.execute(self.__create_tracks_album_idx)
+                    sql.execute(self.__create_tracks_uri_idx)
+                    sql.execute(self.__create_tracks_fingerprint_idx)
+                    sql.execute(self.__create_albums_uri_idx)
+                    sql.execute(self.__create_artists_name_idx)
                     sql.commit()
+                    self.create_fts()
                     Lp().settings.set_value('db-version',
                                             GLib.Variant('i', upgrade.count()))
             except Exception as e:
@@ -125,13 +179,121 @@ class Database:
             upgrade.do_db_upgrade()
             Lp().settings.set_value('db-version',
                                     GLib.Variant('i', upgrade.count()))
+        self.__has_fts = None
+        # Developer check, hot requests must use an index
+        if Lp().debug is True:
+            self.check_query_plans()
+
+    def update_sortkeys(self, force=False):
+        """
+            Rebuild artists/albums sort keys if collation locale changed
+            @param force as bool
+        """
+        current = get_collate_locale()
+        previous = Lp().settings.get_value('sortkey-locale').get_string()
+        if previous == current and not force:
+            return
+        with SqlCursor(self, False) as sql:
+            result = sql.execute("SELECT rowid, sortname FROM artists")
+            sql.executemany("UPDATE artists SET sortkey=? WHERE rowid=?",
+                            [(get_sortkey(sortname), rowid)
+                             for (rowid, sortname) in list(result)])
+            result = sql.execute("SELECT rowid, name FROM albums")
+            sql.executemany("UPDATE albums SET sortkey=? WHERE rowid=?",
+                            [(get_sortkey(name), rowid)
+                             for (rowid, name) in list(result)])
+            sql.commit()
+        Lp().settings.set_value('sortkey-locale', GLib.Variant('s', current))
+
+    def create_fts(self):
+        """
+            Create full text search index for tracks, albums and artists
+            Index is populated from current names and kept in sync by triggers
+        """
+        with SqlCursor(self, False) as sql:
+            try:
+                for table in self.__FTS_TABLES:
+                    sql.execute(self.__create_fts % table)
+                    sql.execute(self.__create_fts_insert % ((table,) * 3))
+                    sql.execute(self.__create_fts_update % ((table,) * 3))
+                    sql.execute(self.__create_fts_delete % ((table,) * 3))
+                    sql.execute("INSERT INTO %s_fts (rowid, name)\
+                                 SELECT rowid, noaccents(name)\
+                                 FROM %s" % (table, table))
+                sql.commit()
+            except Exception as e:
+                # SQLite built without FTS5, search will scan tables
+                print("Database::create_fts():", e)
+        self.__has_fts = None
 
-    def get_cursor(self):
+    @property
+    def has_fts(self):
+        """
+            True if full text search index is available
+            @return bool
+        """
+        if self.__has_fts is None:
+            with SqlCursor(self) as sql:
+                result = sql.execute("SELECT COUNT(*) FROM sqlite_master\
+                                      WHERE type='table'\
+                                      AND name='tracks_fts'")
+                self.__has_fts = result.fetchone()[0] != 0
+        return self.__has_fts
+
+    def check_query_plans(self):
+        """
+            Check hot requests never scan a whole table
+            @return requests doing a full table scan as [str]
+        """
+        requests = [(Lp().tracks.ID_BY_URI, ("",)),
+                    (Lp().tracks.URIS_UNDER, ("", "/", "/")),
+                    (Lp().albums.ID_BY_URI, ("",)),
+                    (Lp().artists.ID_BY_NAME, ("",)),
+                    Lp().albums.get_track_ids_request(0, [], []),
+                    Lp().albums.get_track_ids_request(0, [0], [0]),
+                    Lp().albums.get_ids_request([0], []),
+                    Lp().albums.get_ids_request([], [0]),
+                    Lp().albums.get_ids_request([0], [0])]
+        if self.has_fts:
+            for helper in [Lp().tracks, Lp().albums, Lp().artists]:
+                requests.append((helper.SEARCH_FTS, ("", Type.CHARTS)))
+        scans = []
+        with SqlCursor(self) as sql:
+            for (request, filters) in requests:
+                result = sql.execute("EXPLAIN QUERY PLAN " + request,
+                                     filters)
+                for row in result:
+                    # Last column is plan detail, a covering index scan
+                    # still reads every row, only FTS MATCH may scan
+                    detail = row[-1]
+                    if detail.startswith("SCAN") and\
+                            "VIRTUAL TABLE" not in detail:
+                        scans.append(request)
+                        print("Database::check_query_plans(): %s: %s" %
+                              (" ".join(request.split()), detail))
+                        break
+        return scans
+
+    def get_cursor(self, readonly=False):
         """
             Return a new sqlite cursor
+            @param readonly as bool
         """
         try:
-            c = sqlite3.connect(self.DB_PATH, 600.0)
+            if readonly:
+                # With WAL, readers never wait for the scanner
+                c = sqlite3.connect("file:%s?mode=ro" %
+                                    pathname2url(self.DB_PATH),
+                                    self.__READER_TIMEOUT,
+                                    cached_statements=self.__CACHED_STATEMENTS,
+                                    check_same_thread=False,
+                                    uri=True)
+            else:
+                c = sqlite3.connect(self.DB_PATH, 600.0,
+                                    cached_statements=self.__CACHED_STATEMENTS,
+                                    check_same_thread=False)
+                c.execute("PRAGMA journal_mode=WAL")
+                c.execute("PRAGMA synchronous=NORMAL")
             c.create_collation('LOCALIZED', LocalizedCollation())
             c.create_function("noaccents", 1, noaccents)
             return c
@@ -143,7 +305,7 @@ class Database:
             Delete tracks from db
             @param track_ids as [int]
         """
-        with SqlCursor(self) as sql:
+        with SqlCursor(self, False) as sql:
             all_album_ids = []
             all_artist_ids = []
             all_genre_ids = []
@@ -15,14 +15,25 @@ import itertools
 
 from lollypop.sqlcursor import SqlCursor
 from lollypop.define import Lp, Type, OrderBy
-from lollypop.utils import remove_static_genres, noaccents
+from lollypop.utils import remove_static_genres, noaccents, get_fts_query
 from lollypop.utils import get_network_available
+from lollypop.localized import get_sortkey
+from lollypop.objects import Album
 
 
 class AlbumsDatabase:
     """
         Albums database helper
     """
+    # Hot requests, see Database.check_query_plans()
+    ID_BY_URI = "SELECT rowid FROM albums WHERE uri=?"
+    SEARCH_FTS = "SELECT albums.rowid\
+                  FROM albums_fts, albums, album_genres\
+                  WHERE albums_fts MATCH ?\
+                  AND albums.rowid=albums_fts.rowid\
+                  AND album_genres.genre_id!=?\
+                  AND album_genres.album_id=albums.rowid\
+                  ORDER BY albums_fts.rank"
 
     def __init__(self):
         """
@@ -43,10 +54,11 @@ class AlbumsDatabase:
         with SqlCursor(Lp().db) as sql:
             result = sql.execute("INSERT INTO albums\
                                   (name, no_album_artist,\
-                                  uri, popularity, mtime, synced)\
-                                  VALUES (?, ?, ?, ?, ?, ?)",
+                                  uri, popularity, mtime, synced, sortkey)\
+                                  VALUES (?, ?, ?, ?, ?, ?, ?)",
                                  (name, artist_ids == [],
-                                  uri, popularity, mtime, 0))
+                                  uri, popularity, mtime, 0,
+                                  get_sortkey(name)))
             for artist_id in artist_ids:
                 sql.execute("INSERT INTO album_artists\
                              (album_id, artist_id)\
@@ -107,6 +119,7 @@ class AlbumsDatabase:
                     sql.execute("INSERT INTO album_artists\
                                 (album_id, artist_id)\
                                 VALUES (?, ?)", (album_id, artist_id))
+                Album.CACHE.remove(album_id)
 
     def set_synced(self, album_id, synced):
         """
@@ -118,6 +131,7 @@ class AlbumsDatabase:
         with SqlCursor(Lp().db) as sql:
             sql.execute("UPDATE albums SET synced=? WHERE rowid=?",
                         (synced, album_id))
+        Album.CACHE.remove(album_id)
 
     def set_year(self, album_id, year):
         """
@@ -129,6 +143,7 @@ class AlbumsDatabase:
         with SqlCursor(Lp().db) as sql:
             sql.execute("UPDATE albums SET year=? WHERE rowid=?",
                         (year, album_id))
+        Album.CACHE.remove(album_id)
 
     def set_uri(self, album_id, uri):
         """
@@ -139,6 +154,7 @@ class AlbumsDatabase:
         with SqlCursor(Lp().db) as sql:
             sql.execute("UPDATE albums SET uri=? WHERE rowid=?",
                         (uri, album_id))
+        Album.CACHE.remove(album_id)
 
     def set_popularity(self, album_id, popularity, commit=False):
         """
@@ -147,7 +163,7 @@ class AlbumsDatabase:
             @param popularity as int
             @param commit as bool
         """
-        with SqlCursor(Lp().db) as sql:
+        with SqlCursor(Lp().db, False) as sql:
             try:
                 sql.execute("UPDATE albums set popularity=? WHERE rowid=?",
                             (popularity, album_id))
@@ -195,6 +211,44 @@ class AlbumsDatabase:
                 return v[0]
             return 0
 
+    def get_many(self, album_ids):
+        """
+            Get albums attributes, one query by table for all albums
+            @param album_ids as [int]
+            @return {album id as int: {attribute as str: value}}
+        """
+        albums = {}
+        with SqlCursor(Lp().db) as sql:
+            # Stay under SQLite variables limit
+            for i in range(0, len(album_ids), 500):
+                ids = tuple(album_ids[i:i+500])
+                placeholders = ",".join("?" * len(ids))
+                result = sql.execute("SELECT rowid, name, year, uri,\
+                                      mtime, synced\
+                                      FROM albums\
+                                      WHERE rowid IN (%s)" % placeholders,
+                                     ids)
+                for (album_id, name, year, uri, mtime, synced) in result:
+                    albums[album_id] = {"name": name,
+                                        "year": str(year) if year else "",
+                                        "uri": uri,
+                                        "mtime": mtime,
+                                        "synced": synced,
+                                        "artists": [],
+                                        "artist_ids": []}
+                result = sql.execute("SELECT album_artists.album_id,\
+                                      album_artists.artist_id, artists.name\
+                                      FROM album_artists, artists\
+                                      WHERE album_artists.album_id IN (%s)\
+                                      AND album_artists.artist_id=\
+                                      artists.rowid\
+                                      ORDER BY album_artists.rowid" %
+                                     placeholders, ids)
+                for (album_id, artist_id, artist) in result:
+                    albums[album_id]["artist_ids"].append(artist_id)
+                    albums[album_id]["artists"].append(artist)
+        return albums
+
     def get_popularity(self, album_id):
         """
             Get popularity
@@ -216,7 +270,7 @@ class AlbumsDatabase:
             @param int
             @raise sqlite3.OperationalError on db update
         """
-        with SqlCursor(Lp().db) as sql:
+        with SqlCursor(Lp().db, False) as sql:
             result = sql.execute("SELECT popularity from albums WHERE rowid=?",
                                  (album_id,))
             pop = result.fetchone()
@@ -530,31 +584,43 @@ class AlbumsDatabase:
             genre_ids = []
         if not self.__has_artists(album_id):
             artist_ids = []
+        (request, filters) = self.get_track_ids_request(album_id, genre_ids,
+                                                        artist_ids)
         with SqlCursor(Lp().db) as sql:
-            filters = (album_id,)
-            request = "SELECT DISTINCT tracks.rowid\
-                       FROM tracks"
-            if genre_ids:
-                request += ", track_genres"
-                filters += tuple(genre_ids)
-            if artist_ids:
-                request += ", track_artists"
-                filters += tuple(artist_ids)
-            request += " WHERE album_id=? "
-            if genre_ids:
-                request += "AND track_genres.track_id=tracks.rowid AND ("
-                for genre_id in genre_ids:
-                    request += "track_genres.genre_id=? OR "
-                request += "1=0)"
-            if artist_ids:
-                request += "AND track_artists.track_id=tracks.rowid AND ("
-                for artist_id in artist_ids:
-                    request += "track_artists.artist_id=? OR "
-                request += "1=0)"
-            request += " ORDER BY discnumber, tracknumber"
             result = sql.execute(request, filters)
             return list(itertools.chain(*result))
 
+    def get_track_ids_request(self, album_id, genre_ids, artist_ids):
+        """
+            Get request for get_track_ids()
+            @param album id as int
+            @param genre ids as [int]
+            @param artist_ids as [int]
+            @return (request as str, filters as tuple)
+        """
+        filters = (album_id,)
+        request = "SELECT DISTINCT tracks.rowid\
+                   FROM tracks"
+        if genre_ids:
+            request += ", track_genres"
+            filters += tuple(genre_ids)
+        if artist_ids:
+            request += ", track_artists"
+            filters += tuple(artist_ids)
+        request += " WHERE album_id=? "
+        if genre_ids:
+            request += "AND track_genres.track_id=tracks.rowid AND ("
+            for genre_id in genre_ids:
+                request += "track_genres.genre_id=? OR "
+            request += "1=0)"
+        if artist_ids:
+            request += "AND track_artists.track_id=tracks.rowid AND ("
+            for artist_id in artist_ids:
+                request += "track_artists.artist_id=? OR "
+            request += "1=0)"
+        request += " ORDER BY discnumber, tracknumber"
+        return (request, filters)
+
     def get_track_uris(self, album_id, genre_ids, artist_ids):
         """
             Get track uris for album id/disc
@@ -645,10 +711,7 @@ class AlbumsDatabase:
             @return id as int
         """
         with SqlCursor(Lp().db) as sql:
-            result = sql.execute("SELECT rowid\
-                                  FROM albums\
-                                  WHERE uri=?",
-                                 (uri,))
+            result = sql.execute(self.ID_BY_URI, (uri,))
             v = result.fetchone()
             if v is not None:
                 return v[0]
@@ -661,95 +724,83 @@ class AlbumsDatabase:
             @param genre ids as [int]
             @return Array of album ids as int
         """
+        (request, filters) = self.get_ids_request(artist_ids, genre_ids)
+        with SqlCursor(Lp().db) as sql:
+            result = sql.execute(request, filters)
+            return list(itertools.chain(*result))
+
+    def get_ids_request(self, artist_ids, genre_ids):
+        """
+            Get request for get_ids()
+            @param artist ids as [int]
+            @param genre ids as [int]
+            @return (request as str, filters as tuple)
+        """
         genre_ids = remove_static_genres(genre_ids)
         orderby = Lp().settings.get_enum('orderby')
         if genre_ids and genre_ids[0] == Type.CHARTS:
             order = " ORDER BY albums.id DESC"
         elif orderby == OrderBy.ARTIST:
-            order = " ORDER BY artists.sortname\
-                     COLLATE NOCASE COLLATE LOCALIZED,\
+            order = " ORDER BY artists.sortkey,\
                      albums.year,\
-                     albums.name\
-                     COLLATE NOCASE COLLATE LOCALIZED"
+                     albums.sortkey"
         elif orderby == OrderBy.NAME:
-            order = " ORDER BY albums.name\
-                     COLLATE NOCASE COLLATE LOCALIZED"
+            order = " ORDER BY albums.sortkey"
         elif orderby == OrderBy.YEAR:
             order = " ORDER BY albums.year,\
-                     albums.name\
-                     COLLATE NOCASE COLLATE LOCALIZED"
+                     albums.sortkey"
         else:
             order = " ORDER BY albums.popularity DESC,\
-                     albums.name\
-                     COLLATE NOCASE COLLATE LOCALIZED"
+                     albums.sortkey"
 
-        with SqlCursor(Lp().db) as sql:
-            result = []
-            # Get albums for all artists
-            if not artist_ids and not genre_ids:
-                filters = (Type.CHARTS,)
-                request = "SELECT DISTINCT albums.rowid\
-                           FROM albums, artists, album_artists, album_genres\
-                           WHERE artists.rowid=album_artists.artist_id\
-                           AND album_genres.genre_id!=?\
-                           AND album_genres.album_id=albums.rowid\
-                           AND albums.rowid=album_artists.album_id"
-                if not get_network_available():
-                    request += " AND albums.synced!=%s" % Type.NONE
-                request += order
-                result = sql.execute(request, filters)
-            # Get albums for genre
-            elif not artist_ids:
-                filters = tuple(genre_ids)
-                request = "SELECT DISTINCT albums.rowid FROM albums,\
-                           album_genres, artists, album_artists\
-                           WHERE artists.rowid=album_artists.artist_id\
-                           AND albums.rowid=album_artists.album_id\
-                           AND album_genres.album_id=albums.rowid AND ("
-                for genre_id in genre_ids:
-                    request += "album_genres.genre_id=? OR "
-                request += "1=0)"
-                if not get_network_available():
-                    request += " AND albums.synced!=%s" % Type.NONE
-                request += order
-                result = sql.execute(request, filters)
-            # Get albums for artist
-            elif not genre_ids:
-                filters = (Type.CHARTS,)
-                filters += tuple(artist_ids)
-                request = "SELECT DISTINCT albums.rowid\
-                           FROM albums, artists, album_artists, album_genres\
-                           WHERE artists.rowid=album_artists.artist_id\
-                           AND album_genres.genre_id!=?\
-                           AND album_genres.album_id=albums.rowid\
-                           AND album_artists.album_id=albums.rowid AND ("
-                for artist_id in artist_ids:
-                    request += "album_artists.artist_id=? OR "
-                request += "1=0)"
-                if not get_network_available():
-                    request += " AND albums.synced!=%s" % Type.NONE
-                request += order
-                result = sql.execute(request, filters)
-            # Get albums for artist id and genre id
-            else:
-                filters = tuple(artist_ids)
-                filters += tuple(genre_ids)
-                request = "SELECT DISTINCT albums.rowid\
-                           FROM albums, album_genres, artists, album_artists\
-                           WHERE album_genres.album_id=albums.rowid AND\
-                           artists.rowid=album_artists.artist_id AND\
-                           album_artists.album_id=albums.rowid AND ("
-                for artist_id in artist_ids:
-                    request += "album_artists.artist_id=? OR "
-                request += "1=0) AND ("
-                for genre_id in genre_ids:
-                    request += "album_genres.genre_id=? OR "
-                request += "1=0)"
-                if not get_network_available():
-                    request += " AND albums.synced!=%s" % Type.NONE
-                request += order
-                result = sql.execute(request, filters)
-            return list(itertools.chain(*result))
+        # Get albums for all artists
+        if not artist_ids and not genre_ids:
+            filters = (Type.CHARTS,)
+            request = "SELECT DISTINCT albums.rowid\
+                       FROM albums, artists, album_artists, album_genres\
+                       WHERE artists.rowid=album_artists.artist_id\
+                       AND album_genres.genre_id!=?\
+                       AND album_genres.album_id=albums.rowid\
+                       AND albums.rowid=album_artists.album_id"
+        # Get albums for genre
+        elif not artist_ids:
+            filters = tuple(genre_ids)
+            request = "SELECT DISTINCT albums.rowid FROM albums,\
+                       album_genres, artists, album_artists\
+                       WHERE artists.rowid=album_artists.artist_id\
+                       AND albums.rowid=album_artists.album_id\
+                       AND album_genres.album_id=albums.rowid\
+                       AND album_genres.genre_id IN (%s)" %\
+                ",".join("?" * len(genre_ids))
+        # Get albums for artist
+        elif not genre_ids:
+            filters = (Type.CHARTS,)
+            filters += tuple(artist_ids)
+            request = "SELECT DISTINCT albums.rowid\
+                       FROM albums, artists, album_artists, album_genres\
+                       WHERE artists.rowid=album_artists.artist_id\
+                       AND album_genres.genre_id!=?\
+                       AND album_genres.album_id=albums.rowid\
+                       AND album_artists.album_id=albums.rowid\
+                       AND album_artists.artist_id IN (%s)" %\
+                ",".join("?" * len(artist_ids))
+        # Get albums for artist id and genre id
+        else:
+            filters = tuple(artist_ids)
+            filters += tuple(genre_ids)
+            request = "SELECT DISTINCT albums.rowid\
+                       FROM albums, album_genres, artists, album_artists\
+                       WHERE album_genres.album_id=albums.rowid AND\
+                       artists.rowid=album_artists.artist_id AND\
+                       album_artists.album_id=albums.rowid AND\
+                       album_artists.artist_id IN (%s) AND\
+                       album_genres.genre_id IN (%s)" %\
+                (",".join("?" * len(artist_ids)),
+                 ",".join("?" * len(genre_ids)))
+        if not get_network_available():
+            request += " AND albums.synced!=%s" % Type.NONE
+        request += order
+        return (request, filters)
 
     def get_compilation_ids(self, genre_ids=[]):
         """
@@ -829,6 +880,8 @@ class AlbumsDatabase:
             @param limit as int/None
             @return album ids as [int]
         """
+        if Lp().db.has_fts:
+            return self.__search_fts(string, limit)
         with SqlCursor(Lp().db) as sql:
             if limit is None:
                 filters = ('%' + noaccents(string) + '%', Type.CHARTS)
@@ -923,6 +976,25 @@ class AlbumsDatabase:
 #######################
 # PRIVATE             #
 #######################
+    def __search_fts(self, string, limit):
+        """
+            Search for albums using full text search index
+            @param search as str
+            @param limit as int/None
+            @return album ids as [int]
+        """
+        query = get_fts_query(string)
+        if query is None:
+            return []
+        with SqlCursor(Lp().db) as sql:
+            filters = (query, Type.CHARTS)
+            request = self.SEARCH_FTS
+            if limit is not None:
+                filters += (limit,)
+                request += " LIMIT ?"
+            result = sql.execute(request, filters)
+            return list(itertools.chain(*result))
+
     def __has_genres(self, album_id):
         """
             Return True if album has more than one genre
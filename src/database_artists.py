@@ -15,13 +15,26 @@ import itertools
 
 from lollypop.sqlcursor import SqlCursor
 from lollypop.define import Lp, Type
-from lollypop.utils import format_artist_name, noaccents
+from lollypop.utils import format_artist_name, noaccents, get_fts_query
+from lollypop.localized import get_sortkey
 
 
 class ArtistsDatabase:
     """
         Artists database helper
     """
+    # Hot requests, see Database.check_query_plans()
+    ID_BY_NAME = "SELECT rowid from artists WHERE name=? COLLATE NOCASE"
+    SEARCH_FTS = "SELECT artists.rowid\
+                  FROM artists_fts, artists, albums,\
+                  album_genres, album_artists\
+                  WHERE artists_fts MATCH ?\
+                  AND artists.rowid=artists_fts.rowid\
+                  AND album_artists.artist_id=artists.rowid\
+                  AND album_artists.album_id=albums.rowid\
+                  AND album_genres.album_id=albums.rowid\
+                  AND album_genres.genre_id!=?\
+                  ORDER BY artists_fts.rank LIMIT 25"
 
     def __init__(self):
         """
@@ -40,9 +53,10 @@ class ArtistsDatabase:
         if sortname == "":
             sortname = format_artist_name(name)
         with SqlCursor(Lp().db) as sql:
-            result = sql.execute("INSERT INTO artists (name, sortname)\
-                                  VALUES (?, ?)",
-                                 (name, sortname))
+            result = sql.execute("INSERT INTO artists\
+                                  (name, sortname, sortkey)\
+                                  VALUES (?, ?, ?)",
+                                 (name, sortname, get_sortkey(sortname)))
             return result.lastrowid
 
     def set_sortname(self, artist_id, sortname):
@@ -54,9 +68,9 @@ class ArtistsDatabase:
         """
         with SqlCursor(Lp().db) as sql:
             sql.execute("UPDATE artists\
-                         SET sortname=?\
+                         SET sortname=?, sortkey=?\
                          WHERE rowid=?",
-                        (sortname, artist_id))
+                        (sortname, get_sortkey(sortname), artist_id))
 
     def get_sortname(self, artist_id):
         """
@@ -79,8 +93,7 @@ class ArtistsDatabase:
             @return Artist id as int
         """
         with SqlCursor(Lp().db) as sql:
-            result = sql.execute("SELECT rowid from artists\
-                                  WHERE name=? COLLATE NOCASE", (name,))
+            result = sql.execute(self.ID_BY_NAME, (name,))
             v = result.fetchone()
             if v is not None:
                 return v[0]
@@ -159,8 +172,7 @@ class ArtistsDatabase:
                                   AND album_artists.album_id=albums.rowid\
                                   AND album_genres.album_id=albums.rowid\
                                   AND album_genres.genre_id!=?\
-                                  ORDER BY artists.sortname\
-                                  COLLATE NOCASE COLLATE LOCALIZED",
+                                  ORDER BY artists.sortkey",
                                  (Type.CHARTS,))
             else:
                 genres = tuple(genre_ids)
@@ -172,8 +184,7 @@ class ArtistsDatabase:
                            AND album_genres.album_id=albums.rowid AND ("
                 for genre_id in genre_ids:
                     request += "album_genres.genre_id=? OR "
-                request += "1=0) ORDER BY artists.sortname\
-                            COLLATE NOCASE COLLATE LOCALIZED"
+                request += "1=0) ORDER BY artists.sortkey"
                 result = sql.execute(request, genres)
             return [(row[0], row[1]) for row in result]
 
@@ -195,8 +206,7 @@ class ArtistsDatabase:
                                   AND album_artists.album_id=albums.rowid\
                                   AND album_genres.album_id=albums.rowid\
                                   AND album_genres.genre_id!=?\
-                                  ORDER BY artists.sortname\
-                                  COLLATE NOCASE COLLATE LOCALIZED",
+                                  ORDER BY artists.sortkey",
                                  (Type.CHARTS,))
             else:
                 genres = tuple(genre_ids)
@@ -207,8 +217,7 @@ class ArtistsDatabase:
                            AND album_genres.album_id=albums.rowid AND ("
                 for genre_id in genre_ids:
                     request += "album_genres.genre_id=? OR "
-                request += "1=0) ORDER BY artists.sortname\
-                            COLLATE NOCASE COLLATE LOCALIZED"
+                request += "1=0) ORDER BY artists.sortkey"
                 result = sql.execute(request, genres)
             return list(itertools.chain(*result))
 
@@ -231,6 +240,13 @@ class ArtistsDatabase:
             @param string
             @return Array of id as int
         """
+        if Lp().db.has_fts:
+            query = get_fts_query(string)
+            if query is None:
+                return []
+            with SqlCursor(Lp().db) as sql:
+                result = sql.execute(self.SEARCH_FTS, (query, Type.CHARTS))
+                return list(itertools.chain(*result))
         with SqlCursor(Lp().db) as sql:
             result = sql.execute("SELECT artists.rowid FROM artists, albums,\
                                   album_genres, album_artists\
@@ -0,0 +1,292 @@
+# Copyright (c) 2014-2016 Cedric Bellegarde <cedric.bellegarde@adishatz.org>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+from gi.repository import GLib, Gio
+
+from lollypop.sqlcursor import SqlCursor
+from lollypop.define import Lp, Type
+from lollypop.utils import format_artist_name
+from lollypop.localized import get_sortkey
+from lollypop.objects import Album
+
+
+class DatabaseBatch:
+    """
+        Bulk ingest helper for collection scanner:
+            - Artists, genres and albums ids are resolved from memory
+            - Tracks are written with executemany(), one transaction by batch
+    """
+    __BATCH_SIZE = 500
+
+    def __init__(self, callback=None):
+        """
+            Init batch, load name to id maps from db
+            Should be created after any track deletion
+            @param callback as function(album ids as set), run after
+                   each flush
+        """
+        self.__callback = callback
+        self.__artist_ids = {}
+        self.__genre_ids = {}
+        self.__album_ids = {}
+        self.__album_uris = {}
+        self.__album_genres = set()
+        self.__sortnames = {}
+        self.__uris = {}
+        self.__new_album_genres = set()
+        self.__dirty_album_ids = set()
+        self.__no_artist_album_ids = set()
+        self.__tracks = []
+        self.__relations = []
+        self.__load()
+
+    def add(self, title, uri, duration, tracknumber, discnumber, discname,
+            year, popularity, ltime, mtime, artists, a_sortnames,
+            album_artists, aa_sortnames, album_name, album_popularity,
+            album_mtime, genres, fingerprint):
+        """
+            Queue a track for insertion, flush batch if full
+            @param title as str
+            @param uri as str
+            @param duration as int
+            @param tracknumber as int
+            @param discnumber as int
+            @param discname as str
+            @param year as int
+            @param popularity as int
+            @param ltime as int
+            @param mtime as int
+            @param artists as str
+            @param a_sortnames as str
+            @param album_artists as str
+            @param aa_sortnames as str
+            @param album_name as str
+            @param album_popularity as int
+            @param album_mtime as int
+            @param genres as str
+            @param fingerprint as str
+            @return album id as int
+            @thread safe
+        """
+        artist_ids = self.__add_artists(artists, a_sortnames)
+        album_artist_ids = self.__add_artists(album_artists, aa_sortnames)
+        album_id = self.__add_album(album_name, album_artist_ids, uri,
+                                    album_popularity, album_mtime)
+        genre_ids = self.__add_genres(genres)
+        for genre_id in genre_ids:
+            if (album_id, genre_id) not in self.__album_genres:
+                self.__album_genres.add((album_id, genre_id))
+                self.__new_album_genres.add((album_id, genre_id))
+        if not album_artist_ids:
+            self.__no_artist_album_ids.add(album_id)
+        self.__dirty_album_ids.add(album_id)
+        self.__tracks.append((title, uri, duration, tracknumber, discnumber,
+                              discname, album_id, year, popularity,
+                              ltime, mtime, fingerprint))
+        self.__relations.append((artist_ids, genre_ids,
+                                 set(artist_ids) | set(album_artist_ids)))
+        if len(self.__tracks) >= self.__BATCH_SIZE:
+            self.flush()
+        return album_id
+
+    def flush(self):
+        """
+            Write queued tracks in one transaction
+            @thread safe
+        """
+        if not self.__tracks:
+            return
+        with SqlCursor(Lp().db, False) as sql:
+            sql.executemany("UPDATE artists SET sortname=?, sortkey=?\
+                             WHERE rowid=?",
+                            [(sortname, get_sortkey(sortname), artist_id)
+                             for (artist_id, sortname)
+                             in self.__sortnames.items()])
+            sql.executemany("UPDATE albums SET uri=? WHERE rowid=?",
+                            [(uri, album_id) for (album_id, uri)
+                             in self.__uris.items()])
+            sql.executemany("INSERT INTO tracks (name, uri, duration,\
+                             tracknumber, discnumber, discname, album_id,\
+                             year, popularity, ltime, mtime, fingerprint)\
+                             VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                            self.__tracks)
+            # We hold the write lock since first insert,
+            # so our rows are the last ones
+            result = sql.execute("SELECT MAX(rowid) FROM tracks")
+            track_id = result.fetchone()[0] - len(self.__tracks)
+            track_artists = []
+            track_genres = []
+            updated_artist_ids = set()
+            updated_genre_ids = set()
+            for (artist_ids, genre_ids, new_artist_ids) in self.__relations:
+                track_id += 1
+                for artist_id in set(artist_ids):
+                    track_artists.append((track_id, artist_id))
+                for genre_id in set(genre_ids):
+                    track_genres.append((track_id, genre_id))
+                updated_artist_ids |= new_artist_ids
+                updated_genre_ids |= set(genre_ids)
+            sql.executemany("INSERT INTO track_artists (track_id, artist_id)\
+                             VALUES (?, ?)", track_artists)
+            sql.executemany("INSERT INTO track_genres (track_id, genre_id)\
+                             VALUES (?, ?)", track_genres)
+            sql.executemany("INSERT INTO album_genres (album_id, genre_id)\
+                             VALUES (?, ?)", self.__new_album_genres)
+            # Set artist ids based on content
+            for album_id in self.__no_artist_album_ids:
+                Lp().albums.set_artist_ids(
+                                    album_id,
+                                    Lp().albums.calculate_artist_ids(album_id))
+            # Update year based on tracks
+            sql.executemany("UPDATE albums SET year=(\
+                                SELECT year FROM tracks\
+                                WHERE tracks.album_id=albums.rowid\
+                                GROUP BY year\
+                                ORDER BY COUNT(year) DESC\
+                                LIMIT 1)\
+                             WHERE rowid=?",
+                            [(album_id,) for album_id
+                             in self.__dirty_album_ids])
+            sql.commit()
+        album_ids = self.__dirty_album_ids
+        # Year and uri were updated without album setters
+        for album_id in album_ids | set(self.__uris.keys()):
+            Album.CACHE.remove(album_id)
+        self.__sortnames = {}
+        self.__uris = {}
+        self.__new_album_genres = set()
+        self.__dirty_album_ids = set()
+        self.__no_artist_album_ids = set()
+        self.__tracks = []
+        self.__relations = []
+        for genre_id in updated_genre_ids:
+            GLib.idle_add(Lp().scanner.emit, 'genre-updated', genre_id, True)
+        for artist_id in updated_artist_ids:
+            GLib.idle_add(Lp().scanner.emit, 'artist-updated',
+                          artist_id, True)
+        if self.__callback is not None:
+            self.__callback(album_ids)
+
+#######################
+# PRIVATE             #
+#######################
+    def __load(self):
+        """
+            Load artists, genres and albums ids
+        """
+        with SqlCursor(Lp().db) as sql:
+            result = sql.execute("SELECT rowid, name FROM artists")
+            for (artist_id, name) in result:
+                self.__artist_ids[name.lower()] = artist_id
+            result = sql.execute("SELECT rowid, name FROM genres")
+            for (genre_id, name) in result:
+                self.__genre_ids[name] = genre_id
+            result = sql.execute("SELECT albums.rowid, albums.name,\
+                                  albums.no_album_artist, albums.uri,\
+                                  album_artists.artist_id\
+                                  FROM albums LEFT JOIN album_artists\
+                                  ON album_artists.album_id=albums.rowid\
+                                  WHERE albums.synced!=?", (Type.NONE,))
+            for (album_id, name, no_album_artist, uri, artist_id) in result:
+                self.__album_uris[album_id] = uri
+                if no_album_artist:
+                    self.__album_ids[(name, None)] = album_id
+                elif artist_id is not None:
+                    self.__album_ids.setdefault((name, artist_id), album_id)
+            result = sql.execute("SELECT album_id, genre_id FROM album_genres")
+            self.__album_genres = set(result)
+
+    def __add_artists(self, artists, sortnames):
+        """
+            Get artist ids, add missing artists to db
+            @param artists as str
+            @param sortnames as str
+            @return artist ids as [int]
+        """
+        artist_ids = []
+        sortsplit = sortnames.split(';')
+        sortlen = len(sortsplit)
+        i = 0
+        for artist in artists.split(';'):
+            artist = artist.strip()
+            if artist != '':
+                artist_id = self.__artist_ids.get(artist.lower(), None)
+                if i >= sortlen or sortsplit[i] == "":
+                    sortname = None
+                else:
+                    sortname = sortsplit[i].strip()
+                if artist_id is None:
+                    if sortname is None:
+                        sortname = format_artist_name(artist)
+                    artist_id = Lp().artists.add(artist, sortname)
+                    self.__artist_ids[artist.lower()] = artist_id
+                elif sortname is not None:
+                    self.__sortnames[artist_id] = sortname
+                i += 1
+                artist_ids.append(artist_id)
+        return artist_ids
+
+    def __add_genres(self, genres):
+        """
+            Get genre ids, add missing genres to db
+            @param genres as str
+            @return genre ids as [int]
+        """
+        genre_ids = []
+        for genre in genres.split(';'):
+            genre = genre.strip()
+            if genre != '':
+                genre_id = self.__genre_ids.get(genre, None)
+                if genre_id is None:
+                    genre_id = Lp().genres.add(genre)
+                    self.__genre_ids[genre] = genre_id
+                genre_ids.append(genre_id)
+        return genre_ids
+
+    def __add_album(self, album_name, artist_ids, uri, popularity, mtime):
+        """
+            Get album id, add album to db if missing
+            @param album name as str
+            @param album artist ids as [int]
+            @param uri to an album track as str
+            @param popularity as int
+            @param mtime as int
+            @return album id as int
+        """
+        f = Gio.File.new_for_uri(uri)
+        d = f.get_parent()
+        if d is not None:
+            parent_uri = d.get_uri()
+        else:
+            parent_uri = ""
+        album_id = None
+        if artist_ids:
+            for artist_id in artist_ids:
+                album_id = self.__album_ids.get((album_name, artist_id), None)
+                if album_id is not None:
+                    break
+        else:
+            album_id = self.__album_ids.get((album_name, None), None)
+        if album_id is None:
+            album_id = Lp().albums.add(album_name, artist_ids,
+                                       parent_uri, popularity, mtime)
+            self.__album_uris[album_id] = parent_uri
+            if artist_ids:
+                for artist_id in artist_ids:
+                    self.__album_ids[(album_name, artist_id)] = album_id
+            else:
+                self.__album_ids[(album_name, None)] = album_id
+        # Now we have our album id, check if path doesn't change
+        if self.__album_uris[album_id] != parent_uri:
+            self.__album_uris[album_id] = parent_uri
+            self.__uris[album_id] = parent_uri
+        return album_id
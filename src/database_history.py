@@ -129,7 +129,8 @@ class History:
             Return a new sqlite cursor
         """
         try:
-            return sqlite3.connect(self.__DB_PATH, 600.0)
+            return sqlite3.connect(self.__DB_PATH, 600.0,
+                                   check_same_thread=False)
         except:
             exit(-1)
 
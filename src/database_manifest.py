@@ -0,0 +1,141 @@
+# Copyright (c) 2014-2016 Cedric Bellegarde <cedric.bellegarde@adishatz.org>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+from gi.repository import GLib
+
+import sqlite3
+
+from lollypop.sqlcursor import SqlCursor
+
+
+class Manifest:
+    """
+        Collection directories manifest
+        Remember directories state at last scan
+        and files still to be added by an interrupted scan
+    """
+    __LOCAL_PATH = GLib.get_home_dir() + "/.local/share/lollypop"
+    __DB_PATH = "%s/manifest.db" % __LOCAL_PATH
+    __create_dirs = '''CREATE TABLE dirs (
+                            uri TEXT PRIMARY KEY,
+                            parent TEXT NOT NULL,
+                            mtime INT NOT NULL,
+                            count INT NOT NULL)'''
+    __create_pending = '''CREATE TABLE pending (
+                                uri TEXT PRIMARY KEY,
+                                mtime INT NOT NULL)'''
+
+    def __init__(self):
+        """
+            Init manifest
+        """
+        # Create db schema
+        try:
+            with SqlCursor(self) as sql:
+                sql.execute(self.__create_dirs)
+                sql.commit()
+        except:
+            pass
+        # Added after dirs table
+        try:
+            with SqlCursor(self) as sql:
+                sql.execute(self.__create_pending)
+                sql.commit()
+        except:
+            pass
+
+    def get(self):
+        """
+            Get directories state
+            @return {uri as str: (parent as str, mtime as int, count as int)}
+            @thread safe
+        """
+        with SqlCursor(self) as sql:
+            result = sql.execute("SELECT uri, parent, mtime, count FROM dirs")
+            return {row[0]: row[1:] for row in result}
+
+    def set(self, dirs):
+        """
+            Replace directories state
+            @param dirs as {uri as str: (parent as str,
+                                         mtime as int, count as int)}
+            @thread safe
+        """
+        with SqlCursor(self) as sql:
+            sql.execute("DELETE FROM dirs")
+            sql.executemany("INSERT INTO dirs (uri, parent, mtime, count)\
+                             VALUES (?, ?, ?, ?)",
+                            [(uri,) + value for (uri, value) in dirs.items()])
+            sql.commit()
+
+    def get_pending(self):
+        """
+            Get files not added by last scan
+            @return {uri as str: mtime as int}
+            @thread safe
+        """
+        with SqlCursor(self) as sql:
+            result = sql.execute("SELECT uri, mtime FROM pending")
+            return dict(result)
+
+    def set_pending(self, tracks):
+        """
+            Replace files to be added
+            @param tracks as [(uri as str, mtime as int)]
+            @thread safe
+        """
+        with SqlCursor(self) as sql:
+            sql.execute("DELETE FROM pending")
+            sql.executemany("INSERT OR REPLACE INTO pending (uri, mtime)\
+                             VALUES (?, ?)", tracks)
+            sql.commit()
+
+    def add_pending(self, tracks):
+        """
+            Add files to be added
+            @param tracks as [(uri as str, mtime as int)]
+            @thread safe
+        """
+        with SqlCursor(self) as sql:
+            sql.executemany("INSERT OR REPLACE INTO pending (uri, mtime)\
+                             VALUES (?, ?)", tracks)
+            sql.commit()
+
+    def remove_pending(self, uris):
+        """
+            Forget files added to collection
+            @param uris as [str]
+            @thread safe
+        """
+        with SqlCursor(self) as sql:
+            sql.executemany("DELETE FROM pending WHERE uri=?",
+                            [(uri,) for uri in uris])
+            sql.commit()
+
+    def clear(self):
+        """
+            Forget all directories, next scan will be a full scan
+        """
+        with SqlCursor(self) as sql:
+            sql.execute("DELETE FROM dirs")
+            sql.execute("DELETE FROM pending")
+            sql.commit()
+
+    def get_cursor(self):
+        """
+            Return a new sqlite cursor
+        """
+        try:
+            return sqlite3.connect(self.__DB_PATH, 600.0,
+                                   check_same_thread=False)
+        except:
+            exit(-1)
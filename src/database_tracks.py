@@ -16,7 +16,8 @@ import itertools
 
 from lollypop.sqlcursor import SqlCursor
 from lollypop.define import Lp, Type
-from lollypop.utils import noaccents
+from lollypop.utils import remove_static_genres, noaccents, get_fts_query
+from lollypop.objects import Track
 
 
 class TracksDatabase:
@@ -24,6 +25,18 @@ class TracksDatabase:
         All functions take a sqlite cursor as last parameter,
         set another one if you're in a thread
     """
+    # Hot requests, see Database.check_query_plans()
+    ID_BY_URI = "SELECT rowid FROM tracks WHERE uri=?"
+    # Uri or uris under it, x'ffff' sorts after any utf-8 character
+    URIS_UNDER = "SELECT uri FROM tracks\
+                  WHERE uri=? OR (uri>=? AND uri<? || x'ffff')"
+    SEARCH_FTS = "SELECT tracks.rowid, tracks.name\
+                  FROM tracks_fts, tracks, track_genres\
+                  WHERE tracks_fts MATCH ?\
+                  AND tracks.rowid=tracks_fts.rowid\
+                  AND tracks.rowid=track_genres.track_id\
+                  AND track_genres.genre_id!=?\
+                  ORDER BY tracks_fts.rank LIMIT 25"
 
     def __init__(self):
         """
@@ -118,6 +131,27 @@ class TracksDatabase:
                                   WHERE mtime>1")
             return list(itertools.chain(*result))
 
+    def get_ids_for_albums(self, album_ids, genre_ids=[]):
+        """
+            Return track ids for albums
+            @param album ids as [int]
+            @param genre ids as [int]
+            @return track ids as [int]
+        """
+        result = self.__get_for_albums("tracks.rowid", album_ids, genre_ids)
+        return list(itertools.chain(*result))
+
+    def get_stats_for_albums(self, album_ids, genre_ids=[]):
+        """
+            Return track stats for albums
+            @param album ids as [int]
+            @param genre ids as [int]
+            @return [(track id as int, popularity as int, ltime as int)]
+        """
+        return self.__get_for_albums(
+                            "tracks.rowid, tracks.popularity, tracks.ltime",
+                            album_ids, genre_ids)
+
     def get_charts(self):
         """
             Return all internal track ids
@@ -150,8 +184,7 @@ class TracksDatabase:
             @return track id as int
         """
         with SqlCursor(Lp().db) as sql:
-            result = sql.execute("SELECT rowid FROM tracks WHERE uri=?",
-                                 (uri,))
+            result = sql.execute(self.ID_BY_URI, (uri,))
             v = result.fetchone()
             if v is not None:
                 return v[0]
@@ -222,13 +255,66 @@ class TracksDatabase:
             @param Track id as int
             @param uri as string
         """
-        with SqlCursor(Lp().db) as sql:
+        with SqlCursor(Lp().db, False) as sql:
             sql.execute("UPDATE tracks SET uri=?\
                          WHERE rowid=?",
                         (uri, track_id))
             sql.commit()
             Lp().tracks.set_mtime(track_id, 0)
 
+    def set_moved_uri(self, track_id, uri):
+        """
+            Set uri for a moved track, track is unchanged
+            @param track id as int
+            @param uri as str
+            @warning: commit needed
+        """
+        with SqlCursor(Lp().db) as sql:
+            sql.execute("UPDATE tracks SET uri=? WHERE rowid=?",
+                        (uri, track_id))
+        Track.CACHE.remove(track_id)
+
+    def get_uris_by_fingerprints(self, fingerprints):
+        """
+            Get uris for fingerprints
+            @param fingerprints as [str]
+            @return [(uri as str, fingerprint as str)]
+        """
+        rows = []
+        with SqlCursor(Lp().db) as sql:
+            # Stay under sqlite variables limit
+            for i in range(0, len(fingerprints), 500):
+                filters = tuple(fingerprints[i:i + 500])
+                result = sql.execute("SELECT uri, fingerprint FROM tracks\
+                                      WHERE fingerprint IN (%s)" %
+                                     ",".join(["?"] * len(filters)), filters)
+                rows += result.fetchall()
+        return rows
+
+    def get_uris_without_fingerprint(self, limit):
+        """
+            Get uris for tracks scanned before fingerprints were added
+            @param limit as int
+            @return [str]
+        """
+        with SqlCursor(Lp().db) as sql:
+            result = sql.execute("SELECT uri FROM tracks\
+                                  WHERE fingerprint IS NULL\
+                                  AND uri LIKE 'file:%' LIMIT ?",
+                                 (limit,))
+            return list(itertools.chain(*result))
+
+    def set_fingerprints(self, fingerprints):
+        """
+            Set fingerprints, empty for unreadable files
+            @param fingerprints as {uri as str: fingerprint as str}
+            @warning: commit needed
+        """
+        with SqlCursor(Lp().db) as sql:
+            sql.executemany("UPDATE tracks SET fingerprint=? WHERE uri=?",
+                            [(fingerprint, uri) for (uri, fingerprint)
+                             in fingerprints.items()])
+
     def get_album_id(self, track_id):
         """
             Get album id for track id
@@ -320,6 +406,17 @@ class TracksDatabase:
                 mtimes.update((row,))
             return mtimes
 
+    def get_uris_under(self, uri):
+        """
+            Get uris for file or directory uri
+            @param uri as str
+            @return [str]
+        """
+        prefix = uri.rstrip('/') + '/'
+        with SqlCursor(Lp().db) as sql:
+            result = sql.execute(self.URIS_UNDER, (uri, prefix, prefix))
+            return list(itertools.chain(*result))
+
     def get_uris(self, exclude=[]):
         """
             Get all tracks uri
@@ -372,11 +469,12 @@ class TracksDatabase:
             @param Track id as int
             @param duration as int
         """
-        with SqlCursor(Lp().db) as sql:
+        with SqlCursor(Lp().db, False) as sql:
             sql.execute("UPDATE tracks\
                          SET duration=?\
                          WHERE rowid=?", (duration, track_id,))
             sql.commit()
+        Track.CACHE.remove(track_id)
 
     def is_empty(self):
         """
@@ -442,9 +540,10 @@ class TracksDatabase:
         """
             Increment popularity field
             @param track id as int
+            @return popularity as int
             @raise sqlite3.OperationalError on db update
         """
-        with SqlCursor(Lp().db) as sql:
+        with SqlCursor(Lp().db, False) as sql:
             result = sql.execute("SELECT popularity from tracks WHERE rowid=?",
                                  (track_id,))
             pop = result.fetchone()
@@ -456,6 +555,7 @@ class TracksDatabase:
             sql.execute("UPDATE tracks set popularity=? WHERE rowid=?",
                         (current, track_id))
             sql.commit()
+        return current
 
     def set_listened_at(self, track_id, time):
         """
@@ -463,7 +563,7 @@ class TracksDatabase:
             @param track id as int
             @param time as int
         """
-        with SqlCursor(Lp().db) as sql:
+        with SqlCursor(Lp().db, False) as sql:
             sql.execute("UPDATE tracks set ltime=? WHERE rowid=?",
                         (time, track_id))
             sql.commit()
@@ -510,11 +610,12 @@ class TracksDatabase:
             @param track id as int
             @param persistent as int
         """
-        with SqlCursor(Lp().db) as sql:
+        with SqlCursor(Lp().db, False) as sql:
             sql.execute("UPDATE tracks\
                          SET persistent=?\
                          WHERE rowid=?", (persistent, track_id,))
             sql.commit()
+        Track.CACHE.remove(track_id)
 
     def get_non_persistent(self):
         """
@@ -573,7 +674,7 @@ class TracksDatabase:
             @param popularity as int
             @warning: commit needed
         """
-        with SqlCursor(Lp().db) as sql:
+        with SqlCursor(Lp().db, False) as sql:
             try:
                 sql.execute("UPDATE tracks set popularity=? WHERE rowid=?",
                             (popularity, track_id))
@@ -610,6 +711,64 @@ class TracksDatabase:
                 return v[0]
             return 0
 
+    def get_many(self, track_ids):
+        """
+            Get tracks attributes, one query by table for all tracks
+            @param track_ids as [int]
+            @return {track id as int: {attribute as str: value}}
+        """
+        tracks = {}
+        with SqlCursor(Lp().db) as sql:
+            # Stay under SQLite variables limit
+            for i in range(0, len(track_ids), 500):
+                ids = tuple(track_ids[i:i+500])
+                placeholders = ",".join("?" * len(ids))
+                result = sql.execute("SELECT tracks.rowid, tracks.name,\
+                                      tracks.uri, tracks.album_id,\
+                                      albums.name, tracks.year,\
+                                      tracks.duration, tracks.tracknumber,\
+                                      tracks.mtime\
+                                      FROM tracks LEFT JOIN albums\
+                                      ON tracks.album_id=albums.rowid\
+                                      WHERE tracks.rowid IN (%s)" %
+                                     placeholders, ids)
+                for (track_id, name, uri, album_id, album_name,
+                     year, duration, number, mtime) in result:
+                    tracks[track_id] = {"name": name,
+                                        "uri": uri,
+                                        "album_id": album_id,
+                                        "album_name": album_name,
+                                        "year": str(year) if year else "",
+                                        "duration": duration,
+                                        "number": number,
+                                        "mtime": mtime,
+                                        "artists": [],
+                                        "artist_ids": [],
+                                        "genres": [],
+                                        "genre_ids": []}
+                result = sql.execute("SELECT track_artists.track_id,\
+                                      track_artists.artist_id, artists.name\
+                                      FROM track_artists, artists\
+                                      WHERE track_artists.track_id IN (%s)\
+                                      AND track_artists.artist_id=\
+                                      artists.rowid\
+                                      ORDER BY track_artists.rowid" %
+                                     placeholders, ids)
+                for (track_id, artist_id, artist) in result:
+                    tracks[track_id]["artist_ids"].append(artist_id)
+                    tracks[track_id]["artists"].append(artist)
+                result = sql.execute("SELECT track_genres.track_id,\
+                                      track_genres.genre_id, genres.name\
+                                      FROM track_genres, genres\
+                                      WHERE track_genres.track_id IN (%s)\
+                                      AND track_genres.genre_id=genres.rowid\
+                                      ORDER BY track_genres.rowid" %
+                                     placeholders, ids)
+                for (track_id, genre_id, genre) in result:
+                    tracks[track_id]["genre_ids"].append(genre_id)
+                    tracks[track_id]["genres"].append(genre)
+        return tracks
+
     def get_mtime(self, track_id):
         """
             Get modification time
@@ -630,11 +789,12 @@ class TracksDatabase:
             @param track id  as int
             @param mtime as int
         """
-        with SqlCursor(Lp().db) as sql:
+        with SqlCursor(Lp().db, False) as sql:
             sql.execute("UPDATE tracks\
                          SET mtime=?\
                          WHERE rowid=?", (mtime, track_id))
             sql.commit()
+        Track.CACHE.remove(track_id)
 
     def count(self):
         """
@@ -670,6 +830,13 @@ class TracksDatabase:
             @param searched as string
             return: list of [id as int, name as string]
         """
+        if Lp().db.has_fts:
+            query = get_fts_query(searched)
+            if query is None:
+                return []
+            with SqlCursor(Lp().db) as sql:
+                result = sql.execute(self.SEARCH_FTS, (query, Type.CHARTS))
+                return list(result)
         with SqlCursor(Lp().db) as sql:
             result = sql.execute("SELECT tracks.rowid, tracks.name\
                                   FROM tracks, track_genres\
@@ -713,3 +880,33 @@ class TracksDatabase:
                          WHERE track_id=?", (track_id,))
             sql.execute("DELETE FROM tracks\
                          WHERE rowid=?", (track_id,))
+
+#######################
+# PRIVATE             #
+#######################
+    def __get_for_albums(self, columns, album_ids, genre_ids):
+        """
+            Return tracks columns for albums
+            @param columns as str
+            @param album ids as [int]
+            @param genre ids as [int]
+            @return [tuple]
+        """
+        genre_ids = remove_static_genres(genre_ids)
+        rows = []
+        with SqlCursor(Lp().db) as sql:
+            # Stay under sqlite variables limit
+            for i in range(0, len(album_ids), 500):
+                filters = tuple(album_ids[i:i + 500])
+                request = "SELECT DISTINCT %s FROM tracks" % columns
+                if genre_ids:
+                    request += ", track_genres"
+                request += " WHERE album_id IN (%s)" %\
+                    ",".join(["?"] * len(filters))
+                if genre_ids:
+                    filters += tuple(genre_ids)
+                    request += " AND track_genres.track_id=tracks.rowid\
+                                 AND track_genres.genre_id IN (%s)" %\
+                        ",".join(["?"] * len(genre_ids))
+                rows += sql.execute(request, filters).fetchall()
+        return rows
@@ -50,7 +50,12 @@ class DatabaseUpgrade:
             13: self.__upgrade_13,
             14: "UPDATE albums SET synced=-1 where mtime=0",
             15: self.__upgrade_15,
-            16: self.__upgrade_16
+            16: self.__upgrade_16,
+            17: self._db.create_fts,
+            18: self.__upgrade_18,
+            19: self.__upgrade_19,
+            20: "ALTER TABLE tracks ADD fingerprint TEXT",
+            21: "CREATE index idx_tracks_fingerprint ON tracks(fingerprint)"
                          }
 
     """
@@ -256,3 +261,33 @@ class DatabaseUpgrade:
                     sql.execute("UPDATE albums set uri=? WHERE rowid=?",
                                 (uri, rowid))
             sql.commit()
+
+    def __upgrade_18(self):
+        """
+            Add sort keys to artists and albums
+        """
+        with SqlCursor(self._db) as sql:
+            sql.execute("ALTER TABLE artists ADD sortkey BLOB")
+            sql.execute("ALTER TABLE albums ADD sortkey BLOB")
+            sql.execute("CREATE index idx_artists_sortkey ON artists(sortkey)")
+            sql.execute("CREATE index idx_albums_sortkey ON albums(sortkey)")
+            sql.commit()
+        self._db.update_sortkeys(True)
+
+    def __upgrade_19(self):
+        """
+            Index join tables on artist/genre and lookups on uri/name
+        """
+        with SqlCursor(self._db) as sql:
+            sql.execute("CREATE index idx_aa_artist ON\
+                         album_artists(artist_id, album_id)")
+            sql.execute("CREATE index idx_ag_genre ON\
+                         album_genres(genre_id, album_id)")
+            sql.execute("CREATE index idx_tracks_album ON\
+                         tracks(album_id, discnumber, tracknumber)")
+            sql.execute("CREATE index idx_tracks_uri ON tracks(uri)")
+            sql.execute("CREATE index idx_albums_uri ON albums(uri)")
+            sql.execute("CREATE index idx_artists_name ON\
+                         artists(name COLLATE NOCASE)")
+            sql.execute("ANALYZE")
+            sql.commit()
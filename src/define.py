@@ -97,6 +97,12 @@ class Shuffle:
     ALBUMS = 2           # Shuffle by albums on genre
 
 
+class MixCurve:
+    LINEAR = 0           # Volume changes linearly
+    EQUAL_POWER = 1      # Constant loudness while mixing
+    SMOOTH = 2           # Slow start and end
+
+
 class WindowSize:
     SMALL = 400
     MEDIUM = 500
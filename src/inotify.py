@@ -18,16 +18,33 @@ from lollypop.utils import is_audio
 
 class Inotify:
     """
-        Inotify support
+        Watch collection directories:
+            - Monitors are added lazily, recently modified directories first
+            - Changes are accumulated, then only changed files/directories
+              are scanned
+            - If kernel watch limit is reached, collection is periodically
+              updated, manifest allows to skip unchanged directories
     """
     # 10 second before updating database
     __TIMEOUT = 10000
+    # Monitors added by main loop iteration
+    __BATCH = 100
+    # Collection update interval if some directories are not monitored
+    __POLL = 600
+    # Leave watches to other applications
+    __WATCHES_RATIO = 0.5
+    __DEFAULT_WATCHES = 8192
 
     def __init__(self):
         """
             Init inode notification
         """
-        self.__monitors = []
+        self.__monitors = {}
+        self.__pending = []
+        self.__pending_id = None
+        self.__poll_id = None
+        self.__max_monitors = self.__get_max_monitors()
+        self.__changed = set()
         self.__timeout = None
 
     def add_monitor(self, uri):
@@ -38,58 +55,158 @@ class Inotify:
         # Check if there is already a monitor for this uri
         if uri in self.__monitors:
             return
+        if len(self.__monitors) >= self.__max_monitors:
+            self.__start_polling()
+            return
         try:
             f = Gio.File.new_for_uri(uri)
             monitor = f.monitor_directory(Gio.FileMonitorFlags.NONE,
                                           None)
             if monitor is not None:
                 monitor.connect('changed', self.__on_dir_changed)
-                self.__monitors.append(uri)
+                self.__monitors[uri] = monitor
         except Exception as e:
             print("Inotify::add_monitor():", e)
+            self.__start_polling()
+
+    def add_monitors(self, dirs):
+        """
+            Add monitors for dirs in background, recently modified first
+            @param dirs as {uri as str: (parent as str,
+                                         mtime as int, count as int)}
+            @thread safe
+        """
+        uris = sorted(dirs.keys(), key=lambda uri: dirs[uri][1],
+                      reverse=True)
+        GLib.idle_add(self.__queue_monitors, uris)
 
 #######################
 # PRIVATE             #
 #######################
     def __on_dir_changed(self, monitor, changed_file, other_file, event):
         """
-            Prepare thread to handle changes
+            Remember changed file and delay update
         """
+        # Wait for file to be fully written
+        if event == Gio.FileMonitorEvent.CHANGED:
+            return
         update = False
-        # Stop collection scanner and wait
-        if Lp().scanner.is_locked():
-            Lp().scanner.stop()
-            GLib.timeout_add(self.__TIMEOUT,
-                             self.__on_dir_changed,
-                             monitor,
-                             changed_file,
-                             other_file,
-                             event)
-        # Run update delayed
-        else:
-            uri = changed_file.get_uri()
-            d = Gio.File.new_for_uri(uri)
-            if d.query_exists():
-                # If a directory, monitor it
-                if changed_file.query_file_type(
-                                            Gio.FileQueryInfoFlags.NONE,
-                                            None) == Gio.FileType.DIRECTORY:
-                    self.add_monitor(uri)
-                # If not an audio file, exit
-                elif is_audio(changed_file):
-                    update = True
-            else:
+        uri = changed_file.get_uri()
+        d = Gio.File.new_for_uri(uri)
+        if d.query_exists():
+            # If a directory, monitor it
+            if changed_file.query_file_type(
+                                        Gio.FileQueryInfoFlags.NONE,
+                                        None) == Gio.FileType.DIRECTORY:
+                self.add_monitor(uri)
+                # May have been moved in collection with its files
                 update = True
-            if update:
-                if self.__timeout is not None:
-                    GLib.source_remove(self.__timeout)
-                    self.__timeout = None
-                self.__timeout = GLib.timeout_add(self.__TIMEOUT,
-                                                  self.__run_collection_update)
+            # If not an audio file, exit
+            elif is_audio(changed_file):
+                update = True
+        else:
+            # Free watch
+            monitor = self.__monitors.pop(uri, None)
+            if monitor is not None:
+                monitor.cancel()
+            update = True
+        if update:
+            self.__changed.add(uri)
+            if self.__timeout is not None:
+                GLib.source_remove(self.__timeout)
+                self.__timeout = None
+            self.__timeout = GLib.timeout_add(self.__TIMEOUT,
+                                              self.__run_collection_update)
+
+    def __queue_monitors(self, uris):
+        """
+            Queue monitors, before previously queued ones
+            @param uris as [str]
+        """
+        queued = set()
+        pending = []
+        for uri in uris + self.__pending:
+            if uri not in queued and uri not in self.__monitors:
+                queued.add(uri)
+                pending.append(uri)
+        self.__pending = pending
+        if len(self.__monitors) + len(self.__pending) > self.__max_monitors:
+            self.__start_polling()
+        if self.__pending and self.__pending_id is None:
+            self.__pending_id = GLib.idle_add(self.__add_pending_monitors,
+                                              priority=GLib.PRIORITY_LOW)
+
+    def __add_pending_monitors(self):
+        """
+            Add some queued monitors
+            @return True while monitors are pending
+        """
+        for uri in self.__pending[:self.__BATCH]:
+            self.add_monitor(uri)
+        del self.__pending[:self.__BATCH]
+        # No more watches
+        if len(self.__monitors) >= self.__max_monitors:
+            self.__pending = []
+        if self.__pending:
+            return True
+        self.__pending_id = None
+        return False
+
+    def __start_polling(self):
+        """
+            Periodically update collection, some dirs are not monitored
+        """
+        if self.__poll_id is None:
+            print("Inotify::__start_polling(): watch limit reached,"
+                  " collection will be updated every %ss" % self.__POLL)
+            self.__poll_id = GLib.timeout_add_seconds(self.__POLL,
+                                                      self.__poll)
+
+    def __poll(self):
+        """
+            Update collection if scanner is idle
+            @return True
+        """
+        if not Lp().scanner.is_locked():
+            Lp().scanner.update(False)
+        return True
+
+    def __get_max_monitors(self):
+        """
+            Get how many directories can be monitored
+            @return int
+        """
+        try:
+            with open("/proc/sys/fs/inotify/max_user_watches") as f:
+                watches = int(f.read())
+        except:
+            watches = self.__DEFAULT_WATCHES
+        return int(watches * self.__WATCHES_RATIO)
+
+    def __get_changed_uris(self):
+        """
+            Get changed uris, files in a changed directory are skipped
+            @return [str]
+        """
+        uris = []
+        for uri in self.__changed:
+            parent = uri
+            covered = False
+            while not covered and "/" in parent:
+                parent = parent.rsplit("/", 1)[0]
+                covered = parent in self.__changed
+            if not covered:
+                uris.append(uri)
+        return uris
 
     def __run_collection_update(self):
         """
-            Run a collection update
+            Run a collection update for changed uris
         """
         self.__timeout = None
-        Lp().window.update_db()
+        # Do not stop a running scan, wait for it
+        if not Lp().scanner.update_uris(self.__get_changed_uris()):
+            self.__timeout = GLib.timeout_add(self.__TIMEOUT,
+                                              self.__run_collection_update)
+        else:
+            self.__changed = set()
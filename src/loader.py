@@ -14,6 +14,9 @@ from gi.repository import GLib
 
 from threading import Thread, Lock
 
+from lollypop.sqlcursor import SqlCursor
+from lollypop.define import Lp
+
 
 class Loader(Thread):
     """
@@ -46,7 +49,9 @@ class Loader(Thread):
             if active:
                 active.invalidate()
             Loader.active[self._view] = self
-        result = self._target()
+        # Views only read collection
+        with SqlCursor(Lp().db, True):
+            result = self._target()
         if not self.is_invalidated():
             if self._on_finished:
                 GLib.idle_add(self._on_finished, (result))
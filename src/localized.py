@@ -10,7 +10,7 @@
 # You should have received a copy of the GNU General Public License
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 
-from locale import strcoll
+from locale import strcoll, strxfrm, setlocale, LC_COLLATE
 
 
 class LocalizedCollation(object):
@@ -24,3 +24,23 @@ class LocalizedCollation(object):
 
     def __call__(self, v1, v2):
         return strcoll(v1, v2)
+
+
+def get_sortkey(string):
+    """
+        Return a binary sort key, ordered as LOCALIZED collation
+        @param string as str
+        @return bytes
+    """
+    try:
+        return strxfrm(string).encode("utf-8", "surrogatepass")
+    except ValueError:  # Embedded null character
+        return string.encode("utf-8", "surrogatepass")
+
+
+def get_collate_locale():
+    """
+        Return current collation locale name
+        @return str
+    """
+    return setlocale(LC_COLLATE)
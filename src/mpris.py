@@ -19,6 +19,7 @@ from gi.repository import Gio, Gst, GLib
 from random import randint
 
 from lollypop.define import Lp, ArtSize, Type
+from lollypop.objects import Base
 
 
 class Server:
@@ -322,6 +323,8 @@ class MPRIS(Server):
         else:
             if Lp().player.current_track.id >= 0:
                 track_id = Lp().player.current_track.id
+                # Load all metadata at once
+                Base.hydrate([Lp().player.current_track])
             else:
                 track_id = randint(10000000, 90000000)
             self.__metadata['mpris:trackid'] = self.__get_media_id(track_id)
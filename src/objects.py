@@ -13,11 +13,191 @@
 
 from gi.repository import GLib
 
+from threading import Lock
+from collections import OrderedDict
+
 from lollypop.radios import Radios
 from lollypop.define import Lp, Type
 from lollypop.sqlcursor import SqlCursor
 
 
+class ObjectsCache:
+    """
+        Bounded LRU cache of objects attributes by id
+        Shared by all objects of a type, so a new Track(id) do not query
+        db again for attributes already read
+    """
+
+    def __init__(self, size, index=None):
+        """
+            Init cache
+            @param size as int, max number of ids
+            @param index as str, attribute ids can be removed by
+        """
+        self.__size = size
+        self.__values = OrderedDict()
+        self.__loaded = set()
+        self.__lock = Lock()
+        self.__index_attr = index
+        # {attribute value: set(ids)}
+        self.__index = {}
+
+    def get(self, object_id, attr):
+        """
+            Get cached attribute
+            @param object_id as int
+            @param attr as str
+            @return value or None
+            @thread safe
+        """
+        with self.__lock:
+            values = self.__values.get(object_id, None)
+            if values is None:
+                return None
+            self.__values.move_to_end(object_id)
+            return self.__copy(values.get(attr, None))
+
+    def get_all(self, object_id):
+        """
+            Get all cached attributes
+            @param object_id as int
+            @return {attr as str: value}
+            @thread safe
+        """
+        with self.__lock:
+            values = self.__values.get(object_id, {})
+            if values:
+                self.__values.move_to_end(object_id)
+            return {attr: self.__copy(value)
+                    for (attr, value) in values.items()}
+
+    def set(self, object_id, attr, value):
+        """
+            Cache attribute
+            @param object_id as int
+            @param attr as str
+            @param value as object
+            @thread safe
+        """
+        with self.__lock:
+            values = self.__values.setdefault(object_id, {})
+            if attr == self.__index_attr:
+                self.__unindex(object_id, values)
+                self.__index.setdefault(value, set()).add(object_id)
+            values[attr] = self.__copy(value)
+            self.__values.move_to_end(object_id)
+            self.__evict()
+
+    def update(self, object_id, values):
+        """
+            Cache all attributes for id
+            @param object_id as int
+            @param values as {attr as str: value}
+            @thread safe
+        """
+        with self.__lock:
+            cached = self.__values.setdefault(object_id, {})
+            if self.__index_attr in values:
+                self.__unindex(object_id, cached)
+                self.__index.setdefault(values[self.__index_attr],
+                                        set()).add(object_id)
+            for (attr, value) in values.items():
+                cached[attr] = self.__copy(value)
+            self.__values.move_to_end(object_id)
+            self.__loaded.add(object_id)
+            self.__evict()
+
+    def is_loaded(self, object_id):
+        """
+            True if all attributes are cached for id
+            @param object_id as int
+            @return bool
+        """
+        with self.__lock:
+            return object_id in self.__loaded
+
+    def remove(self, object_id):
+        """
+            Forget id
+            @param object_id as int
+            @thread safe
+        """
+        with self.__lock:
+            self.__unindex(object_id, self.__values.pop(object_id, {}))
+            self.__loaded.discard(object_id)
+
+    def remove_by(self, value):
+        """
+            Forget ids with index attribute equal to value
+            @param value as object
+            @thread safe
+        """
+        with self.__lock:
+            for object_id in self.__index.pop(value, set()):
+                self.__values.pop(object_id, None)
+                self.__loaded.discard(object_id)
+
+    def remove_if(self, func):
+        """
+            Forget ids matching func
+            @param func as function(values as {attr: value}) -> bool
+            @thread safe
+        """
+        with self.__lock:
+            for (object_id, values) in list(self.__values.items()):
+                if func(values):
+                    del self.__values[object_id]
+                    self.__loaded.discard(object_id)
+                    self.__unindex(object_id, values)
+
+    def clear(self):
+        """
+            Forget all ids
+            @thread safe
+        """
+        with self.__lock:
+            self.__values = OrderedDict()
+            self.__loaded = set()
+            self.__index = {}
+
+#######################
+# PRIVATE             #
+#######################
+    def __copy(self, value):
+        """
+            Copy lists, callers may modify them
+            @param value as object
+            @return object
+        """
+        if isinstance(value, list):
+            return list(value)
+        return value
+
+    def __evict(self):
+        """
+            Remove least recently used ids
+        """
+        while len(self.__values) > self.__size:
+            (object_id, values) = self.__values.popitem(last=False)
+            self.__loaded.discard(object_id)
+            self.__unindex(object_id, values)
+
+    def __unindex(self, object_id, values):
+        """
+            Remove id from index
+            @param object_id as int
+            @param values as {attr as str: value}, cached values for id
+        """
+        if self.__index_attr not in values:
+            return
+        value = values[self.__index_attr]
+        ids = self.__index.get(value, None)
+        if ids is not None:
+            ids.discard(object_id)
+            if not ids:
+                del self.__index[value]
+
+
 class Base:
     """
         Base for album and track objects
@@ -25,6 +205,52 @@ class Base:
     def __init__(self, db):
         self.db = db
 
+    def hydrate(objects):
+        """
+            Load attributes for objects of same type with a few queries
+            instead of one query by attribute and by object
+            Already loaded attributes are kept
+            @param objects as [Album] or [Track]
+        """
+        objects = [obj for obj in objects
+                   if obj.id is not None and obj.id >= 0]
+        if not objects:
+            return
+        cache = objects[0].CACHE
+        # Values are kept here, cache may evict them while loading
+        values = {}
+        missing_ids = set()
+        for obj in objects:
+            if obj.id in values or obj.id in missing_ids:
+                continue
+            if cache.is_loaded(obj.id):
+                values[obj.id] = cache.get_all(obj.id)
+            else:
+                missing_ids.add(obj.id)
+        if missing_ids:
+            rows = objects[0].db.get_many(list(missing_ids))
+            for (object_id, object_values) in rows.items():
+                values[object_id] = object_values
+                cache.update(object_id, object_values)
+        for obj in objects:
+            for (attr, value) in values.get(obj.id, {}).items():
+                attr_name = "_" + attr
+                if getattr(obj, attr_name) is None:
+                    # Callers may modify lists
+                    if isinstance(value, list):
+                        value = list(value)
+                    setattr(obj, attr_name, value)
+
+    def connect_cache(scanner):
+        """
+            Forget cached albums and tracks when collection changes
+            @param scanner as CollectionScanner
+        """
+        scanner.connect('album-updated', Base.__on_album_updated)
+        scanner.connect('artist-updated', Base.__on_artist_updated)
+        scanner.connect('genre-updated', Base.__on_genre_updated)
+        scanner.connect('scan-finished', Base.__on_scan_finished)
+
     def __dir__(self, *args, **kwargs):
         """
             Concatenate base class's fields with child class's fields
@@ -41,7 +267,10 @@ class Base:
             attr_name = "_" + attr
             attr_value = getattr(self, attr_name)
             if attr_value is None:
-                attr_value = getattr(self.db, "get_" + attr)(self.id)
+                attr_value = self.CACHE.get(self.id, attr)
+                if attr_value is None:
+                    attr_value = getattr(self.db, "get_" + attr)(self.id)
+                    self.CACHE.set(self.id, attr, attr_value)
                 setattr(self, attr_name, attr_value)
             # Return default value if None
             if attr_value is None:
@@ -89,6 +318,49 @@ class Base:
         except Exception as e:
             print("Base::set_popularity(): %s" % e)
 
+#######################
+# PRIVATE             #
+#######################
+    def __on_album_updated(scanner, album_id, destroy):
+        """
+            Forget album and its tracks
+            @param scanner as CollectionScanner
+            @param album_id as int
+            @param destroy as bool
+        """
+        Album.CACHE.remove(album_id)
+        Track.CACHE.remove_by(album_id)
+
+    def __on_artist_updated(scanner, artist_id, add):
+        """
+            Forget albums and tracks for artist
+            @param scanner as CollectionScanner
+            @param artist_id as int
+            @param add as bool
+        """
+        def has_artist(values):
+            return artist_id in values.get("artist_ids", [])
+        Album.CACHE.remove_if(has_artist)
+        Track.CACHE.remove_if(has_artist)
+
+    def __on_genre_updated(scanner, genre_id, add):
+        """
+            Forget tracks for genre
+            @param scanner as CollectionScanner
+            @param genre_id as int
+            @param add as bool
+        """
+        Track.CACHE.remove_if(lambda values:
+                              genre_id in values.get("genre_ids", []))
+
+    def __on_scan_finished(scanner):
+        """
+            Forget everything, removed ids may have been reused
+            @param scanner as CollectionScanner
+        """
+        Album.CACHE.clear()
+        Track.CACHE.clear()
+
 
 class Disc:
     """
@@ -136,7 +408,7 @@ class Disc:
 
             @return list of Track
         """
-        return [Track(id) for id in self.track_ids]
+        return Track.load_many(self.track_ids)
 
 
 class Album(Base):
@@ -146,6 +418,7 @@ class Album(Base):
     FIELDS = ['name', 'artists', 'artist_ids',
               'year', 'uri', 'duration', 'mtime', 'synced']
     DEFAULTS = ['', '', [], '', '', 0, 0, False]
+    CACHE = ObjectsCache(1000)
 
     def __init__(self, album_id=None, genre_ids=[], artist_ids=[]):
         """
@@ -161,6 +434,19 @@ class Album(Base):
         if artist_ids:
             self.artist_ids = artist_ids
 
+    def load_many(album_ids, genre_ids=[], artist_ids=[]):
+        """
+            Get albums with attributes loaded from db
+            @param album_ids as [int]
+            @param genre_ids as [int]
+            @param artist_ids as [int]
+            @return [Album]
+        """
+        albums = [Album(album_id, genre_ids, artist_ids)
+                  for album_id in album_ids]
+        Base.hydrate(albums)
+        return albums
+
     def set_genres(self, genre_ids):
         """
             Set album genres
@@ -212,7 +498,7 @@ class Album(Base):
             @return list of Track
         """
         if not self._tracks and self.track_ids:
-            self._tracks = [Track(track_id) for track_id in self.track_ids]
+            self._tracks = Track.load_many(self.track_ids)
         return self._tracks
 
     @property
@@ -268,7 +554,7 @@ class Album(Base):
             Lp().genres.clean(genre_id)
             GLib.idle_add(Lp().scanner.emit, 'genre-updated',
                           genre_id, False)
-        with SqlCursor(Lp().db) as sql:
+        with SqlCursor(Lp().db, False) as sql:
             sql.commit()
         GLib.idle_add(Lp().scanner.emit, 'album-updated', self.id, deleted)
 
@@ -281,6 +567,7 @@ class Track(Base):
               'artist_ids', 'genre_ids', 'album_name', 'artists', 'genres',
               'duration', 'number', 'year', 'persistent', 'mtime']
     DEFAULTS = ['', None, [], [], [], '', '', '', 0.0, 0, None, 1, 0]
+    CACHE = ObjectsCache(5000, "album_id")
 
     def __init__(self, track_id=None):
         """
@@ -292,6 +579,16 @@ class Track(Base):
         self._uri = None
         self._non_album_artists = []
 
+    def load_many(track_ids):
+        """
+            Get tracks with attributes loaded from db
+            @param track_ids as [int]
+            @return [Track]
+        """
+        tracks = [Track(track_id) for track_id in track_ids]
+        Base.hydrate(tracks)
+        return tracks
+
     @property
     def is_web(self):
         """
@@ -433,6 +730,6 @@ class Track(Base):
             Lp().genres.clean(genre_id)
             GLib.idle_add(Lp().scanner.emit, 'genre-updated',
                           genre_id, False)
-        with SqlCursor(Lp().db) as sql:
+        with SqlCursor(Lp().db, False) as sql:
             sql.commit()
         GLib.idle_add(Lp().scanner.emit, 'album-updated', album.id, deleted)
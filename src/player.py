@@ -262,6 +262,8 @@ class Player(BinPlayer, QueuePlayer, UserPlaylistPlayer, RadioPlayer,
         for artist_id in album.artist_ids:
             if artist_id >= 0:
                 self._context.artist_ids[album.id].append(artist_id)
+        self._play_order.clear()
+        self.invalidate_shuffle()
         self.load(album.tracks[0])
         self._albums = [album.id]
 
@@ -278,6 +280,7 @@ class Player(BinPlayer, QueuePlayer, UserPlaylistPlayer, RadioPlayer,
         self._albums = []
         self._context.genre_ids = {}
         self._context.aritst_ids = {}
+        self._play_order.clear()
         ShufflePlayer.reset_history(self)
 
         # We are not playing a user playlist anymore
@@ -419,6 +422,13 @@ class Player(BinPlayer, QueuePlayer, UserPlaylistPlayer, RadioPlayer,
                         self._context.artist_ids = load(open(
                                             DataPath + "/artist_ids.bin",
                                             "rb"))
+                        # Missing if saved by a previous version
+                        try:
+                            self.set_shuffle_state(load(open(
+                                            DataPath + "/shuffle.bin",
+                                            "rb")))
+                        except Exception as e:
+                            print("Player::restore_state()", e)
                     self.set_next()
                     self.set_prev()
                 else:
@@ -520,13 +530,23 @@ class Player(BinPlayer, QueuePlayer, UserPlaylistPlayer, RadioPlayer,
             # We send this signal to update next popover
             Lp().player.emit('queue-changed')
         elif self._current_track.id is not None:
-            pos = self._albums.index(self._current_track.album.id)
-            if pos + 1 >= len(self._albums):
+            pos = self._play_order.get_album_position(
+                                            self._albums,
+                                            self._current_track.album.id)
+            if pos is None or pos + 1 >= len(self._albums):
                 next_album = self._albums[0]
             else:
                 next_album = self._albums[pos + 1]
             self.load(Album(next_album).tracks[0])
 
+    def connect_scanner(self, scanner):
+        """
+            Forget album track ids when collection changes
+            @param scanner as CollectionScanner
+        """
+        scanner.connect('album-updated', self.__on_album_updated)
+        scanner.connect('scan-finished', self.__on_scan_finished)
+
     def update_crossfading(self):
         """
             Calculate if crossfading is needed
@@ -556,6 +576,23 @@ class Player(BinPlayer, QueuePlayer, UserPlaylistPlayer, RadioPlayer,
 #######################
 # PRIVATE             #
 #######################
+    def __on_album_updated(self, scanner, album_id, deleted):
+        """
+            Forget album track ids
+            @param scanner as CollectionScanner
+            @param album id as int
+            @param deleted as bool
+        """
+        self._play_order.remove_album(album_id)
+        self.invalidate_shuffle()
+
+    def __on_scan_finished(self, scanner):
+        """
+            Forget all album track ids, tracks may have been added
+            @param scanner as CollectionScanner
+        """
+        self._play_order.clear()
+
     def __on_playback_changed(self, settings, value):
         """
             reset next/prev
@@ -14,6 +14,7 @@ from gi.repository import GObject
 
 from lollypop.define import PlayContext, Lp, NextContext
 from lollypop.objects import Track
+from lollypop.playorder import PlayOrder
 
 
 class BasePlayer(GObject.GObject):
@@ -66,6 +67,8 @@ class BasePlayer(GObject.GObject):
             self._queue = []
             # Albums in current playlist
             self._albums = []
+            # Positions for next/prev
+            self._play_order = PlayOrder()
             # Current shuffle mode
             self._shuffle = Lp().settings.get_enum('shuffle')
             # For tracks from the cmd line
@@ -41,6 +41,8 @@ class BinPlayer(BasePlayer):
                                                            'playbin', 'player')
         self.__playbin2 = Gst.ElementFactory.make('playbin', 'player')
         self.__preview = None
+        # Web track uris being resolved
+        self.__prefetching = set()
         self._plugins = self._plugins1 = PluginsPlayer(self.__playbin1)
         self._plugins2 = PluginsPlayer(self.__playbin2)
         self._playbin.connect('notify::volume', self.__on_volume_changed)
@@ -241,7 +243,7 @@ class BinPlayer(BasePlayer):
         if self.__need_to_stop():
             return False
         if init_volume:
-            self._plugins.volume.props.volume = 1.0
+            self._plugins.unset_fade(1.0)
         debug("BinPlayer::_load_track(): %s" % track.uri)
         try:
             if track.id in self._queue:
@@ -251,6 +253,12 @@ class BinPlayer(BasePlayer):
             else:
                 self._current_track = track
                 self._queue_track = None
+            if track.is_web:
+                # Use stream uri prefetched by set_next()
+                from lollypop.web import Web
+                uri = Web.get_cached_uri(track.uri)
+                if uri is not None:
+                    track.set_uri(uri)
             if track.is_web:
                 loaded = self._load_web(track)
                 # If track not loaded, go next
@@ -270,6 +278,7 @@ class BinPlayer(BasePlayer):
     def _load_web(self, track, play=True):
         """
             Load track url and play it
+            If play is False, only resolve url for next playback
             @param track as Track
             @param play as bool
             @return True if loading
@@ -282,6 +291,10 @@ class BinPlayer(BasePlayer):
             from lollypop.web import Web
             if play:
                 self.emit('loading-changed', True)
+            elif track.uri in self.__prefetching:
+                return True
+            else:
+                self.__prefetching.add(track.uri)
             t = Thread(target=Web.play_track,
                        args=(track, play, self.__set_gv_uri))
             t.daemon = True
@@ -334,7 +347,9 @@ class BinPlayer(BasePlayer):
                                     self.current_track.title,
                                     int(self.current_track.duration))
         if not Lp().scanner.is_locked():
-            Lp().tracks.set_listened_at(self.current_track.id, int(time()))
+            ltime = int(time())
+            Lp().tracks.set_listened_at(self.current_track.id, ltime)
+            self.update_party_weight(self.current_track.id, ltime=ltime)
 
 #######################
 # PRIVATE             #
@@ -371,56 +386,6 @@ class BinPlayer(BasePlayer):
             else:
                 self.play()
 
-    def __volume_up(self, playbin, plugins, duration):
-        """
-            Make volume going up smoothly
-            @param playbin as Gst.Bin
-            @param plugins as PluginsPlayer
-            @param duration as int
-        """
-        # We are not the active playbin, stop all
-        if self._playbin != playbin:
-            return
-        if duration > 0:
-            vol = plugins.volume.props.volume
-            steps = duration / 0.25
-            vol_up = (1.0 - vol) / steps
-            rate = vol + vol_up
-            if rate < 1.0:
-                plugins.volume.props.volume = rate
-                GLib.timeout_add(250, self.__volume_up,
-                                 playbin, plugins, duration - 0.25)
-            else:
-                plugins.volume.props.volume = 1.0
-        else:
-            plugins.volume.props.volume = 1.0
-
-    def __volume_down(self, playbin, plugins, duration):
-        """
-            Make volume going down smoothly
-            @param playbin as Gst.Bin
-            @param plugins as PluginsPlayer
-            @param duration as int
-        """
-        # We are again the active playbin, stop all
-        if self._playbin == playbin:
-            return
-        if duration > 0:
-            vol = plugins.volume.props.volume
-            steps = duration / 0.25
-            vol_down = vol / steps
-            rate = vol - vol_down
-            if rate > 0:
-                plugins.volume.props.volume = rate
-                GLib.timeout_add(250, self.__volume_down,
-                                 playbin, plugins, duration - 0.25)
-            else:
-                plugins.volume.props.volume = 0.0
-                playbin.set_state(Gst.State.NULL)
-        else:
-            plugins.volume.props.volume = 0.0
-            playbin.set_state(Gst.State.NULL)
-
     def __do_crossfade(self, duration, track=None, next=True):
         """
             Crossfade tracks
@@ -431,11 +396,12 @@ class BinPlayer(BasePlayer):
         # No cossfading if we need to stop
         if self.__need_to_stop() and next:
             return
-        if self._playbin.query_position(Gst.Format.TIME)[1] / 1000000000 >\
-                self.current_track.duration - 10:
+        position = self._playbin.query_position(Gst.Format.TIME)[1]
+        if position / 1000000000 > self.current_track.duration - 10:
             self._scrobble(self.current_track, self._start_time)
-        GLib.idle_add(self.__volume_down, self._playbin,
-                      self._plugins, duration)
+        self._plugins.set_fade(position, int(duration * Gst.SECOND), False)
+        GLib.timeout_add(int(duration * 1000),
+                         self.__on_faded_out, self._playbin)
         if self._playbin == self.__playbin2:
             self._playbin = self.__playbin1
             self._plugins = self._plugins1
@@ -443,21 +409,15 @@ class BinPlayer(BasePlayer):
             self._playbin = self.__playbin2
             self._plugins = self._plugins2
 
+        if track is None:
+            if next and self._next_track.id is not None:
+                track = self._next_track
+            elif self._prev_track.id is not None:
+                track = self._prev_track
         if track is not None:
+            # Set fade before loading, first buffers are already faded
+            self._plugins.set_fade(0, int(duration * Gst.SECOND), True)
             self.__load(track, False)
-            self._plugins.volume.props.volume = 0
-            GLib.idle_add(self.__volume_up, self._playbin,
-                          self._plugins, duration)
-        elif next and self._next_track.id is not None:
-            self.__load(self._next_track, False)
-            self._plugins.volume.props.volume = 0
-            GLib.idle_add(self.__volume_up, self._playbin,
-                          self._plugins, duration)
-        elif self._prev_track.id is not None:
-            self.__load(self._prev_track, False)
-            self._plugins.volume.props.volume = 0
-            GLib.idle_add(self.__volume_up, self._playbin,
-                          self._plugins, duration)
 
     def __need_to_stop(self):
         """
@@ -471,6 +431,15 @@ class BinPlayer(BasePlayer):
                 stop = True
         return stop and self.is_playing()
 
+    def __on_faded_out(self, playbin):
+        """
+            Stop playbin once faded out
+            @param playbin as Gst.Bin
+        """
+        # We are again the active playbin, keep playing
+        if self._playbin != playbin:
+            playbin.set_state(Gst.State.NULL)
+
     def __on_volume_changed(self, playbin, sink):
         """
             Update volume
@@ -596,7 +565,8 @@ class BinPlayer(BasePlayer):
         self._scrobble(finished, finished_start_time)
         # Increment popularity
         if not Lp().scanner.is_locked():
-            Lp().tracks.set_more_popular(finished.id)
+            popularity = Lp().tracks.set_more_popular(finished.id)
+            self.update_party_weight(finished.id, popularity=popularity)
             Lp().albums.set_more_popular(finished.album_id)
 
     def __set_gv_uri(self, uri, track, play):
@@ -606,6 +576,10 @@ class BinPlayer(BasePlayer):
             @param track as Track
             @param play as bool
         """
+        self.__prefetching.discard(track.uri)
+        # Prefetch failed, will try again on playback
+        if uri is None and not play:
+            return
         track.set_uri(uri)
         if play:
             self.load(track)
@@ -12,7 +12,7 @@
 
 from lollypop.define import NextContext
 from lollypop.player_base import BasePlayer
-from lollypop.objects import Track, Album
+from lollypop.objects import Track
 
 
 class LinearPlayer(BasePlayer):
@@ -35,32 +35,38 @@ class LinearPlayer(BasePlayer):
         if not self._albums:
             return self._current_track
         track = Track()
-        if self._current_track.album.id in self._context.genre_ids and\
-           self._albums:
-            genre_ids = self._context.genre_ids[self._current_track.album.id]
-            artist_ids = self._context.artist_ids[self._current_track.album.id]
-            album = Album(self._current_track.album.id, genre_ids, artist_ids)
-            if self._current_track.id in album.track_ids:
-                new_track_position = album.track_ids.index(
-                                                self._current_track.id) + 1
+        album_id = self._current_track.album.id
+        if album_id in self._context.genre_ids and self._albums:
+            genre_ids = self._context.genre_ids[album_id]
+            artist_ids = self._context.artist_ids[album_id]
+            track_ids = self._play_order.get_track_ids(album_id,
+                                                       genre_ids,
+                                                       artist_ids)
+            position = self._play_order.get_track_position(
+                                                album_id,
+                                                genre_ids,
+                                                artist_ids,
+                                                self._current_track.id)
+            if position is not None:
                 # next album
-                if new_track_position >= len(album.tracks):
-                    try:
-                        pos = self._albums.index(album.id)
-                        # we are on last album, go to first
-                        if pos + 1 >= len(self._albums):
-                            self._next_context = NextContext.STOP
-                            pos = 0
-                        else:
-                            pos += 1
-                    except:
-                        pos = 0  # Happens if current album has been removed
-                    genre_ids = self._context.genre_ids[self._albums[pos]]
-                    track = Album(self._albums[pos],
-                                  genre_ids, artist_ids).tracks[0]
+                if position + 1 >= len(track_ids):
+                    pos = self._play_order.get_album_position(self._albums,
+                                                              album_id)
+                    # Happens if current album has been removed
+                    if pos is None:
+                        pos = 0
+                    # we are on last album, go to first
+                    elif pos + 1 >= len(self._albums):
+                        self._next_context = NextContext.STOP
+                        pos = 0
+                    else:
+                        pos += 1
+                    track_ids = self.__get_track_ids(self._albums[pos])
+                    if track_ids:
+                        track = Track(track_ids[0])
                 # next track
                 else:
-                    track = album.tracks[new_track_position]
+                    track = Track(track_ids[position + 1])
         return track
 
     def prev(self):
@@ -72,28 +78,49 @@ class LinearPlayer(BasePlayer):
         if not self._albums:
             return self._current_track
         track = Track()
-        if self._current_track.album.id in self._context.genre_ids and \
-           self._albums:
-            genre_ids = self._context.genre_ids[self._current_track.album.id]
-            artist_ids = self._context.artist_ids[self._current_track.album.id]
-            album = Album(self._current_track.album.id, genre_ids, artist_ids)
-            if self._current_track.id in album.track_ids:
-                new_track_position = album.track_ids.index(
-                                                self._current_track.id) - 1
+        album_id = self._current_track.album.id
+        if album_id in self._context.genre_ids and self._albums:
+            genre_ids = self._context.genre_ids[album_id]
+            artist_ids = self._context.artist_ids[album_id]
+            track_ids = self._play_order.get_track_ids(album_id,
+                                                       genre_ids,
+                                                       artist_ids)
+            position = self._play_order.get_track_position(
+                                                album_id,
+                                                genre_ids,
+                                                artist_ids,
+                                                self._current_track.id)
+            if position is not None:
                 # Previous album
-                if new_track_position < 0:
-                    try:
-                        pos = self._albums.index(album.id)
-                        if pos - 1 < 0:  # we are on last album, go to first
-                            pos = len(self._albums) - 1
-                        else:
-                            pos -= 1
-                    except:
-                        pos = 0  # Happens if current album has been removed
-                    genre_ids = self._context.genre_ids[self._albums[pos]]
-                    track = Album(self._albums[pos],
-                                  genre_ids, artist_ids).tracks[-1]
+                if position - 1 < 0:
+                    pos = self._play_order.get_album_position(self._albums,
+                                                              album_id)
+                    # Happens if current album has been removed
+                    if pos is None:
+                        pos = 0
+                    # we are on first album, go to last
+                    elif pos - 1 < 0:
+                        pos = len(self._albums) - 1
+                    else:
+                        pos -= 1
+                    track_ids = self.__get_track_ids(self._albums[pos])
+                    if track_ids:
+                        track = Track(track_ids[-1])
                 # Previous track
                 else:
-                    track = album.tracks[new_track_position]
+                    track = Track(track_ids[position - 1])
         return track
+
+#######################
+# PRIVATE             #
+#######################
+    def __get_track_ids(self, album_id):
+        """
+            Get album track ids for current context
+            @param album id as int
+            @return track ids as [int]
+        """
+        return self._play_order.get_track_ids(
+                                    album_id,
+                                    self._context.genre_ids[album_id],
+                                    self._context.artist_ids.get(album_id, []))
@@ -11,15 +11,19 @@
 # You should have received a copy of the GNU General Public License
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 
-from gi.repository import Gst
+from gi.repository import Gst, GstController
 
-from lollypop.define import Lp
+from math import sin, pi
+
+from lollypop.define import Lp, MixCurve
 
 
 class PluginsPlayer:
     """
         Replay gain player
     """
+    # Control points by fade, volume is interpolated between them
+    __FADE_STEPS = 20
 
     def __init__(self, playbin):
         """
@@ -37,6 +41,13 @@ class PluginsPlayer:
         self.volume = Gst.ElementFactory.make("volume",
                                               "volume")
         self.volume.props.volume = 0.0
+        # Fades are applied by the volume element in streaming thread
+        self.__fader = GstController.InterpolationControlSource.new()
+        self.__fader.props.mode = GstController.InterpolationMode.LINEAR
+        self.volume.add_control_binding(
+            GstController.DirectControlBinding.new_absolute(self.volume,
+                                                            "volume",
+                                                            self.__fader))
         self.rgvolume = Gst.ElementFactory.make("rgvolume",
                                                 "rgvolume")
         rglimiter = Gst.ElementFactory.make("rglimiter",
@@ -75,3 +86,39 @@ class PluginsPlayer:
                                "sink",
                                rg_audioconvert1.get_static_pad("sink")))
         playbin.set_property("audio-sink", bin)
+
+    def set_fade(self, start, duration, fade_in):
+        """
+            Fade volume, fade out starts from current volume
+            @param start as int (stream time in ns)
+            @param duration as int (ns)
+            @param fade_in as bool
+        """
+        curve = Lp().settings.get_enum('mix-curve')
+        if fade_in:
+            volume = 1.0
+        else:
+            volume = self.volume.props.volume
+        duration = max(duration, 1)
+        self.__fader.unset_all()
+        for i in range(0, self.__FADE_STEPS + 1):
+            if fade_in:
+                x = i / self.__FADE_STEPS
+            else:
+                x = 1 - i / self.__FADE_STEPS
+            if curve == MixCurve.EQUAL_POWER:
+                rate = sin(x * pi / 2)
+            elif curve == MixCurve.SMOOTH:
+                rate = x * x * (3 - 2 * x)
+            else:
+                rate = x
+            self.__fader.set(start + duration * i // self.__FADE_STEPS,
+                             rate * volume)
+
+    def unset_fade(self, volume):
+        """
+            Stop fading, set volume
+            @param volume as double
+        """
+        self.__fader.unset_all()
+        self.volume.props.volume = volume
@@ -14,8 +14,9 @@ import random
 
 from lollypop.define import Shuffle, NextContext, Lp, Type
 from lollypop.player_base import BasePlayer
-from lollypop.objects import Track, Album
+from lollypop.objects import Track
 from lollypop.list import LinkedList
+from lollypop.playorder import ShuffleOrder, WeightedOrder
 
 
 class ShufflePlayer(BasePlayer):
@@ -42,10 +43,10 @@ class ShufflePlayer(BasePlayer):
         self.__history = []
         # Used by shuffle albums to restore playlist before shuffle
         self._albums_backup = []
-        # Albums already played
-        self.__already_played_albums = []
-        # Tracks already played for albums
-        self.__already_played_tracks = {}
+        # Random tracks, remember already played ones
+        self.__shuffle_order = ShuffleOrder()
+        # Party mode, popular tracks first
+        self.__party_order = WeightedOrder()
         # Reset user playlist
         self._user_playlist = []
         self._user_playlist_ids = []
@@ -78,6 +79,36 @@ class ShufflePlayer(BasePlayer):
                 track_id = self._current_track.id
         return Track(track_id)
 
+    def get_shuffle_state(self):
+        """
+            Get shuffle state
+            @return tracks already played as set(int)
+        """
+        return self.__shuffle_order.get_played()
+
+    def set_shuffle_state(self, state):
+        """
+            Restore shuffle state
+            @param state as set(int), see get_shuffle_state()
+        """
+        self.__shuffle_order.set_played(state)
+
+    def invalidate_shuffle(self):
+        """
+            Reload random order tracks on next draw, collection changed
+        """
+        self.__shuffle_order.invalidate()
+        self.__party_order.invalidate()
+
+    def update_party_weight(self, track_id, popularity=None, ltime=None):
+        """
+            Update track weight in party mode
+            @param track id as int
+            @param popularity as int
+            @param ltime as int
+        """
+        self.__party_order.update(track_id, popularity, ltime)
+
     def get_party_ids(self):
         """
             Return party ids
@@ -243,50 +274,37 @@ class ShufflePlayer(BasePlayer):
             Next track in shuffle mode
             @return track id as int
         """
-        try:
-            track_id = self.__get_random()
-            # Need to clear history
-            if track_id is None:
-                self._albums = self.__already_played_albums
-                self.reset_history()
-                return self.__shuffle_next()
-            return track_id
-        except:  # Recursion error
-            return None
+        track_id = self.__get_random()
+        # All tracks played, start again
+        if track_id is None:
+            order = self.__get_order()
+            order.reset()
+            track_id = order.next(self._albums, self._context.genre_ids)
+        return track_id
 
     def __get_random(self):
         """
             Return a random track and make sure it has never been played
+            @return track id as int or None
         """
-        for album_id in sorted(self._albums,
-                               key=lambda *args: random.random()):
-            # We need to check this as in party mode, some items do not
-            # have a valid genre (Populars, ...)
-            if album_id in self._context.genre_ids.keys():
-                genre_ids = self._context.genre_ids[album_id]
-            else:
-                genre_ids = []
-            tracks = Album(album_id, genre_ids).track_ids
-            for track in sorted(tracks, key=lambda *args: random.random()):
-                if album_id not in self.__already_played_tracks.keys() or\
-                   track not in self.__already_played_tracks[album_id]:
-                    return track
-            # No new tracks for this album, remove it
-            # If albums not in shuffle history, it's not present
-            # in db anymore (update since shuffle set)
-            if album_id in self.__already_played_tracks.keys():
-                self.__already_played_tracks.pop(album_id)
-                self.__already_played_albums.append(album_id)
-            self._albums.remove(album_id)
-        self._next_context = NextContext.STOP
-        return None
+        track_id = self.__get_order().next(self._albums,
+                                           self._context.genre_ids)
+        if track_id is None:
+            self._next_context = NextContext.STOP
+        return track_id
 
     def __add_to_shuffle_history(self, track):
         """
             Add a track to shuffle history
             @param track as Track
         """
-        if track.album_id not in self.__already_played_tracks.keys():
-            self.__already_played_tracks[track.album_id] = []
-        if track.id not in self.__already_played_tracks[track.album_id]:
-            self.__already_played_tracks[track.album_id].append(track.id)
+        self.__get_order().add_played(track.id)
+
+    def __get_order(self):
+        """
+            Get random order for current mode
+            @return ShuffleOrder or WeightedOrder
+        """
+        if self.__is_party:
+            return self.__party_order
+        return self.__shuffle_order
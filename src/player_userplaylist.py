@@ -84,9 +84,10 @@ class UserPlaylistPlayer(BasePlayer):
             current_track = self._next_track
         else:
             current_track = self._current_track
-        if self._user_playlist and\
-           current_track.id in self._user_playlist:
-            idx = self._user_playlist.index(current_track.id)
+        idx = self._play_order.get_user_playlist_position(
+                                                        self._user_playlist,
+                                                        current_track.id)
+        if idx is not None:
             if idx + 1 >= len(self._user_playlist):
                 self._next_context = NextContext.STOP
                 idx = 0
@@ -101,9 +102,10 @@ class UserPlaylistPlayer(BasePlayer):
             @return Track
         """
         track = Track()
-        if self._user_playlist and\
-           self._current_track.id in self._user_playlist:
-            idx = self._user_playlist.index(self._current_track.id)
+        idx = self._play_order.get_user_playlist_position(
+                                                    self._user_playlist,
+                                                    self._current_track.id)
+        if idx is not None:
             if idx - 1 < 0:
                 idx = len(self._user_playlist) - 1
             else:
@@ -133,6 +133,18 @@ class Playlists(GObject.GObject):
                         (uri,))
             sql.commit()
 
+    def set_moved_uri(self, uri, new_uri):
+        """
+            Update track uri in playlists
+            @param uri as str
+            @param new uri as str
+        """
+        with SqlCursor(self) as sql:
+            sql.execute("UPDATE tracks SET uri=?\
+                        WHERE uri=?",
+                        (new_uri, uri))
+            sql.commit()
+
     def get(self):
         """
             Return availables playlists
@@ -416,7 +428,8 @@ class Playlists(GObject.GObject):
             Return a new sqlite cursor
         """
         try:
-            sql = sqlite3.connect(self._DB_PATH, 600.0)
+            sql = sqlite3.connect(self._DB_PATH, 600.0,
+                                  check_same_thread=False)
             sql.execute("ATTACH DATABASE '%s' AS music" % Database.DB_PATH)
             sql.create_collation('LOCALIZED', LocalizedCollation())
             return sql
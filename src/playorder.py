@@ -0,0 +1,474 @@
+# Copyright (c) 2014-2016 Cedric Bellegarde <cedric.bellegarde@adishatz.org>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+from random import randint, random
+from math import log
+from time import time
+
+from lollypop.define import Lp
+from lollypop.objects import Album
+
+
+def get_genre_contexts(album_ids, genre_ids):
+    """
+        Group albums by genres context
+        @param album ids as [int]
+        @param genre ids as {album id as int: [int]}
+        @return {genre ids as tuple: album ids as [int]}
+    """
+    contexts = {}
+    for album_id in album_ids:
+        key = tuple(genre_ids.get(album_id, []))
+        if key in contexts:
+            contexts[key].append(album_id)
+        else:
+            contexts[key] = [album_id]
+    return contexts
+
+
+class ListIndex:
+    """
+        Positions of items in a list
+        Rebuilt only if list changed under a looked up item
+    """
+
+    def __init__(self):
+        """
+            Init index
+        """
+        self.__items = None
+        self.__length = 0
+        self.__positions = {}
+
+    def get(self, items, item):
+        """
+            Get first position of item in items
+            @param items as list
+            @param item as object
+            @return position as int or None
+        """
+        if items is self.__items:
+            position = self.__positions.get(item, None)
+            if position is None:
+                # Items are only added/removed, not replaced
+                if len(items) == self.__length:
+                    return None
+            elif position < len(items) and items[position] == item:
+                return position
+        self.__items = items
+        self.__length = len(items)
+        self.__positions = {}
+        for position in range(len(items) - 1, -1, -1):
+            self.__positions[items[position]] = position
+        return self.__positions.get(item, None)
+
+
+class PlayOrder:
+    """
+        Play order for linear and user playlist players:
+            - Positions in albums/user playlist are indexed
+            - Album track ids are read from db once by play context
+    """
+
+    def __init__(self):
+        """
+            Init play order
+        """
+        self.__albums = ListIndex()
+        self.__user_playlist = ListIndex()
+        # {album id: (genre ids, artist ids, track ids, ListIndex)}
+        self.__tracks = {}
+
+    def get_album_position(self, album_ids, album_id):
+        """
+            Get album position
+            @param album ids as [int]
+            @param album id as int
+            @return position as int or None
+        """
+        return self.__albums.get(album_ids, album_id)
+
+    def get_user_playlist_position(self, track_ids, track_id):
+        """
+            Get track position in user playlist
+            @param track ids as [int]
+            @param track id as int
+            @return position as int or None
+        """
+        return self.__user_playlist.get(track_ids, track_id)
+
+    def get_track_ids(self, album_id, genre_ids, artist_ids):
+        """
+            Get album track ids for context
+            @param album id as int
+            @param genre ids as [int]
+            @param artist ids as [int]
+            @return track ids as [int]
+        """
+        return self.__get_tracks(album_id, genre_ids, artist_ids)[0]
+
+    def get_track_position(self, album_id, genre_ids, artist_ids, track_id):
+        """
+            Get track position in album for context
+            @param album id as int
+            @param genre ids as [int]
+            @param artist ids as [int]
+            @param track id as int
+            @return position as int or None
+        """
+        (track_ids, index) = self.__get_tracks(album_id, genre_ids,
+                                               artist_ids)
+        return index.get(track_ids, track_id)
+
+    def remove_album(self, album_id):
+        """
+            Forget album track ids
+            @param album id as int
+        """
+        self.__tracks.pop(album_id, None)
+
+    def clear(self):
+        """
+            Forget all album track ids
+        """
+        self.__tracks = {}
+
+#######################
+# PRIVATE             #
+#######################
+    def __get_tracks(self, album_id, genre_ids, artist_ids):
+        """
+            Get album track ids and their index, load them if needed
+            @param album id as int
+            @param genre ids as [int]
+            @param artist ids as [int]
+            @return (track ids as [int], ListIndex)
+        """
+        genre_ids = tuple(genre_ids)
+        artist_ids = tuple(artist_ids)
+        if album_id in self.__tracks:
+            (album_genre_ids, album_artist_ids,
+             track_ids, index) = self.__tracks[album_id]
+            if album_genre_ids == genre_ids and\
+                    album_artist_ids == artist_ids:
+                return (track_ids, index)
+        track_ids = Album(album_id, list(genre_ids),
+                          list(artist_ids)).track_ids
+        index = ListIndex()
+        self.__tracks[album_id] = (genre_ids, artist_ids, track_ids, index)
+        return (track_ids, index)
+
+
+class ShuffleOrder:
+    """
+        Random play order over albums tracks:
+            - Tracks are read from db once for albums
+            - Permutation is generated lazily (Fisher-Yates), O(1) by track
+            - Played tracks are skipped, they can be saved/restored
+    """
+
+    def __init__(self):
+        """
+            Init shuffle order
+        """
+        self.__album_ids = None
+        self.__length = 0
+        self.__track_ids = []
+        self.__position = 0
+        self.__played = set()
+
+    def next(self, album_ids, genre_ids):
+        """
+            Get a random track not played yet
+            @param album ids as [int]
+            @param genre ids as {album id as int: [int]}
+            @return track id as int or None if all tracks played
+        """
+        if album_ids is not self.__album_ids or\
+                len(album_ids) != self.__length:
+            self.__load(album_ids, genre_ids)
+        last = len(self.__track_ids) - 1
+        while self.__position <= last:
+            position = randint(self.__position, last)
+            track_id = self.__track_ids[position]
+            self.__track_ids[position] = self.__track_ids[self.__position]
+            self.__track_ids[self.__position] = track_id
+            # Next track may be asked again before being played,
+            # so only played tracks leave permutation
+            if track_id not in self.__played:
+                return track_id
+            self.__position += 1
+        return None
+
+    def add_played(self, track_id):
+        """
+            Mark track as played
+            @param track id as int
+        """
+        self.__played.add(track_id)
+
+    def invalidate(self):
+        """
+            Reload tracks on next draw, collection changed
+            Played tracks are kept
+        """
+        self.__album_ids = None
+
+    def reset(self):
+        """
+            Forget played tracks, start a new permutation
+        """
+        self.__played = set()
+        self.__position = 0
+
+    def get_played(self):
+        """
+            Get played tracks
+            @return track ids as set(int)
+        """
+        return self.__played
+
+    def set_played(self, track_ids):
+        """
+            Set played tracks
+            @param track ids as set(int)
+        """
+        self.__played = set(track_ids)
+
+#######################
+# PRIVATE             #
+#######################
+    def __load(self, album_ids, genre_ids):
+        """
+            Load tracks for albums, one request by genres context
+            @param album ids as [int]
+            @param genre ids as {album id as int: [int]}
+        """
+        contexts = get_genre_contexts(album_ids, genre_ids)
+        self.__track_ids = []
+        for (key, ids) in contexts.items():
+            self.__track_ids += Lp().tracks.get_ids_for_albums(ids,
+                                                               list(key))
+        # Forget played tracks not in collection anymore
+        if self.__album_ids is None:
+            self.__played &= set(self.__track_ids)
+        self.__album_ids = album_ids
+        self.__length = len(album_ids)
+        self.__position = 0
+
+
+class WeightedOrder:
+    """
+        Random play order over albums tracks for party mode:
+            - Popular tracks are played more often
+            - Recently listened tracks are played less often
+            - Weights are kept in a Fenwick tree, a track is drawn or
+              updated in O(log n)
+            - Played tracks are skipped until reset
+    """
+    # A listened track gets back its full weight after this delay
+    __RECENT_DELAY = 7 * 24 * 3600
+    __MIN_RECENCY = 0.05
+
+    def __init__(self):
+        """
+            Init weighted order
+        """
+        self.__album_ids = None
+        self.__length = 0
+        self.__track_ids = []
+        # {track id: position}
+        self.__positions = {}
+        # [(popularity, ltime)]
+        self.__stats = []
+        self.__weights = []
+        self.__tree = [0.0]
+        self.__available = 0
+        self.__played = set()
+
+    def next(self, album_ids, genre_ids):
+        """
+            Get a random track not played yet
+            @param album ids as [int]
+            @param genre ids as {album id as int: [int]}
+            @return track id as int or None if all tracks played
+        """
+        if album_ids is not self.__album_ids or\
+                len(album_ids) != self.__length:
+            self.__load(album_ids, genre_ids)
+        if self.__available == 0:
+            return None
+        position = self.__find(random() * self.__get_total())
+        # Float rounding may select an empty slot, rebuild sums
+        if self.__weights[position] == 0:
+            self.__build()
+            position = self.__find(random() * self.__get_total())
+            if self.__weights[position] == 0:
+                return None
+        return self.__track_ids[position]
+
+    def add_played(self, track_id):
+        """
+            Mark track as played
+            @param track id as int
+        """
+        self.__played.add(track_id)
+        self.__set_weight(track_id, 0)
+
+    def invalidate(self):
+        """
+            Reload tracks stats on next draw, collection changed
+            Played tracks are kept
+        """
+        self.__album_ids = None
+
+    def update(self, track_id, popularity=None, ltime=None):
+        """
+            Update track stats
+            @param track id as int
+            @param popularity as int
+            @param ltime as int
+        """
+        position = self.__positions.get(track_id, None)
+        if position is None:
+            return
+        (old_popularity, old_ltime) = self.__stats[position]
+        if popularity is None:
+            popularity = old_popularity
+        if ltime is None:
+            ltime = old_ltime
+        self.__stats[position] = (popularity, ltime)
+        if track_id not in self.__played:
+            self.__set_weight(track_id,
+                              self.__get_weight(popularity, ltime, time()))
+
+    def reset(self):
+        """
+            Forget played tracks
+        """
+        self.__played = set()
+        now = time()
+        self.__weights = [self.__get_weight(popularity, ltime, now)
+                          for (popularity, ltime) in self.__stats]
+        self.__build()
+
+#######################
+# PRIVATE             #
+#######################
+    def __load(self, album_ids, genre_ids):
+        """
+            Load tracks stats for albums, one request by genres context
+            @param album ids as [int]
+            @param genre ids as {album id as int: [int]}
+        """
+        contexts = get_genre_contexts(album_ids, genre_ids)
+        self.__track_ids = []
+        self.__positions = {}
+        self.__stats = []
+        for (key, ids) in contexts.items():
+            for (track_id, popularity, ltime) in\
+                    Lp().tracks.get_stats_for_albums(ids, list(key)):
+                if track_id in self.__positions:
+                    continue
+                self.__positions[track_id] = len(self.__track_ids)
+                self.__track_ids.append(track_id)
+                self.__stats.append((popularity, ltime))
+        # Forget played tracks not in collection anymore
+        if self.__album_ids is None:
+            self.__played &= set(self.__positions.keys())
+        self.__album_ids = album_ids
+        self.__length = len(album_ids)
+        now = time()
+        self.__weights = []
+        for position in range(0, len(self.__track_ids)):
+            if self.__track_ids[position] in self.__played:
+                self.__weights.append(0)
+            else:
+                (popularity, ltime) = self.__stats[position]
+                self.__weights.append(self.__get_weight(popularity,
+                                                        ltime, now))
+        self.__build()
+
+    def __get_weight(self, popularity, ltime, now):
+        """
+            Get track weight
+            @param popularity as int
+            @param ltime as int
+            @param now as float
+            @return float > 0
+        """
+        recency = (now - ltime) / self.__RECENT_DELAY
+        recency = min(1, max(self.__MIN_RECENCY, recency))
+        return (1 + log(1 + popularity)) * recency
+
+    def __set_weight(self, track_id, weight):
+        """
+            Set track weight
+            @param track id as int
+            @param weight as float
+        """
+        position = self.__positions.get(track_id, None)
+        if position is None:
+            return
+        old = self.__weights[position]
+        if old == weight:
+            return
+        if old == 0:
+            self.__available += 1
+        elif weight == 0:
+            self.__available -= 1
+        self.__weights[position] = weight
+        position += 1
+        while position < len(self.__tree):
+            self.__tree[position] += weight - old
+            position += position & -position
+
+    def __build(self):
+        """
+            Build Fenwick tree from weights, O(n)
+        """
+        length = len(self.__weights)
+        self.__tree = [0.0] + self.__weights
+        for position in range(1, length + 1):
+            parent = position + (position & -position)
+            if parent <= length:
+                self.__tree[parent] += self.__tree[position]
+        self.__available = length - self.__weights.count(0)
+
+    def __get_total(self):
+        """
+            Get weights sum
+            @return float
+        """
+        total = 0.0
+        position = len(self.__weights)
+        while position > 0:
+            total += self.__tree[position]
+            position -= position & -position
+        return total
+
+    def __find(self, value):
+        """
+            Get position of first track with weights sum over value
+            @param value as float
+            @return position as int
+        """
+        length = len(self.__weights)
+        position = 0
+        bit = 1 << (length.bit_length() - 1)
+        while bit:
+            child = position + bit
+            if child <= length and self.__tree[child] <= value:
+                position = child
+                value -= self.__tree[child]
+            bit >>= 1
+        return min(position, length - 1)
@@ -14,6 +14,7 @@ from gi.repository import Gtk
 
 from lollypop.view_artist_albums import ArtistAlbumsView
 from lollypop.define import Lp
+from lollypop.objects import Album
 
 
 class AlbumPopover(Gtk.Popover):
@@ -43,7 +44,7 @@ class AlbumPopover(Gtk.Popover):
 
         self.get_style_context().add_class('box-shadow')
         view = ArtistAlbumsView(artist_ids, genre_ids, show_cover)
-        view.populate([album_id])
+        view.populate(Album.load_many([album_id], genre_ids))
         wanted_height = min(400, min(height, view.requested_height))
         view.set_property('height-request', wanted_height)
         view.show()
@@ -656,6 +656,6 @@ class AlbumMenuPopover(Gtk.Popover):
                 Lp().genres.clean(genre_id)
                 GLib.idle_add(Lp().scanner.emit, 'genre-updated',
                               genre_id, False)
-        with SqlCursor(Lp().db) as sql:
+        with SqlCursor(Lp().db, False) as sql:
             sql.commit()
         Lp().scanner.emit('album-updated', album.id, True)
@@ -24,13 +24,14 @@ class QueueRow(Gtk.ListBoxRow):
         'track-moved': (GObject.SignalFlags.RUN_FIRST, None, (int, int, int))
     }
 
-    def __init__(self, track_id):
+    def __init__(self, track):
         """
             Init row widgets
-            @param track_id as int
+            @param track as Track
         """
         Gtk.ListBoxRow.__init__(self)
-        self.__id = track_id
+        self.__track = track
+        self.__id = track.id
         self.__number = 0
         self.set_margin_start(5)
         self.set_margin_end(5)
@@ -121,7 +122,7 @@ class QueueRow(Gtk.ListBoxRow):
         """
             Set artist, album and title label
         """
-        track = Track(self.__id)
+        track = self.__track
         self.__artist_label.set_markup(
                                  "<b>" + GLib.markup_escape_text(
                                         ", ".join(track.album.artists))+"</b>")
@@ -281,7 +282,7 @@ class QueuePopover(Gtk.Popover):
         """
         if Lp().player.get_queue():
             self.__clear_button.set_sensitive(True)
-        self.__add_items(list(Lp().player.get_queue()))
+        self.__add_items(Track.load_many(list(Lp().player.get_queue())))
 
 #######################
 # PROTECTED           #
@@ -310,12 +311,12 @@ class QueuePopover(Gtk.Popover):
     def __add_items(self, items, prev_album_id=None):
         """
             Add items to the view
-            @param item ids as [int]
+            @param items as [Track]
         """
         if items and not self._stop:
-            track_id = items.pop(0)
-            album_id = Lp().tracks.get_album_id(track_id)
-            row = self.__row_for_track_id(track_id)
+            track = items.pop(0)
+            album_id = track.album_id
+            row = self.__row_for_track(track)
             if album_id != prev_album_id:
                 surface = Lp().art.get_album_artwork(
                                         Album(album_id),
@@ -326,12 +327,12 @@ class QueuePopover(Gtk.Popover):
             self.__view.add(row)
             GLib.idle_add(self.__add_items, items, album_id)
 
-    def __row_for_track_id(self, track_id):
+    def __row_for_track(self, track):
         """
-            Get a row for track id
-            @param track id as int
+            Get a row for track
+            @param track as Track
         """
-        row = QueueRow(track_id)
+        row = QueueRow(track)
         row.set_labels()
         row.connect('destroy', self.__on_child_destroyed)
         row.connect('track-moved', self.__on_track_moved)
@@ -422,7 +423,7 @@ class QueuePopover(Gtk.Popover):
             up = False
         else:
             up = True
-        src_row = self.__row_for_track_id(src)
+        src_row = self.__row_for_track(Track(src))
         # Destroy current src row
         i = 0
         row_index = -1
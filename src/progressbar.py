@@ -46,3 +46,14 @@ class ProgressBar(Gtk.ProgressBar):
                 self.__callers.remove(caller)
                 self.hide()
                 Gtk.ProgressBar.set_fraction(self, 0.0)
+                self.set_show_text(False)
+
+    def set_text(self, text, caller):
+        """
+            Set text if caller is on top.
+        """
+        if not self.__callers:
+            return
+        if caller == self.__callers[0]:
+            self.set_show_text(True)
+            Gtk.ProgressBar.set_text(self, text)
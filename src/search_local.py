@@ -12,6 +12,7 @@
 
 from gi.repository import GObject, Gio, GLib
 
+from lollypop.sqlcursor import SqlCursor
 from lollypop.define import Lp
 from lollypop.search_item import SearchItem
 
@@ -58,6 +59,18 @@ class LocalSearch(GObject.GObject):
             @param search items as [str]
             @return tracks as [SearchItem]
         """
+        # Search only reads collection
+        with SqlCursor(Lp().db, True):
+            self.__do(search_items)
+
+#######################
+# PRIVATE             #
+#######################
+    def __do(self, search_items):
+        """
+            Search tracks containing name
+            @param search items as [str]
+        """
         self.__stop = False
         # Local search
         added_album_ids = []
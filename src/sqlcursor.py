@@ -11,11 +11,103 @@
 # You should have received a copy of the GNU General Public License
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 
-from threading import current_thread
+from threading import current_thread, Lock, Condition
+from time import time
 
 from lollypop.define import Lp
 
 
+class SqlPool:
+    """
+        Bounded pool of sqlite connections for a database object
+        Connections are shared by threads, one at a time
+    """
+    pools = {}
+    pools_lock = Lock()
+    SIZE = 8
+
+    def get(obj, readonly=False):
+        """
+            Get pool for object, create it if needed
+            @param obj as object with get_cursor()
+            @param readonly as bool
+            @return SqlPool
+        """
+        name = obj.__class__.__name__
+        if readonly:
+            name += "-readonly"
+        with SqlPool.pools_lock:
+            if name not in SqlPool.pools:
+                SqlPool.pools[name] = SqlPool(obj, readonly)
+            return SqlPool.pools[name]
+
+    def __init__(self, obj, readonly):
+        """
+            Init pool
+            @param obj as object with get_cursor()
+            @param readonly as bool
+        """
+        self.__obj = obj
+        self.__readonly = readonly
+        self.__idle = []
+        self.__count = 0
+        self.__condition = Condition()
+        self.__waits = 0
+        self.__wait_time = 0
+
+    def acquire(self):
+        """
+            Get a connection, wait if all connections are busy
+            @return sqlite3.Connection
+        """
+        with self.__condition:
+            start = None
+            while not self.__idle and self.__count >= self.SIZE:
+                if start is None:
+                    start = time()
+                self.__condition.wait()
+            if start is not None:
+                self.__waits += 1
+                self.__wait_time += time() - start
+                if Lp().debug is True:
+                    print("SqlPool::acquire(): %s waited %.3fs" %
+                          (self.__obj.__class__.__name__, time() - start))
+            if self.__idle:
+                return self.__idle.pop()
+            self.__count += 1
+        try:
+            if self.__readonly:
+                return self.__obj.get_cursor(True)
+            else:
+                return self.__obj.get_cursor()
+        except:
+            with self.__condition:
+                self.__count -= 1
+                self.__condition.notify()
+            raise
+
+    def release(self, c):
+        """
+            Give back connection to pool
+            Uncommitted changes are discarded
+            @param c as sqlite3.Connection
+        """
+        if c.in_transaction:
+            c.rollback()
+        with self.__condition:
+            self.__idle.append(c)
+            self.__condition.notify()
+
+    @property
+    def stats(self):
+        """
+            Pool usage
+            @return (connections as int, waits as int, wait time as float)
+        """
+        with self.__condition:
+            return (self.__count, self.__waits, self.__wait_time)
+
+
 class SqlCursor:
     """
         Context manager to get the SQL cursor
@@ -28,28 +120,42 @@ class SqlCursor:
         name = current_thread().getName() + obj.__class__.__name__
         Lp().cursors[name] = obj.get_cursor()
 
-    def __init__(self, obj):
+    def __init__(self, obj, readonly=None):
         """
             Init object
+            @param obj as object with get_cursor()
+            @param readonly as bool or None:
+                   True: read only cursor, thread write cursor if any
+                   False: write cursor, never a read only one
+                   None: thread cursor if any, else write cursor
         """
         self._obj = obj
-        self._creator = False
+        self._readonly = readonly
+        self._name = None
 
     def __enter__(self):
         """
-            Return cursor for thread, create a new one if needed
+            Return cursor for thread, take one from pool if needed
         """
         name = current_thread().getName() + self._obj.__class__.__name__
-        if name not in Lp().cursors:
-            self._creator = True
-            Lp().cursors[name] = self._obj.get_cursor()
-        return Lp().cursors[name]
+        # A thread may hold a write cursor and a read only one, write
+        # cursor is preferred so uncommitted changes are visible
+        if name in Lp().cursors:
+            return Lp().cursors[name]
+        if self._readonly is not False and\
+                name + "-readonly" in Lp().cursors:
+            return Lp().cursors[name + "-readonly"]
+        readonly = self._readonly is True
+        self._name = name + "-readonly" if readonly else name
+        pool = SqlPool.get(self._obj, readonly)
+        Lp().cursors[self._name] = pool.acquire()
+        return Lp().cursors[self._name]
 
     def __exit__(self, type, value, traceback):
         """
-            If creator, close cursor and remove it
+            If creator, give back cursor to pool
         """
-        if self._creator:
-            name = current_thread().getName() + self._obj.__class__.__name__
-            Lp().cursors[name].close()
-            del Lp().cursors[name]
+        if self._name is not None:
+            c = Lp().cursors.pop(self._name)
+            SqlPool.get(self._obj, self._readonly is True).release(c)
+            self._name = None
@@ -262,6 +262,28 @@ class TagReader(Discoverer):
             year = None
         return year
 
+    def get_artwork(self, tags):
+        """
+            Return embedded artwork for tags
+            @param tags as Gst.TagList
+            @return artwork as bytes or None
+        """
+        if tags is None:
+            return None
+        (exists, sample) = tags.get_sample_index('image', 0)
+        # Some file store it in a preview-image tag
+        if not exists:
+            (exists, sample) = tags.get_sample_index('preview-image', 0)
+        if not exists:
+            return None
+        buf = sample.get_buffer()
+        (exists, m) = buf.map(Gst.MapFlags.READ)
+        if not exists:
+            return None
+        data = bytes(m.data)
+        buf.unmap(m)
+        return data
+
     def get_lyrics(self, tags):
         """
             Return lyrics for tags
@@ -0,0 +1,845 @@
+# Copyright (c) 2014-2016 Cedric Bellegarde <cedric.bellegarde@adishatz.org>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+from gi.repository import GLib, GObject, Gst
+
+from base64 import b64decode
+from struct import unpack
+from re import match
+
+
+class NativeInfo:
+    """
+        Same API as GstPbutils.DiscovererInfo for TagReader
+    """
+
+    def __init__(self, tags, duration):
+        """
+            Init info
+            @param tags as Gst.TagList
+            @param duration as int (ns)
+        """
+        self.__tags = tags
+        self.__duration = duration
+
+    def get_tags(self):
+        """
+            Get tags
+            @return Gst.TagList
+        """
+        return self.__tags
+
+    def get_duration(self):
+        """
+            Get duration
+            @return int (ns)
+        """
+        return self.__duration
+
+
+class NativeTagReader:
+    """
+        Read tags blocks and stream headers from files, without GStreamer
+        Supported containers: MPEG audio with ID3v2/ID3v1, FLAC,
+        Ogg (Vorbis/Opus), MP4
+    """
+    # Do not read bigger blocks, file is broken
+    __MAX_BLOCK = 16 * 1024 * 1024
+    # Front cover in ID3v2/FLAC picture types
+    __FRONT_COVER = 3
+    __ID3_FRAMES = {
+        b'TIT2': 'title', b'TT2': 'title',
+        b'TPE1': 'artist', b'TP1': 'artist',
+        b'TPE2': 'album-artist', b'TP2': 'album-artist',
+        b'TALB': 'album', b'TAL': 'album',
+        b'TCON': 'genre', b'TCO': 'genre',
+        b'TCOM': 'composer', b'TCM': 'composer',
+        b'TOPE': 'performer', b'TOA': 'performer',
+        b'TSOP': 'artist-sortname',
+        b'TSO2': 'album-artist-sortname',
+        b'TRCK': 'track-number', b'TRK': 'track-number',
+        b'TPOS': 'album-disc-number', b'TPA': 'album-disc-number',
+        b'TDRC': 'datetime', b'TYER': 'datetime', b'TYE': 'datetime',
+        b'TSST': 'discsubtitle'
+    }
+    __VORBIS_COMMENTS = {
+        'TITLE': 'title',
+        'ARTIST': 'artist',
+        'ALBUMARTIST': 'album-artist',
+        'ALBUM ARTIST': 'album-artist',
+        'ALBUM': 'album',
+        'GENRE': 'genre',
+        'COMPOSER': 'composer',
+        'PERFORMER': 'performer',
+        'ARTISTSORT': 'artist-sortname',
+        'ALBUMARTISTSORT': 'album-artist-sortname',
+        'TRACKNUMBER': 'track-number',
+        'DISCNUMBER': 'album-disc-number',
+        'DATE': 'datetime',
+        'DISCSUBTITLE': 'discsubtitle'
+    }
+    __MP4_ATOMS = {
+        b'\xa9nam': 'title',
+        b'\xa9ART': 'artist',
+        b'aART': 'album-artist',
+        b'\xa9alb': 'album',
+        b'\xa9gen': 'genre',
+        b'\xa9wrt': 'composer',
+        b'soar': 'artist-sortname',
+        b'soaa': 'album-artist-sortname',
+        b'\xa9day': 'datetime'
+    }
+    # ID3v1 genres, used by ID3v2 TCON references and MP4 gnre
+    __GENRES = [
+        "Blues", "Classic Rock", "Country", "Dance", "Disco", "Funk",
+        "Grunge", "Hip-Hop", "Jazz", "Metal", "New Age", "Oldies", "Other",
+        "Pop", "R&B", "Rap", "Reggae", "Rock", "Techno", "Industrial",
+        "Alternative", "Ska", "Death Metal", "Pranks", "Soundtrack",
+        "Euro-Techno", "Ambient", "Trip-Hop", "Vocal", "Jazz+Funk", "Fusion",
+        "Trance", "Classical", "Instrumental", "Acid", "House", "Game",
+        "Sound Clip", "Gospel", "Noise", "Alternative Rock", "Bass", "Soul",
+        "Punk", "Space", "Meditative", "Instrumental Pop",
+        "Instrumental Rock", "Ethnic", "Gothic", "Darkwave",
+        "Techno-Industrial", "Electronic", "Pop-Folk", "Eurodance", "Dream",
+        "Southern Rock", "Comedy", "Cult", "Gangsta", "Top 40",
+        "Christian Rap", "Pop/Funk", "Jungle", "Native American", "Cabaret",
+        "New Wave", "Psychedelic", "Rave", "Showtunes", "Trailer", "Lo-Fi",
+        "Tribal", "Acid Punk", "Acid Jazz", "Polka", "Retro", "Musical",
+        "Rock & Roll", "Hard Rock"
+    ]
+    # MPEG audio: bitrates in kbps by (version 1, layer)
+    __MPEG_BITRATES = {
+        (True, 1): [0, 32, 64, 96, 128, 160, 192, 224,
+                    256, 288, 320, 352, 384, 416, 448],
+        (True, 2): [0, 32, 48, 56, 64, 80, 96, 112,
+                    128, 160, 192, 224, 256, 320, 384],
+        (True, 3): [0, 32, 40, 48, 56, 64, 80, 96,
+                    112, 128, 160, 192, 224, 256, 320],
+        (False, 1): [0, 32, 48, 56, 64, 80, 96, 112,
+                     128, 144, 160, 176, 192, 224, 256],
+        (False, 2): [0, 8, 16, 24, 32, 40, 48, 56,
+                     64, 80, 96, 112, 128, 144, 160],
+        (False, 3): [0, 8, 16, 24, 32, 40, 48, 56,
+                     64, 80, 96, 112, 128, 144, 160]
+    }
+    # MPEG audio: sample rates by version bits
+    __MPEG_RATES = {
+        0: [11025, 12000, 8000],
+        2: [22050, 24000, 16000],
+        3: [44100, 48000, 32000]
+    }
+
+    def get_info(self, uri):
+        """
+            Read tags and duration for file at uri
+            @param uri as str
+            @return NativeInfo or None if file can't be handled
+            @thread safe
+        """
+        if not uri.startswith('file:'):
+            return None
+        try:
+            (path, host) = GLib.filename_from_uri(uri)
+            with open(path, 'rb') as f:
+                result = self.__read(f, True)
+        except Exception as e:
+            print("NativeTagReader::get_info():", e, uri)
+            return None
+        if result is None or result[1] is None:
+            return None
+        (tags, duration) = result
+        # Tags may be in an unsupported format (APE, ...)
+        if not tags:
+            return None
+        return NativeInfo(self.__get_tag_list(tags), duration)
+
+    def read_artwork(self, uri):
+        """
+            Read embedded artwork, front cover is preferred
+            @param uri as str
+            @return (handled as bool, artwork as bytes or None)
+                    handled is False if container is not supported
+            @thread safe
+        """
+        if not uri.startswith('file:'):
+            return (False, None)
+        try:
+            (path, host) = GLib.filename_from_uri(uri)
+            with open(path, 'rb') as f:
+                result = self.__read(f, False)
+        except Exception as e:
+            print("NativeTagReader::read_artwork():", e, uri)
+            return (False, None)
+        if result is None:
+            return (False, None)
+        return (True, self.__get_artwork(result[0]))
+
+#######################
+# PRIVATE             #
+#######################
+    def __read(self, f, with_duration):
+        """
+            Read tags from file
+            @param f as file object
+            @param with_duration as bool
+            @return (tags as {str: [values]}, duration as int (ns) or None)
+                    or None if container is not supported
+        """
+        tags = {}
+        duration = None
+        offset = 0
+        header = f.read(12)
+        # ID3v2 can be found before any container (MP3, FLAC, ...)
+        if header.startswith(b'ID3'):
+            f.seek(0)
+            offset = self.__read_id3(f, tags)
+            f.seek(offset)
+            header = f.read(12)
+        f.seek(offset)
+        if header.startswith(b'fLaC'):
+            rate_samples = self.__read_flac(f, tags)
+            if rate_samples is not None:
+                duration = rate_samples[1] * Gst.SECOND // rate_samples[0]
+        elif header.startswith(b'OggS'):
+            (supported, duration) = self.__read_ogg(f, tags, with_duration)
+            if not supported:
+                return None
+        elif header[4:8] == b'ftyp':
+            duration = self.__read_mp4(f, tags, with_duration)
+        # MPEG audio, may have junk after ID3v2
+        elif offset or self.__is_mpeg_frame(header):
+            self.__read_id3v1(f, tags)
+            if with_duration:
+                duration = self.__get_mpeg_duration(f, offset)
+        else:
+            return None
+        return (tags, duration)
+
+    def __add_tag(self, tags, key, value):
+        """
+            Add value to tags, converted to GStreamer tag type
+            @param tags as {str: [values]}
+            @param key as str
+            @param value as str
+        """
+        value = value.strip().replace('\ufeff', '')
+        if not value:
+            return
+        if key in ['track-number', 'album-disc-number']:
+            m = match('^([0-9]+)', value)
+            if m is None:
+                return
+            value = int(m.group(1))
+        elif key == 'datetime':
+            m = match('^([0-9]{4})', value)
+            if m is None:
+                return
+            value = int(m.group(1))
+        elif key == 'discsubtitle':
+            # Same as GStreamer for unknown Vorbis comments
+            key = 'extended-comment'
+            value = "DISCSUBTITLE=%s" % value
+        tags.setdefault(key, []).append(value)
+
+    def __get_genre(self, value):
+        """
+            Resolve ID3v1 genre references like "(17)" or "17"
+            @param value as str
+            @return str
+        """
+        m = match(r'^\(([0-9]+)\)(.*)$', value)
+        if m is not None:
+            if m.group(2):
+                return m.group(2)
+            value = m.group(1)
+        if value.isdigit() and int(value) < len(self.__GENRES):
+            return self.__GENRES[int(value)]
+        return value
+
+    def __get_artwork(self, tags):
+        """
+            Get artwork from tags, front cover is preferred
+            @param tags as {str: [values]}
+            @return bytes or None
+        """
+        pictures = tags.get('image', [])
+        for (picture_type, data) in pictures:
+            if picture_type == self.__FRONT_COVER and data:
+                return data
+        for (picture_type, data) in pictures:
+            if data:
+                return data
+        return None
+
+    def __get_tag_list(self, tags):
+        """
+            Convert tags to a Gst.TagList
+            @param tags as {str: [values]}
+            @return Gst.TagList
+        """
+        tag_list = Gst.TagList.new_empty()
+        for (key, values) in tags.items():
+            if key == 'image':
+                data = self.__get_artwork(tags)
+                if data is None:
+                    continue
+                sample = Gst.Sample.new(Gst.Buffer.new_wrapped(data),
+                                        None, None, None)
+                tag_list.add_value(Gst.TagMergeMode.APPEND, key,
+                                   GObject.Value(Gst.Sample, sample))
+                continue
+            for value in values:
+                if key == 'datetime':
+                    value = GObject.Value(Gst.DateTime,
+                                          Gst.DateTime.new_y(value))
+                elif isinstance(value, int):
+                    value = GObject.Value(GObject.TYPE_UINT, value)
+                else:
+                    value = GObject.Value(GObject.TYPE_STRING, value)
+                tag_list.add_value(Gst.TagMergeMode.APPEND, key, value)
+        return tag_list
+
+    def __read_id3(self, f, tags):
+        """
+            Read ID3v2 tag
+            @param f as file object at tag start
+            @param tags as {str: [values]}
+            @return tag end as int
+        """
+        header = f.read(10)
+        major = header[3]
+        flags = header[5]
+        size = self.__get_synchsafe(header[6:10])
+        end = 10 + size
+        # Footer
+        if flags & 0x10:
+            end += 10
+        if major not in (2, 3, 4) or size > self.__MAX_BLOCK:
+            return end
+        data = f.read(size)
+        # Whole tag unsynchronisation, per frame in ID3v2.4
+        if flags & 0x80 and major < 4:
+            data = data.replace(b'\xff\x00', b'\xff')
+        pos = 0
+        # Skip extended header
+        if flags & 0x40 and major == 3:
+            pos = 4 + unpack('>I', data[0:4])[0]
+        elif flags & 0x40 and major == 4:
+            pos = self.__get_synchsafe(data[0:4])
+        header_size = 6 if major == 2 else 10
+        while pos + header_size <= len(data):
+            if major == 2:
+                frame_id = data[pos:pos+3]
+                frame_size = int.from_bytes(data[pos+3:pos+6], 'big')
+                frame_flags = 0
+            else:
+                frame_id = data[pos:pos+4]
+                if major == 4:
+                    frame_size = self.__get_synchsafe(data[pos+4:pos+8])
+                else:
+                    frame_size = unpack('>I', data[pos+4:pos+8])[0]
+                frame_flags = data[pos+9]
+            # Padding
+            if frame_id[0] == 0:
+                break
+            body = data[pos+header_size:pos+header_size+frame_size]
+            pos += header_size + frame_size
+            if frame_id not in self.__ID3_FRAMES and\
+                    frame_id not in (b'APIC', b'PIC'):
+                continue
+            if major == 3:
+                # Compressed or encrypted
+                if frame_flags & 0xc0:
+                    continue
+                # Grouping identity
+                if frame_flags & 0x20:
+                    body = body[1:]
+            elif major == 4:
+                if frame_flags & 0x0c:
+                    continue
+                if frame_flags & 0x40:
+                    body = body[1:]
+                # Data length indicator
+                if frame_flags & 0x01:
+                    body = body[4:]
+                if frame_flags & 0x02:
+                    body = body.replace(b'\xff\x00', b'\xff')
+            try:
+                if frame_id in (b'APIC', b'PIC'):
+                    tags.setdefault('image', []).append(
+                                    self.__get_apic(body, major == 2))
+                    continue
+                key = self.__ID3_FRAMES[frame_id]
+                for value in self.__get_id3_text(body):
+                    if key == 'genre':
+                        value = self.__get_genre(value)
+                    self.__add_tag(tags, key, value)
+            except Exception as e:
+                print("NativeTagReader::__read_id3():", e)
+        return end
+
+    def __read_id3v1(self, f, tags):
+        """
+            Read ID3v1 tag at file end, ID3v2 values are preferred
+            @param f as file object
+            @param tags as {str: [values]}
+        """
+        f.seek(0, 2)
+        if f.tell() < 128:
+            return
+        f.seek(-128, 2)
+        data = f.read(128)
+        if not data.startswith(b'TAG'):
+            return
+        values = [('title', data[3:33]), ('artist', data[33:63]),
+                  ('album', data[63:93]), ('datetime', data[93:97])]
+        # ID3v1.1, track number at comment end
+        if data[125] == 0 and data[126] != 0:
+            values.append(('track-number', str(data[126]).encode('ascii')))
+        if data[127] < len(self.__GENRES):
+            values.append(('genre',
+                           self.__GENRES[data[127]].encode('ascii')))
+        for (key, value) in values:
+            if key in tags:
+                continue
+            value = value.split(b'\x00')[0]
+            try:
+                value = value.decode('utf-8')
+            except UnicodeDecodeError:
+                value = value.decode('iso-8859-1')
+            self.__add_tag(tags, key, value)
+
+    def __get_id3_text(self, body):
+        """
+            Get values from text frame
+            @param body as bytes
+            @return [str]
+        """
+        encoding = body[0]
+        data = body[1:]
+        if encoding == 0:
+            text = data.decode('latin-1')
+        elif encoding == 1:
+            text = data.decode('utf-16', 'replace')
+        elif encoding == 2:
+            text = data.decode('utf-16-be', 'replace')
+        else:
+            text = data.decode('utf-8', 'replace')
+        # ID3v2.4 multiple values are null separated
+        return [value for value in text.split('\x00') if value]
+
+    def __get_apic(self, body, v22):
+        """
+            Get picture from APIC/PIC frame
+            @param body as bytes
+            @param v22 as bool, True for ID3v2.2 PIC frame
+            @return (picture type as int, data as bytes)
+        """
+        encoding = body[0]
+        if v22:
+            # Image format is 3 chars
+            pos = 4
+        else:
+            # Mime type is null terminated
+            pos = body.index(b'\x00', 1) + 1
+        picture_type = body[pos]
+        pos += 1
+        # Skip description
+        if encoding in (1, 2):
+            # UTF-16, double null terminated
+            while pos + 1 < len(body) and body[pos:pos+2] != b'\x00\x00':
+                pos += 2
+            pos += 2
+        else:
+            pos = body.index(b'\x00', pos) + 1
+        return (picture_type, body[pos:])
+
+    def __read_flac(self, f, tags):
+        """
+            Read FLAC metadata blocks
+            @param f as file object at fLaC marker
+            @param tags as {str: [values]}
+            @return (sample rate as int, samples as int) or None
+        """
+        rate_samples = None
+        f.read(4)
+        while True:
+            header = f.read(4)
+            if len(header) < 4:
+                break
+            block_type = header[0] & 0x7f
+            size = int.from_bytes(header[1:4], 'big')
+            if block_type == 0:
+                data = f.read(size)
+                rate = (data[10] << 12) | (data[11] << 4) | (data[12] >> 4)
+                samples = ((data[13] & 0x0f) << 32) |\
+                    unpack('>I', data[14:18])[0]
+                if rate and samples:
+                    rate_samples = (rate, samples)
+            elif block_type == 6:
+                tags.setdefault('image', []).append(
+                                    self.__get_flac_picture(f.read(size)))
+            elif block_type == 4:
+                self.__read_vorbis_comments(f.read(size), tags)
+            else:
+                f.seek(size, 1)
+            # Last metadata block
+            if header[0] & 0x80:
+                break
+        return rate_samples
+
+    def __get_flac_picture(self, data):
+        """
+            Get picture from FLAC PICTURE block
+            @param data as bytes
+            @return (picture type as int, data as bytes)
+        """
+        (picture_type, length) = unpack('>II', data[0:8])
+        pos = 8 + length
+        # Description
+        length = unpack('>I', data[pos:pos+4])[0]
+        pos += 4 + length
+        # Width, height, depth, colors
+        pos += 16
+        length = unpack('>I', data[pos:pos+4])[0]
+        pos += 4
+        return (picture_type, data[pos:pos+length])
+
+    def __read_vorbis_comments(self, data, tags):
+        """
+            Read Vorbis comments
+            @param data as bytes, without packet header
+            @param tags as {str: [values]}
+        """
+        length = unpack('<I', data[0:4])[0]
+        pos = 4 + length
+        count = unpack('<I', data[pos:pos+4])[0]
+        pos += 4
+        for i in range(0, count):
+            length = unpack('<I', data[pos:pos+4])[0]
+            pos += 4
+            comment = data[pos:pos+length].decode('utf-8', 'replace')
+            pos += length
+            (key, sep, value) = comment.partition('=')
+            if not sep:
+                continue
+            key = key.upper()
+            try:
+                if key == 'METADATA_BLOCK_PICTURE':
+                    tags.setdefault('image', []).append(
+                                self.__get_flac_picture(b64decode(value)))
+                # Deprecated, raw image data
+                elif key == 'COVERART':
+                    tags.setdefault('image', []).append((0, b64decode(value)))
+                elif key in self.__VORBIS_COMMENTS:
+                    self.__add_tag(tags, self.__VORBIS_COMMENTS[key], value)
+            except Exception as e:
+                print("NativeTagReader::__read_vorbis_comments():", e)
+
+    def __read_ogg(self, f, tags, with_duration):
+        """
+            Read Ogg Vorbis/Opus comments and duration
+            @param f as file object at first page
+            @param tags as {str: [values]}
+            @param with_duration as bool
+            @return (supported as bool, duration as int (ns) or None)
+        """
+        # Comments are in second packet of first stream
+        (packets, serial) = self.__get_ogg_packets(f, 2)
+        if len(packets) < 2:
+            return (False, None)
+        if packets[1].startswith(b'\x03vorbis'):
+            self.__read_vorbis_comments(packets[1][7:], tags)
+            rate = unpack('<I', packets[0][12:16])[0]
+            skip = 0
+        elif packets[1].startswith(b'OpusTags'):
+            self.__read_vorbis_comments(packets[1][8:], tags)
+            # Opus granule position is always at 48kHz
+            rate = 48000
+            skip = unpack('<H', packets[0][10:12])[0]
+        else:
+            return (False, None)
+        duration = None
+        if with_duration and rate:
+            granule = self.__get_ogg_last_granule(f, serial)
+            if granule is not None:
+                duration = max(0, granule - skip) * Gst.SECOND // rate
+        return (True, duration)
+
+    def __get_ogg_packets(self, f, count):
+        """
+            Get first packets of first logical stream
+            @param f as file object at first page
+            @param count as int
+            @return ([bytes], serial as bytes)
+        """
+        packets = []
+        packet = b''
+        serial = None
+        while len(packets) < count:
+            header = f.read(27)
+            if len(header) < 27 or not header.startswith(b'OggS'):
+                break
+            lacing = f.read(header[26])
+            body = f.read(sum(lacing))
+            if serial is None:
+                serial = header[14:18]
+            elif header[14:18] != serial:
+                continue
+            pos = 0
+            for length in lacing:
+                packet += body[pos:pos+length]
+                pos += length
+                # Last segment of packet
+                if length < 255:
+                    packets.append(packet)
+                    packet = b''
+            if len(packet) > self.__MAX_BLOCK:
+                break
+        return (packets, serial)
+
+    def __get_ogg_last_granule(self, f, serial):
+        """
+            Get granule position of last page of stream
+            @param f as file object
+            @param serial as bytes
+            @return int or None
+        """
+        f.seek(0, 2)
+        end = f.tell()
+        f.seek(max(0, end - 65536))
+        data = f.read()
+        pos = data.rfind(b'OggS')
+        while pos != -1:
+            if data[pos+14:pos+18] == serial:
+                granule = unpack('<q', data[pos+6:pos+14])[0]
+                if granule >= 0:
+                    return granule
+            pos = data.rfind(b'OggS', 0, pos)
+        return None
+
+    def __read_mp4(self, f, tags, with_duration):
+        """
+            Read MP4 ilst atom and duration
+            @param f as file object
+            @param tags as {str: [values]}
+            @param with_duration as bool
+            @return duration as int (ns) or None
+        """
+        duration = None
+        f.seek(0, 2)
+        end = f.tell()
+        if with_duration:
+            atom = self.__find_mp4_atom(f, 0, end, [b'moov', b'mvhd'])
+            if atom is not None:
+                f.seek(atom[0])
+                data = f.read(32)
+                if data[0] == 1:
+                    (timescale, length) = unpack('>IQ', data[20:32])
+                else:
+                    (timescale, length) = unpack('>II', data[12:20])
+                if timescale:
+                    duration = length * Gst.SECOND // timescale
+        atom = self.__find_mp4_atom(f, 0, end,
+                                    [b'moov', b'udta', b'meta', b'ilst'])
+        if atom is None or atom[1] - atom[0] > self.__MAX_BLOCK:
+            return duration
+        f.seek(atom[0])
+        data = f.read(atom[1] - atom[0])
+        for (atom_type, start, stop) in self.__get_mp4_atoms(data):
+            for (data_type, data_start, data_stop) in self.__get_mp4_atoms(
+                                                    data, start, stop):
+                if data_type != b'data':
+                    continue
+                # Skip type indicator and locale
+                value = data[data_start+8:data_stop]
+                try:
+                    self.__add_mp4_value(tags, atom_type, value)
+                except Exception as e:
+                    print("NativeTagReader::__read_mp4():", e)
+        return duration
+
+    def __add_mp4_value(self, tags, atom_type, value):
+        """
+            Add value from ilst data atom
+            @param tags as {str: [values]}
+            @param atom_type as bytes
+            @param value as bytes
+        """
+        if atom_type == b'covr':
+            tags.setdefault('image', []).append((self.__FRONT_COVER, value))
+        elif atom_type == b'trkn' and len(value) >= 4:
+            self.__add_tag(tags, 'track-number',
+                           str(unpack('>H', value[2:4])[0]))
+        elif atom_type == b'disk' and len(value) >= 4:
+            self.__add_tag(tags, 'album-disc-number',
+                           str(unpack('>H', value[2:4])[0]))
+        elif atom_type == b'gnre' and len(value) >= 2:
+            # ID3v1 genre + 1
+            self.__add_tag(tags, 'genre',
+                           self.__get_genre(str(unpack('>H', value)[0] - 1)))
+        elif atom_type in self.__MP4_ATOMS:
+            self.__add_tag(tags, self.__MP4_ATOMS[atom_type],
+                           value.decode('utf-8', 'replace'))
+
+    def __find_mp4_atom(self, f, start, end, path):
+        """
+            Find atom content in file
+            @param f as file object
+            @param start as int
+            @param end as int
+            @param path as [bytes], atom types
+            @return (start as int, end as int) or None
+        """
+        pos = start
+        while pos + 8 <= end:
+            f.seek(pos)
+            header = f.read(16)
+            if len(header) < 8:
+                return None
+            (size, atom_type) = unpack('>I4s', header[0:8])
+            header_size = 8
+            if size == 1:
+                size = unpack('>Q', header[8:16])[0]
+                header_size = 16
+            elif size == 0:
+                size = end - pos
+            if size < header_size:
+                return None
+            if atom_type == path[0]:
+                content = pos + header_size
+                # meta is a full atom, except in QuickTime files
+                if atom_type == b'meta':
+                    f.seek(content)
+                    if f.read(8)[4:8] != b'hdlr':
+                        content += 4
+                if len(path) == 1:
+                    return (content, pos + size)
+                return self.__find_mp4_atom(f, content, pos + size, path[1:])
+            pos += size
+        return None
+
+    def __get_mp4_atoms(self, data, start=0, end=None):
+        """
+            Get atoms in data
+            @param data as bytes
+            @param start as int
+            @param end as int
+            @return [(type as bytes, content start as int,
+                      content end as int)]
+        """
+        atoms = []
+        if end is None:
+            end = len(data)
+        pos = start
+        while pos + 8 <= end:
+            (size, atom_type) = unpack('>I4s', data[pos:pos+8])
+            if size < 8:
+                break
+            atoms.append((atom_type, pos + 8, min(pos + size, end)))
+            pos += size
+        return atoms
+
+    def __is_mpeg_frame(self, header):
+        """
+            True if header starts with a valid MPEG audio frame header
+            @param header as bytes
+            @return bool
+        """
+        return self.__get_mpeg_frame(header) is not None
+
+    def __get_mpeg_frame(self, header):
+        """
+            Parse MPEG audio frame header
+            @param header as bytes
+            @return (version 1 as bool, mono as bool, bitrate as int (kbps),
+                     sample rate as int, samples as int, length as int)
+                    or None
+        """
+        if len(header) < 4 or header[0] != 0xff or header[1] & 0xe0 != 0xe0:
+            return None
+        version = (header[1] >> 3) & 0x03
+        layer = 4 - ((header[1] >> 1) & 0x03)
+        bitrate_index = header[2] >> 4
+        rate_index = (header[2] >> 2) & 0x03
+        if version == 1 or layer == 4 or bitrate_index in (0, 15) or\
+                rate_index == 3:
+            return None
+        v1 = version == 3
+        bitrate = self.__MPEG_BITRATES[(v1, layer)][bitrate_index]
+        rate = self.__MPEG_RATES[version][rate_index]
+        padding = (header[2] >> 1) & 0x01
+        mono = header[3] >> 6 == 3
+        if layer == 1:
+            samples = 384
+            length = (12 * bitrate * 1000 // rate + padding) * 4
+        else:
+            samples = 1152 if v1 or layer == 2 else 576
+            length = samples // 8 * bitrate * 1000 // rate + padding
+        return (v1, mono, bitrate, rate, samples, length)
+
+    def __get_mpeg_duration(self, f, offset):
+        """
+            Get MPEG audio duration from Xing/VBRI header or bitrate
+            @param f as file object
+            @param offset as int, audio start
+            @return duration as int (ns) or None
+        """
+        f.seek(0, 2)
+        end = f.tell()
+        f.seek(offset)
+        data = f.read(65536)
+        pos = data.find(b'\xff')
+        frame = None
+        while pos != -1 and pos + 4 <= len(data):
+            frame = self.__get_mpeg_frame(data[pos:pos+4])
+            # Check next frame to skip false sync
+            if frame is not None:
+                following = data[pos+frame[5]:pos+frame[5]+4]
+                if len(following) < 4 or\
+                        self.__get_mpeg_frame(following) is not None:
+                    break
+            frame = None
+            pos = data.find(b'\xff', pos + 1)
+        if frame is None:
+            return None
+        (v1, mono, bitrate, rate, samples, length) = frame
+        # Xing/Info header, in first frame after side information
+        if v1:
+            xing = pos + 4 + (17 if mono else 32)
+        else:
+            xing = pos + 4 + (9 if mono else 17)
+        if data[xing:xing+4] in (b'Xing', b'Info'):
+            flags = unpack('>I', data[xing+4:xing+8])[0]
+            if flags & 0x01:
+                frames = unpack('>I', data[xing+8:xing+12])[0]
+                return frames * samples * Gst.SECOND // rate
+        # VBRI header, always 32 bytes after frame header
+        vbri = pos + 36
+        if data[vbri:vbri+4] == b'VBRI':
+            frames = unpack('>I', data[vbri+14:vbri+18])[0]
+            return frames * samples * Gst.SECOND // rate
+        # Constant bitrate
+        audio = end - offset - pos
+        f.seek(max(0, end - 128))
+        # ID3v1 tag
+        if f.read(3) == b'TAG':
+            audio -= 128
+        return audio * 8 * Gst.SECOND // (bitrate * 1000)
+
+    def __get_synchsafe(self, data):
+        """
+            Get ID3v2 synchsafe integer
+            @param data as bytes
+            @return int
+        """
+        return (data[0] << 21) | (data[1] << 14) | (data[2] << 7) | data[3]
@@ -14,6 +14,7 @@ from gi.repository import Gio, GLib
 
 from gettext import gettext as _
 from threading import Thread
+from hashlib import sha1
 import unicodedata
 import socket
 import fcntl
@@ -42,6 +43,18 @@ def noaccents(string):
         return u"".join([c for c in nfkd_form if not unicodedata.combining(c)])
 
 
+def get_fts_query(string):
+    """
+        Return a full text search query matching words prefixes
+        @param string as str
+        @return query as str, None if nothing to search
+    """
+    words = noaccents(string).split()
+    if not words:
+        return None
+    return " ".join(['"%s"*' % word.replace('"', '""') for word in words])
+
+
 def escape(str, ignore=['_', '-', ' ', '.']):
     """
         Escape string
@@ -87,6 +100,23 @@ def is_gnome():
     return GLib.getenv("XDG_CURRENT_DESKTOP") == "GNOME"
 
 
+def is_audio_type(content_type):
+    """
+        Return True if content type is audio
+        @param content_type as str
+    """
+    return content_type is not None and\
+        (content_type[0:6] == "audio/" or content_type == "video/mp4")
+
+
+def is_pls_type(content_type):
+    """
+        Return True if content type is a playlist
+        @param content_type as str
+    """
+    return content_type in ["audio/x-mpegurl", "application/xspf+xml"]
+
+
 def is_audio(f):
     """
         Return True if files is audio
@@ -96,9 +126,7 @@ def is_audio(f):
         info = f.query_info('standard::content-type',
                             Gio.FileQueryInfoFlags.NONE)
         if info is not None:
-            if info.get_content_type()[0:6] == "audio/" or\
-               info.get_content_type() == "video/mp4":
-                return True
+            return is_audio_type(info.get_content_type())
     except:
         pass
     return False
@@ -113,9 +141,7 @@ def is_pls(f):
         info = f.query_info('standard::content-type',
                             Gio.FileQueryInfoFlags.NONE)
         if info is not None:
-            if info.get_content_type() in ["audio/x-mpegurl",
-                                           "application/xspf+xml"]:
-                return True
+            return is_pls_type(info.get_content_type())
     except:
         pass
     return False
@@ -172,6 +198,31 @@ def is_readonly(uri):
     return not info.get_attribute_boolean('access::can-write')
 
 
+def get_fingerprint(uri):
+    """
+        Get a partial content hash for file: size, first and last blocks
+        Cheap enough to match moved files with their tracks
+        @param uri as str
+        @return str or None
+    """
+    block = 16384
+    try:
+        (path, host) = GLib.filename_from_uri(uri)
+        with open(path, 'rb') as f:
+            f.seek(0, 2)
+            size = f.tell()
+            h = sha1(str(size).encode('utf-8'))
+            f.seek(0)
+            h.update(f.read(block))
+            if size > block:
+                f.seek(max(block, size - block))
+                h.update(f.read(block))
+        return h.hexdigest()
+    except Exception as e:
+        print("get_fingerprint():", e, uri)
+        return None
+
+
 def is_loved(track_id):
     """
         Check if object is in loved playlist
@@ -58,7 +58,7 @@ class AlbumsView(LazyLoadingView):
     def populate(self, albums):
         """
             Populate albums
-            @param is compilation as bool
+            @param albums as [Album]
         """
         GLib.idle_add(self.__add_albums, albums)
 
@@ -82,14 +82,13 @@ class AlbumsView(LazyLoadingView):
         """
             Add albums to the view
             Start lazy loading
-            @param [album ids as int]
+            @param albums as [Album]
         """
         if self._stop:
             self._stop = False
             return
         if albums:
             widget = AlbumSimpleWidget(albums.pop(0),
-                                       self.__genre_ids,
                                        self.__artist_ids)
             widget.connect('overlayed', self._on_overlayed)
             self._box.insert(widget, -1)
@@ -17,7 +17,7 @@ from gettext import gettext as _
 from lollypop.view import LazyLoadingView, View
 from lollypop.view_container import ViewContainer
 from lollypop.define import Lp, Type, ArtSize
-from lollypop.objects import Track
+from lollypop.objects import Track, Album
 from lollypop.widgets_album import AlbumDetailedWidget
 
 
@@ -66,7 +66,7 @@ class ArtistAlbumsView(LazyLoadingView):
     def populate(self, albums):
         """
             Populate the view
-            @param albums as [int]
+            @param albums as [Album]
         """
         if albums:
             if len(albums) != 1:
@@ -161,12 +161,10 @@ class ArtistAlbumsView(LazyLoadingView):
         """
             Pop an album and add it to the view,
             repeat operation until album list is empty
-            @param [album ids as int]
+            @param albums as [Album]
         """
         if albums and not self._stop:
-            album_id = albums.pop(0)
-            widget = AlbumDetailedWidget(album_id,
-                                         self._genre_ids,
+            widget = AlbumDetailedWidget(albums.pop(0),
                                          self._artist_ids,
                                          self.__show_cover)
             widget.set_filter_func(self._filter_func)
@@ -246,7 +244,7 @@ class CurrentArtistAlbumsView(ViewContainer):
     def __populate(self, albums):
         """
             Populate view and make it visible
-            @param albums as [albums ids as int]
+            @param albums as [Album]
         """
         # Add a loading indicator
         view = View()
@@ -275,7 +273,7 @@ class CurrentArtistAlbumsView(ViewContainer):
     def __get_albums(self):
         """
             Get albums
-            @return album ids as [int]
+            @return [Album]
         """
         if self.__track.album.artist_ids[0] == Type.COMPILATIONS:
             albums = [self.__track.album.id]
@@ -284,7 +282,7 @@ class CurrentArtistAlbumsView(ViewContainer):
             # Charts album playing
             if Lp().player.current_track.album.id not in albums:
                 albums.append(Lp().player.current_track.album.id)
-        return albums
+        return Album.load_many(albums)
 
     def __on_populated(self, view, spinner):
         """
@@ -12,7 +12,7 @@
 
 from gi.repository import GLib, Gio
 
-from threading import Thread
+from threading import Thread, Lock
 from time import time
 
 from lollypop.sqlcursor import SqlCursor
@@ -27,6 +27,11 @@ class Web:
     """
         Web helper
     """
+    # Stream uris expire after some hours, keep them for one hour
+    __URI_TTL = 3600
+    # {track uri: (stream uri, time)}
+    __uris = {}
+    __uris_lock = Lock()
 
     def play_track(track, play, callback):
         """
@@ -34,15 +39,35 @@ class Web:
             @param track as Track
             @param play as bool
             @param callback as func(uri: str, track: Track, play: bool)
-        """
-        if track.is_jgm:
-            uri = WebJmg90.get_uri_content(track.uri)
-        elif track.is_youtube:
-            uri = WebYouTube.get_uri_content(track.uri)
-        else:
-            return
+            @thread safe
+        """
+        uri = Web.get_cached_uri(track.uri)
+        if uri is None:
+            if track.is_jgm:
+                uri = WebJmg90.get_uri_content(track.uri)
+            elif track.is_youtube:
+                uri = WebYouTube.get_uri_content(track.uri)
+            else:
+                return
+            if uri is not None:
+                Web.__set_cached_uri(track.uri, uri)
         GLib.idle_add(callback, uri, track, play)
 
+    def get_cached_uri(uri):
+        """
+            Get stream uri already resolved for track uri
+            @param uri as str
+            @return stream uri as str or None
+            @thread safe
+        """
+        with Web.__uris_lock:
+            if uri in Web.__uris:
+                (stream_uri, mtime) = Web.__uris[uri]
+                if time() - mtime < Web.__URI_TTL:
+                    return stream_uri
+                del Web.__uris[uri]
+        return None
+
     def __init__(self):
         """
             Init helper
@@ -74,6 +99,20 @@ class Web:
 #######################
 # PRIVATE             #
 #######################
+    def __set_cached_uri(uri, stream_uri):
+        """
+            Cache stream uri for track uri, drop expired ones
+            @param uri as str
+            @param stream uri as str
+            @thread safe
+        """
+        now = time()
+        with Web.__uris_lock:
+            for key in list(Web.__uris.keys()):
+                if now - Web.__uris[key][1] >= Web.__URI_TTL:
+                    del Web.__uris[key]
+            Web.__uris[uri] = (stream_uri, now)
+
     def __save_album_thread(self, item, persistent):
         """
             Save item into collection as album
@@ -151,7 +190,7 @@ class Web:
                 Lp().tracks.set_persistent(track_id, DbPersistent.EXTERNAL)
                 return (None, None)
         t = TagReader()
-        with SqlCursor(Lp().db) as sql:
+        with SqlCursor(Lp().db, False) as sql:
             # Happen often with Itunes/Spotify
             if album_artist not in item.artists:
                 item.artists.append(album_artist)
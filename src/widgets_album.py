@@ -18,7 +18,7 @@ from lollypop.define import Lp, ArtSize, Type, NextContext
 from lollypop.define import WindowSize, Shuffle, Loading
 from lollypop.widgets_track import TracksWidget, TrackRow
 from lollypop.widgets_context import ContextWidget
-from lollypop.objects import Track, Album
+from lollypop.objects import Track
 from lollypop.widgets_rating import RatingWidget
 from lollypop.pop_menu import AlbumMenuPopover, AlbumMenu
 from lollypop.pop_artwork import CoversPopover
@@ -310,12 +310,14 @@ class AlbumWidget(BaseWidget):
         Album widget
     """
 
-    def __init__(self, album_id, genre_ids=[], artist_ids=[]):
+    def __init__(self, album, artist_ids=[]):
         """
             Init Album widget
+            @param album as Album
+            @param artist_ids as [int]
         """
         BaseWidget.__init__(self)
-        self._album = Album(album_id, genre_ids)
+        self._album = album
         self._filter_ids = artist_ids
         self.connect('destroy', self.__on_destroy)
         self._scan_signal = Lp().scanner.connect('album-updated',
@@ -352,20 +354,21 @@ class AlbumWidget(BaseWidget):
     def set_cover(self):
         """
             Set cover for album if state changed
+            Show a placeholder while artwork is loading
         """
         if self._cover is None:
             return
-        surface = Lp().art.get_album_artwork(
-                            self._album,
-                            ArtSize.BIG,
-                            self._cover.get_scale_factor())
-        self._cover.set_from_surface(surface)
         self._cover.set_size_request(100, 100)
-        if surface.get_height() > surface.get_width():
-            self._overlay_orientation = Gtk.Orientation.VERTICAL
-        else:
-            self._overlay_orientation = Gtk.Orientation.HORIZONTAL
-        del surface
+        scale = self._cover.get_scale_factor()
+        if not Lp().art.load_album_artwork(self._album,
+                                           ArtSize.BIG,
+                                           scale,
+                                           self.__on_cover_loaded):
+            surface = Lp().art.get_default_icon('folder-music-symbolic',
+                                                ArtSize.BIG * scale,
+                                                scale)
+            self._cover.set_from_surface(surface)
+            del surface
 
     def update_cover(self):
         """
@@ -373,16 +376,10 @@ class AlbumWidget(BaseWidget):
         """
         if self._cover is None:
             return
-        surface = Lp().art.get_album_artwork(
-                            self._album,
-                            ArtSize.BIG,
-                            self._cover.get_scale_factor())
-        self._cover.set_from_surface(surface)
-        if surface.get_height() > surface.get_width():
-            self._overlay_orientation = Gtk.Orientation.VERTICAL
-        else:
-            self._overlay_orientation = Gtk.Orientation.HORIZONTAL
-        del surface
+        Lp().art.load_album_artwork(self._album,
+                                    ArtSize.BIG,
+                                    self._cover.get_scale_factor(),
+                                    self.__on_cover_loaded)
 
     def update_state(self):
         """
@@ -408,6 +405,17 @@ class AlbumWidget(BaseWidget):
 #######################
 # PRIVATE             #
 #######################
+    def __on_cover_loaded(self, surface):
+        """
+            Set cover surface
+            @param surface as cairo.Surface
+        """
+        self._cover.set_from_surface(surface)
+        if surface.get_height() > surface.get_width():
+            self._overlay_orientation = Gtk.Orientation.VERTICAL
+        else:
+            self._overlay_orientation = Gtk.Orientation.HORIZONTAL
+
     def __on_destroy(self, widget):
         """
             Disconnect signal
@@ -425,18 +433,17 @@ class AlbumSimpleWidget(Gtk.FlowBoxChild, AlbumWidget):
         'overlayed': (GObject.SignalFlags.RUN_FIRST, None, (bool,))
     }
 
-    def __init__(self, album_id, genre_ids, artist_ids):
+    def __init__(self, album, artist_ids):
         """
             Init simple album widget
-            @param album id as int
-            @param genre ids as [int]
+            @param album as Album
             @param artist_ids as [int]
         """
         # We do not use Gtk.Builder for speed reasons
         Gtk.FlowBoxChild.__init__(self)
         self.set_size_request(ArtSize.BIG, ArtSize.BIG)
         self.get_style_context().add_class('loading')
-        AlbumWidget.__init__(self, album_id, genre_ids, artist_ids)
+        AlbumWidget.__init__(self, album, artist_ids)
 
     def populate(self):
         """
@@ -675,17 +682,16 @@ class AlbumDetailedWidget(Gtk.Bin, AlbumWidget):
         'overlayed': (GObject.SignalFlags.RUN_FIRST, None, (bool,))
     }
 
-    def __init__(self, album_id, genre_ids, artist_ids, show_cover):
+    def __init__(self, album, artist_ids, show_cover):
         """
             Init detailed album widget
-            @param album id as int
-            @param genre ids as [int]
+            @param album as Album
             @param artist ids as [int]
             @param lazy as LazyLoadingView
             @param show cover as bool
         """
         Gtk.Bin.__init__(self)
-        AlbumWidget.__init__(self, album_id, genre_ids, artist_ids)
+        AlbumWidget.__init__(self, album, artist_ids)
         self._album.set_artists(artist_ids)
         self.__width = None
         self.__context = None
@@ -1050,7 +1056,7 @@ class AlbumDetailedWidget(Gtk.Bin, AlbumWidget):
         else:
             track_number = track.number
 
-        row = TrackRow(track.id, track_number)
+        row = TrackRow(track, track_number)
         row.show()
         widget[disc_number].add(row)
         GLib.idle_add(self.__add_tracks, tracks, widget, disc_number, i + 1)
@@ -202,7 +202,7 @@ class ContextWidget(Gtk.Grid):
         for track_id in self.__object.track_ids:
             Lp().tracks.del_genres(track_id)
             Lp().tracks.add_genre(track_id, genre_id)
-        with SqlCursor(Lp().db) as sql:
+        with SqlCursor(Lp().db, False) as sql:
             sql.commit()
         Lp().scanner.emit('album-updated', self.__object.id, True)
 
@@ -345,7 +345,7 @@ class DeviceManagerWidget(Gtk.Bin, MtpSync):
         for item in self.__model:
             item[0] = not selected
             self.__populate_albums_playlist(item[2], item[0])
-        with SqlCursor(Lp().db) as sql:
+        with SqlCursor(Lp().db, False) as sql:
             sql.commit()
 
     def __on_playlist_toggled(self, view, path):
@@ -359,5 +359,5 @@ class DeviceManagerWidget(Gtk.Bin, MtpSync):
         self.__model.set_value(iterator, 0, toggle)
         album_id = self.__model.get_value(iterator, 2)
         self.__populate_albums_playlist(album_id, toggle)
-        with SqlCursor(Lp().db) as sql:
+        with SqlCursor(Lp().db, False) as sql:
             sql.commit()
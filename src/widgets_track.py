@@ -25,17 +25,17 @@ class Row(Gtk.ListBoxRow):
     """
         A row
     """
-    def __init__(self, rowid, num):
+    def __init__(self, track, num):
         """
             Init row widgets
-            @param rowid as int
+            @param track as Track
             @param num as int
             @param show loved as bool
         """
         # We do not use Gtk.Builder for speed reasons
         Gtk.ListBoxRow.__init__(self)
         self._artists_label = None
-        self._track = Track(rowid)
+        self._track = track
         self.__number = num
         self.__preview_timeout_id = None
         self.__context_timeout_id = None
@@ -344,14 +344,14 @@ class PlaylistRow(Row):
         'track-moved': (GObject.SignalFlags.RUN_FIRST, None, (int, int, bool))
     }
 
-    def __init__(self, rowid, num, show_headers):
+    def __init__(self, track, num, show_headers):
         """
             Init row widget
-            @param rowid as int
+            @param track as Track
             @param num as int
             @param show headers as bool
         """
-        Row.__init__(self, rowid, num)
+        Row.__init__(self, track, num)
         self.__parent_filter = False
         self.__show_headers = show_headers
         self._indicator.set_margin_start(5)
@@ -565,13 +565,13 @@ class TrackRow(Row):
             height = menu_height
         return height
 
-    def __init__(self, rowid, num):
+    def __init__(self, track, num):
         """
             Init row widget and show it
-            @param rowid as int
+            @param track as Track
             @param num as int
         """
-        Row.__init__(self, rowid, num)
+        Row.__init__(self, track, num)
         self.__parent_filter = False
         self._grid.insert_column(0)
         self._grid.attach(self._indicator, 0, 0, 1, 1)